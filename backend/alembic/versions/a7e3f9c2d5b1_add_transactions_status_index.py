@@ -0,0 +1,36 @@
+"""add transactions (status, created_at, id) index for reconciliation
+
+Revision ID: a7e3f9c2d5b1
+Revises: c4d2e8a1b7f3
+Create Date: 2026-10-17 21:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a7e3f9c2d5b1'
+down_revision: Union[str, None] = 'c4d2e8a1b7f3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # CONCURRENTLY cannot run inside a transaction; it avoids locking writes on transactions
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_transactions_status_created_at',
+            'transactions',
+            ['status', 'created_at', 'id'],
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            'ix_transactions_status_created_at', table_name='transactions', postgresql_concurrently=True, if_exists=True
+        )
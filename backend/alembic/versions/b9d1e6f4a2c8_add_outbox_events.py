@@ -0,0 +1,45 @@
+"""add outbox_events
+
+Revision ID: b9d1e6f4a2c8
+Revises: a7e3f9c2d5b1
+Create Date: 2026-10-17 22:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b9d1e6f4a2c8'
+down_revision: Union[str, None] = 'a7e3f9c2d5b1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'outbox_events',
+        sa.Column('id', postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column('event_type', sa.String(length=64), nullable=False),
+        sa.Column('aggregate_id', postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column('payload', sa.Text(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('published_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index(
+        'ix_outbox_events_unpublished',
+        'outbox_events',
+        ['created_at', 'id'],
+        postgresql_where=sa.text('published_at IS NULL'),
+    )
+    op.create_index('ix_outbox_events_published_at', 'outbox_events', ['published_at'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_outbox_events_published_at', table_name='outbox_events')
+    op.drop_index('ix_outbox_events_unpublished', table_name='outbox_events')
+    op.drop_table('outbox_events')
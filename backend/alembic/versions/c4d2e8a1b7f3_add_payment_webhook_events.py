@@ -0,0 +1,60 @@
+"""add payment_webhook_events and transactions.external_id index
+
+Revision ID: c4d2e8a1b7f3
+Revises: f3126d9bbcf1
+Create Date: 2026-10-17 19:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c4d2e8a1b7f3'
+down_revision: Union[str, None] = 'f3126d9bbcf1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    webhook_event_status = postgresql.ENUM('received', 'processed', 'ignored', 'failed', name='webhookeventstatus')
+    webhook_event_status.create(op.get_bind(), checkfirst=True)
+
+    op.create_table(
+        'payment_webhook_events',
+        sa.Column('id', postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column('provider', postgresql.ENUM(name='paymentprovider', create_type=False), nullable=False),
+        sa.Column('event_key', sa.String(length=255), nullable=False),
+        sa.Column('payload', sa.Text(), nullable=False),
+        sa.Column('status', postgresql.ENUM(name='webhookeventstatus', create_type=False), nullable=False),
+        sa.Column('attempts', sa.Integer(), nullable=False),
+        sa.Column('error', sa.String(length=1000), nullable=True),
+        sa.Column('received_at', sa.DateTime(), nullable=False),
+        sa.Column('processed_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('provider', 'event_key', name='uq_payment_webhook_events_provider_event_key'),
+    )
+    op.create_index('ix_payment_webhook_events_status_received_at', 'payment_webhook_events', ['status', 'received_at'])
+    op.create_index('ix_payment_webhook_events_received_at', 'payment_webhook_events', ['received_at'])
+
+    # CONCURRENTLY cannot run inside a transaction; it avoids locking writes on transactions
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_transactions_external_id',
+            'transactions',
+            ['external_id'],
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_transactions_external_id', table_name='transactions', postgresql_concurrently=True, if_exists=True)
+    op.drop_index('ix_payment_webhook_events_received_at', table_name='payment_webhook_events')
+    op.drop_index('ix_payment_webhook_events_status_received_at', table_name='payment_webhook_events')
+    op.drop_table('payment_webhook_events')
+    postgresql.ENUM(name='webhookeventstatus').drop(op.get_bind(), checkfirst=True)
@@ -0,0 +1,43 @@
+"""add product full-text and trigram search indexes
+
+Revision ID: f3126d9bbcf1
+Revises: f457143478a2
+Create Date: 2026-10-17 14:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f3126d9bbcf1'
+down_revision: Union[str, None] = 'f457143478a2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# Must stay identical to app.models.product.PRODUCT_SEARCH_DOCUMENT
+SEARCH_DOCUMENT = (
+    "(setweight(to_tsvector('simple'::regconfig, coalesce(name, '')), 'A') || "
+    "setweight(to_tsvector('simple'::regconfig, coalesce(description, '')), 'B'))"
+)
+
+
+def upgrade() -> None:
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    with op.get_context().autocommit_block():
+        op.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_products_search_document "
+            f"ON products USING gin ({SEARCH_DOCUMENT})"
+        )
+        op.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_products_name_trgm "
+            "ON products USING gin (name gin_trgm_ops)"
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_products_name_trgm")
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_products_search_document")
@@ -0,0 +1,63 @@
+"""add secondary indexes for list and lookup queries
+
+Revision ID: f457143478a2
+Revises: ba6ef332b3ec
+Create Date: 2026-10-17 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f457143478a2'
+down_revision: Union[str, None] = 'ba6ef332b3ec'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# (name, table, columns, partial index predicate)
+INDEXES = [
+    # GET /orders: WHERE farmer_id/shop_id/status = ? ORDER BY created_at DESC, id DESC
+    ('ix_orders_farmer_id_created_at', 'orders', ['farmer_id', 'created_at', 'id'], None),
+    ('ix_orders_shop_id_created_at', 'orders', ['shop_id', 'created_at', 'id'], None),
+    ('ix_orders_status_created_at', 'orders', ['status', 'created_at', 'id'], None),
+    ('ix_orders_created_at', 'orders', ['created_at', 'id'], None),
+    # Batched item loads (order_id IN (...)) and the active-order check in DELETE /products
+    ('ix_order_items_order_id', 'order_items', ['order_id'], None),
+    ('ix_order_items_product_id', 'order_items', ['product_id'], None),
+    # GET /products: WHERE is_active [AND category = ?] ORDER BY created_at DESC, id DESC
+    ('ix_products_active_created_at', 'products', ['created_at', 'id'], 'is_active = true'),
+    ('ix_products_active_category_created_at', 'products', ['category', 'created_at', 'id'], 'is_active = true'),
+    ('ix_products_farmer_id_created_at', 'products', ['farmer_id', 'created_at', 'id'], None),
+    # GET /payments/transactions?order_id= and the pending check in POST /payments/init
+    ('ix_transactions_order_id_created_at', 'transactions', ['order_id', 'created_at', 'id'], None),
+    ('ix_transactions_created_at', 'transactions', ['created_at', 'id'], None),
+    # Latest OTP per phone: WHERE phone_number = ? ORDER BY created_at DESC LIMIT 1
+    ('ix_phone_otps_phone_number_created_at', 'phone_otps', ['phone_number', 'created_at'], None),
+    # GET /users (admin), optionally filtered by role
+    ('ix_users_role_created_at', 'users', ['role', 'created_at', 'id'], None),
+    ('ix_users_created_at', 'users', ['created_at', 'id'], None),
+]
+
+
+def upgrade() -> None:
+    # CONCURRENTLY cannot run inside a transaction; it avoids locking writes on large tables
+    with op.get_context().autocommit_block():
+        for name, table, columns, where in INDEXES:
+            op.create_index(
+                name,
+                table,
+                columns,
+                postgresql_where=sa.text(where) if where else None,
+                postgresql_concurrently=True,
+                if_not_exists=True,
+            )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, table, _columns, _where in reversed(INDEXES):
+            op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
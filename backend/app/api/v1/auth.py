@@ -1,16 +1,29 @@
 from __future__ import annotations
 
+import logging
 import random
-from datetime import datetime, timedelta
+from datetime import timedelta
+from typing import NoReturn
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from redis.exceptions import RedisError
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.config import get_settings
-from app.core.security import create_token, get_password_hash, verify_password
+from app.core.instrumentation import TimedRoute
+from app.core.rate_limit import (
+    LOGIN_BY_IP,
+    LOGIN_BY_USERNAME,
+    SEND_OTP_BY_IP,
+    VERIFY_OTP_BY_IP,
+    VERIFY_OTP_BY_PHONE,
+    client_ip,
+    rate_limit,
+    rate_limiter,
+)
+from app.core.security import PasswordHasherBusyError, create_token, verify_password_async
 from app.db.session import get_db
-from app.models.otp import PhoneOTP
 from app.models.user import EntityType, User, UserRole
 from app.schemas.auth import (
     AuthResponse,
@@ -20,16 +33,22 @@ from app.schemas.auth import (
     UserProfile,
     VerifyOTPRequest,
 )
-from app.services.sms import get_sms_provider
+from app.services.otp import OTPCooldownError, OTPError, get_otp_store
+from app.services.sms import enqueue_sms, otp_message
 from app.utils.phone import normalize_phone_number
 
-router = APIRouter(prefix="/auth", tags=["auth"])
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/auth", tags=["auth"], route_class=TimedRoute)
 
 
-@router.post("/login", response_model=AuthResponse)
-async def login(payload: LoginRequest, db: AsyncSession = Depends(get_db)) -> AuthResponse:
+@router.post("/login", response_model=AuthResponse, dependencies=[Depends(rate_limit(LOGIN_BY_IP))])
+async def login(request: Request, payload: LoginRequest, db: AsyncSession = Depends(get_db)) -> AuthResponse:
     """Login with username and password (for admin panel)."""
     settings = get_settings()
+    failures_key = f"{payload.username}:{client_ip(request)}"
+    # Over the failure limit even the right password is refused, before any password check
+    await rate_limiter.enforce(LOGIN_BY_USERNAME, failures_key, record=False)
     
     # Find user by username
     stmt = select(User).where(User.username == payload.username)
@@ -37,17 +56,19 @@ async def login(payload: LoginRequest, db: AsyncSession = Depends(get_db)) -> Au
     user = result.scalar_one_or_none()
     
     if not user:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Invalid username or password"
-        )
+        await _login_failed(failures_key)
     
     # Check password
-    if not user.password_hash or not verify_password(payload.password, user.password_hash):
+    try:
+        password_valid = bool(user.password_hash) and await verify_password_async(payload.password, user.password_hash)
+    except PasswordHasherBusyError as exc:
         raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Invalid username or password"
-        )
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many login attempts in progress, try again shortly",
+            headers={"Retry-After": "1"},
+        ) from exc
+    if not password_valid:
+        await _login_failed(failures_key)
     
     # Check if user is active
     if not user.is_active:
@@ -77,7 +98,7 @@ async def login(payload: LoginRequest, db: AsyncSession = Depends(get_db)) -> Au
     )
 
 
-@router.post("/send-otp", status_code=status.HTTP_202_ACCEPTED)
+@router.post("/send-otp", status_code=status.HTTP_202_ACCEPTED, dependencies=[Depends(rate_limit(SEND_OTP_BY_IP))])
 async def send_otp(payload: SendOTPRequest, db: AsyncSession = Depends(get_db)) -> dict[str, object]:
     settings = get_settings()
     try:
@@ -85,30 +106,27 @@ async def send_otp(payload: SendOTPRequest, db: AsyncSession = Depends(get_db))
     except ValueError as exc:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc)) from exc
 
-    stmt = (
-        select(PhoneOTP)
-        .where(PhoneOTP.phone_number == normalized_phone)
-        .order_by(PhoneOTP.created_at.desc())
-        .limit(1)
-    )
-    result = await db.execute(stmt)
-    existing_otp = result.scalar_one_or_none()
-    now = datetime.utcnow()
-    if existing_otp and (now - existing_otp.created_at).total_seconds() < settings.otp_resend_interval_seconds:
-        raise HTTPException(status_code=status.HTTP_429_TOO_MANY_REQUESTS, detail="OTP recently sent. Try again later.")
-
     code = f"{random.randint(0, 999999):06d}"
-    otp = PhoneOTP(
-        phone_number=normalized_phone,
-        code=code,
-        expires_at=now + timedelta(minutes=settings.otp_expiration_minutes),
-        max_attempts=settings.otp_attempt_limit,
-    )
-    db.add(otp)
-    await db.commit()
+    try:
+        await get_otp_store(db).issue(normalized_phone, code)
+    except OTPCooldownError as exc:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail=str(exc),
+            headers={"Retry-After": str(exc.retry_after)},
+        ) from exc
+    except RedisError as exc:
+        raise _otp_store_unavailable() from exc
 
-    sms_provider = get_sms_provider()
-    await sms_provider.send_code(phone_number=normalized_phone, code=code)
+    # The dispatcher sends it; the response does not wait for the gateway
+    try:
+        await enqueue_sms(otp_message(normalized_phone, code))
+    except NotImplementedError as exc:
+        logger.error(f"OTP for {normalized_phone} not sent: {exc}")
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="SMS delivery is not configured",
+        ) from exc
 
     response: dict[str, object] = {"message": "OTP sent"}
     if settings.sms_provider == "dev" or settings.sms_debug_echo:
@@ -117,35 +135,22 @@ async def send_otp(payload: SendOTPRequest, db: AsyncSession = Depends(get_db))
     return response
 
 
-@router.post("/verify-otp", response_model=AuthResponse)
+@router.post("/verify-otp", response_model=AuthResponse, dependencies=[Depends(rate_limit(VERIFY_OTP_BY_IP))])
 async def verify_otp(payload: VerifyOTPRequest, db: AsyncSession = Depends(get_db)) -> AuthResponse:
     settings = get_settings()
     try:
         normalized_phone = normalize_phone_number(payload.phone_number)
     except ValueError as exc:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc)) from exc
+    await rate_limiter.enforce(VERIFY_OTP_BY_PHONE, normalized_phone)
 
-    stmt = (
-        select(PhoneOTP)
-        .where(PhoneOTP.phone_number == normalized_phone)
-        .order_by(PhoneOTP.created_at.desc())
-        .limit(1)
-    )
-    result = await db.execute(stmt)
-    otp = result.scalar_one_or_none()
-    if not otp:
-        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="OTP not found")
-
-    now = datetime.utcnow()
-    if otp.expires_at < now:
-        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="OTP expired")
-    if otp.attempts >= otp.max_attempts:
-        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="OTP attempt limit exceeded")
-
-    if otp.code != payload.code:
-        otp.attempts += 1
-        await db.commit()
-        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid OTP code")
+    otp_store = get_otp_store(db)
+    try:
+        await otp_store.verify(normalized_phone, payload.code)
+    except OTPError as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc)) from exc
+    except RedisError as exc:
+        raise _otp_store_unavailable() from exc
 
     user_stmt = select(User).where(User.phone_number == normalized_phone)
     user_result = await db.execute(user_stmt)
@@ -171,7 +176,7 @@ async def verify_otp(payload: VerifyOTPRequest, db: AsyncSession = Depends(get_d
             raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Role mismatch")
         _update_user_metadata(user, payload)
 
-    db.delete(otp)
+    await otp_store.discard(normalized_phone)
     await db.commit()
     await db.refresh(user)
 
@@ -195,6 +200,28 @@ async def verify_otp(payload: VerifyOTPRequest, db: AsyncSession = Depends(get_d
     )
 
 
+async def _login_failed(failures_key: str) -> NoReturn:
+    """
+    Count a failed login against the username and client IP, then reject it.
+
+    Only failures count, and per address, so guessing from one IP cannot lock the
+    account's owner out of it elsewhere.
+    """
+    await rate_limiter.hit(LOGIN_BY_USERNAME, failures_key)
+    raise HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Invalid username or password"
+    )
+
+
+def _otp_store_unavailable() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="OTP service is temporarily unavailable",
+        headers={"Retry-After": "5"},
+    )
+
+
 def _resolve_entity_type(payload: VerifyOTPRequest) -> EntityType | None:
     # EntityType doesn't have FARMER value, return None or payload.entity_type
     return payload.entity_type
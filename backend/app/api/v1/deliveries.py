@@ -6,21 +6,24 @@ from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.core.dependencies import get_current_user
+from app.core.dependencies import get_current_principal
+from app.core.instrumentation import TimedRoute
+from app.core.principals import Principal
 from app.db.session import get_db
 from app.models.delivery import Delivery, DeliveryStatus
 from app.models.order import Order
-from app.models.user import User, UserRole
+from app.models.user import UserRole
 from app.schemas.delivery import DeliveryResponse, DeliveryUpdate
+from app.services.outbox import EventType, record_event
 
-router = APIRouter(prefix="/deliveries", tags=["deliveries"])
+router = APIRouter(prefix="/deliveries", tags=["deliveries"], route_class=TimedRoute)
 
 
 @router.get("/order/{order_id}", response_model=DeliveryResponse)
 async def get_delivery_by_order(
     order_id: UUID,
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_principal),
 ) -> DeliveryResponse:
     """Get delivery information for an order."""
     stmt = select(Delivery).where(Delivery.order_id == order_id)
@@ -53,7 +56,7 @@ async def update_delivery(
     order_id: UUID,
     payload: DeliveryUpdate,
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_principal),
 ) -> DeliveryResponse:
     """Update delivery status and information."""
     if current_user.role != UserRole.ADMIN:
@@ -81,6 +84,10 @@ async def update_delivery(
             if order:
                 from app.models.order import OrderStatus
                 order.status = OrderStatus.DELIVERED
+            # Written with the status change; the outbox relay publishes it after commit
+            record_event(
+                db, EventType.DELIVERY_DELIVERED, delivery.id, order_id=order_id, delivered_at=update_data["delivered_at"]
+            )
     
     for field, value in update_data.items():
         setattr(delivery, field, value)
@@ -1,28 +1,46 @@
 from __future__ import annotations
 
 import logging
+import uuid
+from datetime import datetime
 from uuid import UUID
 
 from fastapi import APIRouter, Depends, HTTPException, Query, status
-from sqlalchemy import select, func, update as sa_update, text as sa_text
-from sqlalchemy.ext.asyncio import AsyncSession
+from fastapi.responses import StreamingResponse
+from sqlalchemy import Select, select, update as sa_update, text as sa_text
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from sqlalchemy.orm import selectinload
 
-from app.core.dependencies import get_current_user
-from app.db.session import get_db
+from app.core.config import get_settings
+from app.core.dependencies import get_current_principal
+from app.core.instrumentation import TimedRoute
+from app.core.responses import FastJSONResponse
+from app.core.principals import Principal
+from app.db.counting import CountMode, count_total, resolve_count_mode
+from app.db.session import get_db, get_read_db, get_read_sessionmaker
 from app.models.order import Order, OrderItem, OrderStatus
-from app.models.product import Product
 from app.models.user import User, UserRole
 from app.schemas.order import OrderCreate, OrderItemResponse, OrderListResponse, OrderResponse, OrderUpdate
+from app.services.catalog_cache import catalog_cache
+from app.services.inventory import ProductNotFoundError, StockReservationError, reserve_stock
+from app.services.order_export import EXPORTERS, MEDIA_TYPES, ExportFormat, OrderExportFilters
+from app.services.outbox import EventType, record_event
+from app.utils.pagination import paginate_newest_first, split_page
 
 logger = logging.getLogger(__name__)
-router = APIRouter(prefix="/orders", tags=["orders"])
+router = APIRouter(prefix="/orders", tags=["orders"], route_class=TimedRoute)
+
+
+def _orders_with_items() -> Select[tuple[Order]]:
+    """Order query that loads items for every matched order in one extra SELECT ... IN."""
+    return select(Order).options(selectinload(Order.items))
 
 
 @router.post("", response_model=OrderResponse, status_code=status.HTTP_201_CREATED)
 async def create_order(
     payload: OrderCreate,
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_principal),
 ) -> OrderResponse:
     try:
         logger.info(f"Creating order for shop {current_user.id}, farmer {payload.farmer_id}")
@@ -37,38 +55,24 @@ async def create_order(
         if not farmer:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Farmer not found")
 
-        # Validate products and calculate total
-        total_amount = 0.0
-        order_items = []
-        
-        for item_data in payload.items:
-            logger.info(f"Processing order item: product_id={item_data.product_id}, quantity={item_data.quantity}")
-            product_stmt = select(Product).where(Product.id == item_data.product_id, Product.is_active == True)
-            product_result = await db.execute(product_stmt)
-            product = product_result.scalar_one_or_none()
-            
-            if not product:
-                raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Product {item_data.product_id} not found")
-            
-            if product.farmer_id != payload.farmer_id:
-                raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Product {item_data.product_id} does not belong to this farmer")
-            
-            if product.quantity < item_data.quantity:
-                raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Insufficient quantity for product {product.name}")
-            
-            item_total = float(product.price) * item_data.quantity
-            total_amount += item_total
-            
-            order_items.append({
-                "product": product,
-                "quantity": item_data.quantity,
-                "price": float(product.price),
-            })
+        # Validate and reserve stock for all items at once
+        try:
+            reserved = await reserve_stock(
+                db,
+                farmer_id=payload.farmer_id,
+                items=[(item_data.product_id, item_data.quantity) for item_data in payload.items],
+            )
+        except ProductNotFoundError as exc:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(exc)) from exc
+        except StockReservationError as exc:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc)) from exc
 
+        total_amount = sum(reserved[item_data.product_id].price * item_data.quantity for item_data in payload.items)
         logger.info(f"Total amount calculated: {total_amount}")
 
         # Create order
         order = Order(
+            id=uuid.uuid4(),
             shop_id=current_user.id,
             farmer_id=payload.farmer_id,
             status=OrderStatus.PENDING,
@@ -76,58 +80,31 @@ async def create_order(
             delivery_address=payload.delivery_address,
             notes=payload.notes,
         )
-        db.add(order)
-        await db.flush()  # Get order.id
-        logger.info(f"Order created in DB, ID: {order.id}")
-
-        # Create order items
-        for item_data in order_items:
-            order_item = OrderItem(
-                order_id=order.id,
-                product_id=item_data["product"].id,
-                quantity=item_data["quantity"],
-                price=item_data["price"],
+        order.items = [
+            OrderItem(
+                product_id=item_data.product_id,
+                quantity=item_data.quantity,
+                price=reserved[item_data.product_id].price,
             )
-            db.add(order_item)
-        
-        await db.flush()  # Flush to get order_item IDs
-        
-        # Reduce product quantities after flush using SQL update
-        for item_data in order_items:
-            product_id = item_data["product"].id
-            quantity_to_reduce = item_data["quantity"]
-            # Reload product and update
-            product_stmt = select(Product).where(Product.id == product_id)
-            product_result = await db.execute(product_stmt)
-            product = product_result.scalar_one_or_none()
-            
-            if not product:
-                logger.error(f"Product {product_id} not found when reducing quantity")
-                await db.rollback()
-                raise HTTPException(
-                    status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                    detail=f"Product {product_id} not found"
-                )
-            
-            # Double-check quantity is still sufficient (race condition protection)
-            if product.quantity < quantity_to_reduce:
-                logger.error(f"Insufficient quantity for product {product_id}: available={product.quantity}, requested={quantity_to_reduce}")
-                await db.rollback()
-                raise HTTPException(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    detail=f"Insufficient quantity for product {product.name}"
-                )
-            
-            product.quantity -= quantity_to_reduce
-            if product.quantity < 0:
-                product.quantity = 0  # Prevent negative quantities
-
+            for item_data in payload.items
+        ]
+        db.add(order)
+        record_event(
+            db,
+            EventType.ORDER_CREATED,
+            order.id,
+            shop_id=order.shop_id,
+            farmer_id=order.farmer_id,
+            total_amount=float(total_amount),
+            items=[{"product_id": item.product_id, "quantity": item.quantity} for item in order.items],
+        )
         await db.commit()
         logger.info(f"Order committed to DB: {order.id}")
+        # Reserved stock changed the catalogue quantities
+        await catalog_cache.invalidate(reserved.keys())
         
-        # Reload order with items for response using selectinload
-        from sqlalchemy.orm import selectinload
-        order_stmt = select(Order).options(selectinload(Order.items)).where(Order.id == order.id)
+        # Reload order with items for response
+        order_stmt = _orders_with_items().where(Order.id == order.id)
         order_result = await db.execute(order_stmt)
         reloaded_order = order_result.scalar_one_or_none()
         
@@ -170,17 +147,19 @@ async def create_order(
         ) from e
 
 
-@router.get("", response_model=OrderListResponse)
+@router.get("", response_model=OrderListResponse, response_class=FastJSONResponse)
 async def list_orders(
     status_filter: OrderStatus | None = Query(None, alias="status"),
     farmer_id: UUID | None = Query(None),
     shop_id: UUID | None = Query(None),
     limit: int = Query(20, ge=1, le=100),
     offset: int = Query(0, ge=0),
-    db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    cursor: str | None = Query(None, description="Opaque next_cursor from the previous page; overrides offset"),
+    count: CountMode | None = Query(None, description="How to compute total: exact, cached, estimate or none"),
+    db: AsyncSession = Depends(get_read_db),
+    current_user: Principal = Depends(get_current_principal),
 ) -> OrderListResponse:
-    stmt = select(Order)
+    stmt = _orders_with_items()
     
     # Apply role-based filtering
     if current_user.role == UserRole.FARMER:
@@ -197,33 +176,69 @@ async def list_orders(
     if shop_id:
         stmt = stmt.where(Order.shop_id == shop_id)
     
-    count_stmt = select(func.count()).select_from(stmt.subquery())
-    total_result = await db.execute(count_stmt)
-    total = total_result.scalar_one()
+    total = await count_total(db, stmt, resolve_count_mode(count))
     
-    stmt = stmt.order_by(Order.created_at.desc()).limit(limit).offset(offset)
+    try:
+        stmt = paginate_newest_first(stmt, Order, limit=limit, offset=offset, cursor=cursor)
+    except ValueError as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc)) from exc
     result = await db.execute(stmt)
-    orders = result.scalars().all()
-    
-    # Load items for each order
-    for order in orders:
-        items_stmt = select(OrderItem).where(OrderItem.order_id == order.id)
-        items_result = await db.execute(items_stmt)
-        order.items = items_result.scalars().all()
+    orders, next_cursor = split_page(result.scalars().all(), limit)
     
     return OrderListResponse(
         items=[OrderResponse.model_validate(o) for o in orders],
         total=total,
+        has_more=next_cursor is not None,
+        next_cursor=next_cursor,
+    )
+
+
+@router.get("/export", response_class=StreamingResponse)
+async def export_orders(
+    export_format: ExportFormat = Query(ExportFormat.CSV, alias="format"),
+    created_from: datetime | None = Query(None, description="Inclusive lower bound on created_at"),
+    created_to: datetime | None = Query(None, description="Exclusive upper bound on created_at"),
+    status_filter: OrderStatus | None = Query(None, alias="status"),
+    farmer_id: UUID | None = Query(None),
+    shop_id: UUID | None = Query(None),
+    session_factory: async_sessionmaker[AsyncSession] = Depends(get_read_sessionmaker),
+    current_user: Principal = Depends(get_current_principal),
+) -> StreamingResponse:
+    """
+    Stream matching orders with their items, oldest first, for admins.
+
+    CSV has one line per item; NDJSON one object per order. Rows are read through a
+    server-side cursor, so memory use does not grow with the size of the export.
+    """
+    if current_user.role != UserRole.ADMIN:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Only admins can export orders")
+    if created_from and created_to and created_from >= created_to:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="created_from must be before created_to")
+
+    filters = OrderExportFilters(
+        created_from=created_from,
+        created_to=created_to,
+        status=status_filter,
+        farmer_id=farmer_id,
+        shop_id=shop_id,
+    )
+    logger.info(f"Admin {current_user.id} exporting orders as {export_format.value}: {filters}")
+    body = EXPORTERS[export_format](session_factory, filters, batch_size=get_settings().order_export_batch_size)
+    filename = f"orders-{datetime.utcnow():%Y%m%d-%H%M%S}.{export_format.value}"
+    return StreamingResponse(
+        body,
+        media_type=MEDIA_TYPES[export_format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
     )
 
 
-@router.get("/{order_id}", response_model=OrderResponse)
+@router.get("/{order_id}", response_model=OrderResponse, response_class=FastJSONResponse)
 async def get_order(
     order_id: UUID,
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_principal),
 ) -> OrderResponse:
-    stmt = select(Order).where(Order.id == order_id)
+    stmt = _orders_with_items().where(Order.id == order_id)
     result = await db.execute(stmt)
     order = result.scalar_one_or_none()
     
@@ -234,10 +249,6 @@ async def get_order(
     if current_user.role not in (UserRole.ADMIN,) and order.shop_id != current_user.id and order.farmer_id != current_user.id:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not authorized to view this order")
     
-    items_stmt = select(OrderItem).where(OrderItem.order_id == order.id)
-    items_result = await db.execute(items_stmt)
-    order.items = items_result.scalars().all()
-    
     return OrderResponse.model_validate(order)
 
 
@@ -246,7 +257,7 @@ async def update_order(
     order_id: UUID,
     payload: OrderUpdate,
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_principal),
 ) -> OrderResponse:
     stmt = select(Order).where(Order.id == order_id)
     result = await db.execute(stmt)
@@ -277,10 +288,10 @@ async def update_order(
         setattr(order, field, value)
     
     await db.commit()
-    await db.refresh(order)
     
-    items_stmt = select(OrderItem).where(OrderItem.order_id == order.id)
-    items_result = await db.execute(items_stmt)
-    order.items = items_result.scalars().all()
+    # Re-read the order together with its items
+    reload_stmt = _orders_with_items().where(Order.id == order.id).execution_options(populate_existing=True)
+    reload_result = await db.execute(reload_stmt)
+    order = reload_result.scalar_one()
     
     return OrderResponse.model_validate(order)
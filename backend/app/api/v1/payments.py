@@ -2,26 +2,31 @@ from __future__ import annotations
 
 from uuid import UUID
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.core.dependencies import get_current_user
-from app.db.session import get_db
+from app.core.dependencies import get_current_principal
+from app.core.instrumentation import TimedRoute
+from app.core.responses import FastJSONResponse
+from app.core.principals import Principal
+from app.db.session import get_db, get_read_db
 from app.models.order import Order
 from app.models.transaction import PaymentProvider, Transaction, TransactionStatus
-from app.models.user import User, UserRole
+from app.models.user import UserRole
 from app.schemas.transaction import PaymentInitRequest, PaymentInitResponse, TransactionResponse
 from app.services.payments.factory import get_payment_adapter
+from app.services.payments.webhooks import InvalidWebhookError, get_webhook_worker, store_webhook_event
+from app.utils.pagination import NEXT_CURSOR_HEADER, paginate_newest_first, split_page
 
-router = APIRouter(prefix="/payments", tags=["payments"])
+router = APIRouter(prefix="/payments", tags=["payments"], route_class=TimedRoute)
 
 
 @router.post("/init", response_model=PaymentInitResponse)
 async def init_payment(
     payload: PaymentInitRequest,
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_principal),
 ) -> PaymentInitResponse:
     """Initialize payment for an order."""
     # Verify order exists and belongs to user
@@ -78,13 +83,17 @@ async def init_payment(
     )
 
 
-@router.get("/transactions", response_model=list[TransactionResponse])
+@router.get("/transactions", response_model=list[TransactionResponse], response_class=FastJSONResponse)
 async def list_transactions(
+    response: Response,
     order_id: UUID | None = None,
-    db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    limit: int = Query(100, ge=1, le=1000),
+    offset: int = Query(0, ge=0),
+    cursor: str | None = Query(None, description="Opaque cursor from the X-Next-Cursor header; overrides offset"),
+    db: AsyncSession = Depends(get_read_db),
+    current_user: Principal = Depends(get_current_principal),
 ) -> list[TransactionResponse]:
-    """List transactions for current user."""
+    """List transactions for current user. The cursor of the next page is sent in the X-Next-Cursor header."""
     stmt = select(Transaction)
     
     if order_id:
@@ -98,8 +107,14 @@ async def list_transactions(
     elif current_user.role != UserRole.ADMIN:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not authorized")
     
-    result = await db.execute(stmt.order_by(Transaction.created_at.desc()))
-    transactions = result.scalars().all()
+    try:
+        stmt = paginate_newest_first(stmt, Transaction, limit=limit, offset=offset, cursor=cursor)
+    except ValueError as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc)) from exc
+    result = await db.execute(stmt)
+    transactions, next_cursor = split_page(result.scalars().all(), limit)
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
     
     return [TransactionResponse.model_validate(t) for t in transactions]
 
@@ -107,44 +122,19 @@ async def list_transactions(
 @router.post("/webhooks/{provider}")
 async def process_webhook(
     provider: PaymentProvider,
-    payload: dict,
+    request: Request,
     db: AsyncSession = Depends(get_db),
 ) -> dict:
-    """Process webhook from payment provider."""
+    """
+    Store a provider callback and acknowledge it; the webhook worker applies it.
+
+    Retries of an already stored event are acknowledged without storing it again.
+    """
     try:
-        adapter = get_payment_adapter(provider)
-        webhook_data = await adapter.process_webhook(payload)
-        
-        # Update transaction status
-        if "transaction_id" in webhook_data:
-            try:
-                transaction_id = UUID(webhook_data["transaction_id"])
-            except (ValueError, TypeError):
-                return {"status": "error", "detail": "Invalid transaction_id"}
-            
-            stmt = select(Transaction).where(Transaction.id == transaction_id)
-            result = await db.execute(stmt)
-            transaction = result.scalar_one_or_none()
-            
-            if transaction:
-                if webhook_data.get("status") == "completed":
-                    transaction.status = TransactionStatus.COMPLETED
-                    # Update order status if payment successful
-                    order_stmt = select(Order).where(Order.id == transaction.order_id)
-                    order_result = await db.execute(order_stmt)
-                    order = order_result.scalar_one_or_none()
-                    if order:
-                        from app.models.order import OrderStatus
-                        if order.status == OrderStatus.PENDING:
-                            order.status = OrderStatus.CONFIRMED
-                elif webhook_data.get("status") == "failed":
-                    transaction.status = TransactionStatus.FAILED
-                
-                await db.commit()
-            else:
-                return {"status": "error", "detail": "Transaction not found"}
-        
-        return {"status": "ok"}
-    except Exception as e:
-        await db.rollback()
-        return {"status": "error", "detail": str(e)}
+        stored = await store_webhook_event(db, provider, await request.body())
+    except InvalidWebhookError as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc)) from exc
+    await db.commit()
+    if stored:
+        get_webhook_worker().notify()
+    return {"status": "ok"}
@@ -3,25 +3,50 @@ from __future__ import annotations
 import logging
 from uuid import UUID
 
-from fastapi import APIRouter, Depends, HTTPException, Query, status
-from sqlalchemy import select, func
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.core.dependencies import get_current_user
-from app.db.session import get_db
+from app.core.config import get_settings
+from app.core.dependencies import get_current_principal
+from app.core.instrumentation import TimedRoute
+from app.core.rate_limit import CATALOGUE, rate_limit, user_or_ip
+from app.core.responses import FastJSONResponse
+from app.core.principals import Principal
+from app.db.counting import CountMode, count_total, resolve_count_mode
+from app.db.session import get_db, get_read_db
 from app.models.product import Product, ProductCategory
-from app.models.user import User, UserRole
-from app.schemas.product import ProductCreate, ProductListResponse, ProductResponse, ProductUpdate
+from app.models.user import UserRole
+from app.schemas.product import (
+    ProductBulkUpdate,
+    ProductBulkUpdateResponse,
+    ProductCreate,
+    ProductImportResponse,
+    ProductImportRowError,
+    ProductListResponse,
+    ProductResponse,
+    ProductUpdate,
+)
+from app.services.catalog_cache import catalog_cache
+from app.services.product_import import IMPORT_FORMATS, ImportFormatError, import_products as import_product_records
+from app.services.product_updates import (
+    ProductChange,
+    ProductsNotFoundError,
+    ProductsNotOwnedError,
+    apply_product_changes,
+)
+from app.services.search import apply_product_search
+from app.utils.pagination import paginate_newest_first, split_page
 
 logger = logging.getLogger(__name__)
-router = APIRouter(prefix="/products", tags=["products"])
+router = APIRouter(prefix="/products", tags=["products"], route_class=TimedRoute)
 
 
 @router.post("", response_model=ProductResponse, status_code=status.HTTP_201_CREATED)
 async def create_product(
     payload: ProductCreate,
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_principal),
 ) -> ProductResponse:
     if current_user.role != UserRole.FARMER:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Only farmers can create products")
@@ -42,6 +67,7 @@ async def create_product(
         await db.commit()
         await db.refresh(product)
         logger.info(f"Product created successfully: {product.id}")
+        await catalog_cache.invalidate()
         return ProductResponse.model_validate(product)
     except Exception as e:
         logger.error(f"Error creating product: {e}", exc_info=True)
@@ -52,7 +78,68 @@ async def create_product(
         ) from e
 
 
-@router.get("", response_model=ProductListResponse)
+@router.post("/import", response_model=ProductImportResponse)
+async def import_products(
+    request: Request,
+    db: AsyncSession = Depends(get_db),
+    current_user: Principal = Depends(get_current_principal),
+) -> ProductImportResponse:
+    """
+    Create or update the farmer's products from a CSV (``text/csv``) or NDJSON
+    (``application/x-ndjson``) body, matched by name.
+
+    The body is parsed as it arrives and written in batches in one transaction; invalid
+    rows are skipped and listed in ``errors`` with their line numbers.
+    """
+    if current_user.role != UserRole.FARMER:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Only farmers can import products")
+
+    content_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+    parse = IMPORT_FORMATS.get(content_type)
+    if parse is None:
+        raise HTTPException(
+            status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            detail=f"Expected one of: {', '.join(IMPORT_FORMATS)}",
+        )
+
+    settings = get_settings()
+    try:
+        result = await import_product_records(
+            db,
+            farmer_id=current_user.id,
+            records=parse(request.stream()),
+            batch_size=settings.product_import_batch_size,
+            max_errors=settings.product_import_max_errors,
+        )
+        await db.commit()
+    except ImportFormatError as e:
+        await db.rollback()
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e)) from e
+    except Exception as e:
+        logger.error(f"Error importing products: {e}", exc_info=True)
+        await db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to import products: {str(e)}"
+        ) from e
+
+    if result.created or result.updated:
+        await catalog_cache.invalidate(result.updated_ids)
+    return ProductImportResponse(
+        created=result.created,
+        updated=result.updated,
+        failed=result.failed,
+        errors=[ProductImportRowError(line=error.line, message=error.message) for error in result.errors],
+        errors_truncated=result.errors_truncated,
+    )
+
+
+@router.get(
+    "",
+    response_model=ProductListResponse,
+    response_class=FastJSONResponse,
+    dependencies=[Depends(rate_limit(CATALOGUE, key=user_or_ip))],
+)
 async def list_products(
     category: ProductCategory | None = Query(None),
     farmer_id: UUID | None = Query(None),
@@ -61,7 +148,40 @@ async def list_products(
     search: str | None = Query(None),
     limit: int = Query(20, ge=1, le=100),
     offset: int = Query(0, ge=0),
-    db: AsyncSession = Depends(get_db),
+    cursor: str | None = Query(None, description="Opaque next_cursor from the previous page; overrides offset"),
+    count: CountMode | None = Query(None, description="How to compute total: exact, cached, estimate or none"),
+    db: AsyncSession = Depends(get_read_db),
+) -> ProductListResponse:
+    count_mode = resolve_count_mode(count)
+    filters = dict(
+        category=category,
+        farmer_id=farmer_id,
+        min_price=min_price,
+        max_price=max_price,
+        search=search,
+        limit=limit,
+        offset=offset,
+        cursor=cursor,
+    )
+    return await catalog_cache.get_list(
+        {**filters, "count": count_mode},
+        ProductListResponse,
+        lambda: _load_product_list(db, count_mode=count_mode, **filters),
+    )
+
+
+async def _load_product_list(
+    db: AsyncSession,
+    *,
+    category: ProductCategory | None,
+    farmer_id: UUID | None,
+    min_price: float | None,
+    max_price: float | None,
+    search: str | None,
+    limit: int,
+    offset: int,
+    cursor: str | None,
+    count_mode: CountMode,
 ) -> ProductListResponse:
     stmt = select(Product).where(Product.is_active == True)
     
@@ -73,29 +193,79 @@ async def list_products(
         stmt = stmt.where(Product.price >= min_price)
     if max_price is not None:
         stmt = stmt.where(Product.price <= max_price)
+    rank = None
     if search:
-        search_pattern = f"%{search}%"
-        stmt = stmt.where(Product.name.ilike(search_pattern) | Product.description.ilike(search_pattern))
+        stmt, rank = apply_product_search(stmt, search, dialect_name=db.get_bind().dialect.name)
     
-    count_stmt = select(func.count()).select_from(stmt.subquery())
-    total_result = await db.execute(count_stmt)
-    total = total_result.scalar_one()
+    total = await count_total(db, stmt, count_mode)
     
-    stmt = stmt.order_by(Product.created_at.desc()).limit(limit).offset(offset)
+    if rank is not None:
+        # Relevance-ranked results have no stable (created_at, id) position to resume from
+        if cursor:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Cursor pagination is not supported for search results, use offset",
+            )
+        stmt = stmt.order_by(rank.desc(), Product.created_at.desc(), Product.id.desc()).limit(limit + 1).offset(offset)
+    else:
+        try:
+            stmt = paginate_newest_first(stmt, Product, limit=limit, offset=offset, cursor=cursor)
+        except ValueError as exc:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc)) from exc
     result = await db.execute(stmt)
-    products = result.scalars().all()
+    products, next_cursor = split_page(result.scalars().all(), limit)
+    has_more = next_cursor is not None
+    if rank is not None:
+        next_cursor = None
     
     return ProductListResponse(
         items=[ProductResponse.model_validate(p) for p in products],
         total=total,
+        has_more=has_more,
+        next_cursor=next_cursor,
     )
 
 
-@router.get("/{product_id}", response_model=ProductResponse)
+@router.patch("", response_model=ProductBulkUpdateResponse)
+async def bulk_update_products(
+    payload: ProductBulkUpdate,
+    db: AsyncSession = Depends(get_db),
+    current_user: Principal = Depends(get_current_principal),
+) -> ProductBulkUpdateResponse:
+    """Update price, quantity and availability of many products in one statement; all or nothing."""
+    if current_user.role not in (UserRole.FARMER, UserRole.ADMIN):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Only farmers and admins can update products")
+
+    changes = [ProductChange(**item.model_dump()) for item in payload.items]
+    owner_id = None if current_user.role == UserRole.ADMIN else current_user.id
+    try:
+        products = await apply_product_changes(db, changes=changes, owner_id=owner_id)
+    except ProductsNotFoundError as e:
+        await db.rollback()
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e)) from e
+    except ProductsNotOwnedError as e:
+        await db.rollback()
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail=str(e)) from e
+    response = ProductBulkUpdateResponse(items=[ProductResponse.model_validate(product) for product in products])
+    await db.commit()
+    await catalog_cache.invalidate([product.id for product in products])
+    return response
+
+
+@router.get(
+    "/{product_id}",
+    response_model=ProductResponse,
+    response_class=FastJSONResponse,
+    dependencies=[Depends(rate_limit(CATALOGUE, key=user_or_ip))],
+)
 async def get_product(
     product_id: UUID,
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
 ) -> ProductResponse:
+    return await catalog_cache.get_product(product_id, ProductResponse, lambda: _load_product(db, product_id))
+
+
+async def _load_product(db: AsyncSession, product_id: UUID) -> ProductResponse:
     stmt = select(Product).where(Product.id == product_id, Product.is_active == True)
     result = await db.execute(stmt)
     product = result.scalar_one_or_none()
@@ -111,7 +281,7 @@ async def update_product(
     product_id: UUID,
     payload: ProductUpdate,
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_principal),
 ) -> ProductResponse:
     stmt = select(Product).where(Product.id == product_id)
     result = await db.execute(stmt)
@@ -129,6 +299,7 @@ async def update_product(
     
     await db.commit()
     await db.refresh(product)
+    await catalog_cache.invalidate([product.id])
     return ProductResponse.model_validate(product)
 
 
@@ -136,7 +307,7 @@ async def update_product(
 async def delete_product(
     product_id: UUID,
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_principal),
 ) -> None:
     stmt = select(Product).where(Product.id == product_id)
     result = await db.execute(stmt)
@@ -169,3 +340,4 @@ async def delete_product(
     
     await db.delete(product)
     await db.commit()
+    await catalog_cache.invalidate([product_id])
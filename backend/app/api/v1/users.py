@@ -2,20 +2,24 @@ from __future__ import annotations
 
 from uuid import UUID
 
-from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
 from sqlalchemy import select, func
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.api.v1.auth import _map_user_profile
-from app.core.dependencies import get_current_user
-from app.db.session import get_db
+from app.core.dependencies import get_current_principal, get_current_user
+from app.core.instrumentation import TimedRoute
+from app.core.responses import FastJSONResponse
+from app.core.principals import Principal, principal_cache
+from app.db.session import get_db, get_read_db
 from app.models.user import User, UserRole
-from app.schemas.user import UserResponse, UserUpdateRequest
+from app.schemas.user import UserResponse, UserStatusUpdate, UserUpdateRequest
+from app.utils.pagination import NEXT_CURSOR_HEADER, paginate_newest_first, split_page
 
-router = APIRouter(prefix="/users", tags=["users"])
+router = APIRouter(prefix="/users", tags=["users"], route_class=TimedRoute)
 
 
-@router.get("/me", response_model=UserResponse)
+@router.get("/me", response_model=UserResponse, response_class=FastJSONResponse)
 async def get_me(current_user: User = Depends(get_current_user)) -> UserResponse:
     return _map_user_profile(current_user)
 
@@ -36,18 +40,21 @@ async def update_me(
 
     await db.commit()
     await db.refresh(current_user)
+    await principal_cache.invalidate(current_user.id)
     return _map_user_profile(current_user)
 
 
-@router.get("", response_model=list[UserResponse])
+@router.get("", response_model=list[UserResponse], response_class=FastJSONResponse)
 async def list_users(
+    response: Response,
     role: UserRole | None = Query(None),
     limit: int = Query(100, ge=1, le=1000),
     offset: int = Query(0, ge=0),
-    db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    cursor: str | None = Query(None, description="Opaque cursor from the X-Next-Cursor header; overrides offset"),
+    db: AsyncSession = Depends(get_read_db),
+    current_user: Principal = Depends(get_current_principal),
 ) -> list[UserResponse]:
-    """List users (admin only)."""
+    """List users (admin only). The cursor of the next page is sent in the X-Next-Cursor header."""
     if current_user.role != UserRole.ADMIN:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Only admins can list users")
     
@@ -56,8 +63,37 @@ async def list_users(
     if role:
         stmt = stmt.where(User.role == role)
     
-    stmt = stmt.order_by(User.created_at.desc()).limit(limit).offset(offset)
+    try:
+        stmt = paginate_newest_first(stmt, User, limit=limit, offset=offset, cursor=cursor)
+    except ValueError as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc)) from exc
     result = await db.execute(stmt)
-    users = result.scalars().all()
+    users, next_cursor = split_page(result.scalars().all(), limit)
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
     
     return [_map_user_profile(user) for user in users]
+
+
+@router.patch("/{user_id}/status", response_model=UserResponse)
+async def update_user_status(
+    user_id: UUID,
+    payload: UserStatusUpdate,
+    db: AsyncSession = Depends(get_db),
+    current_user: Principal = Depends(get_current_principal),
+) -> UserResponse:
+    """Activate or deactivate a user (admin only); the cached principal is dropped on commit."""
+    if current_user.role != UserRole.ADMIN:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Only admins can change user status")
+    if user_id == current_user.id:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Admins cannot change their own status")
+
+    user = await db.get(User, user_id)
+    if not user:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
+
+    user.is_active = payload.is_active
+    await db.commit()
+    await db.refresh(user)
+    await principal_cache.invalidate(user.id)
+    return _map_user_profile(user)
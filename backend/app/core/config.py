@@ -1,5 +1,6 @@
+import ipaddress
 from functools import lru_cache
-from typing import List
+from typing import List, Literal
 
 from pydantic import Field
 from pydantic_settings import BaseSettings
@@ -12,6 +13,15 @@ class Settings(BaseSettings):
     access_token_expire_minutes: int = 30
     refresh_token_expire_minutes: int = 60 * 24 * 30
     database_url: str = Field(..., alias="DATABASE_URL")
+    # Optional read replica for read-only GET endpoints
+    database_read_url: str | None = Field(default=None, alias="DATABASE_READ_URL")
+    database_pool_size: int = 5
+    database_max_overflow: int = 10
+    database_pool_timeout_seconds: float = 30.0
+    database_pool_recycle_seconds: int = 1800
+    database_pool_pre_ping: bool = True
+    # Prepared statements cached per connection; set to 0 behind PgBouncer in transaction mode
+    database_statement_cache_size: int = 100
     redis_url: str = Field(..., alias="REDIS_URL")
     api_host: str = Field(default="0.0.0.0", alias="API_HOST")
     api_port: int = Field(default=8000, alias="API_PORT")
@@ -19,15 +29,115 @@ class Settings(BaseSettings):
     otp_expiration_minutes: int = 5
     otp_attempt_limit: int = 5
     otp_resend_interval_seconds: int = 60
+    # Where OTP codes live: "redis" (keys with TTL) or "database" (phone_otps table)
+    otp_store_backend: str = "redis"
     sms_provider: str = "dev"
     sms_debug_echo: bool = True
+    # SMS dispatch queue: "redis" (durable stream) or "memory" (per process, dev only)
+    sms_queue_backend: str = "redis"
+    # Run the dispatcher inside each API worker; disable when running scripts/sms_worker.py
+    sms_worker_enabled: bool = True
+    sms_batch_size: int = 50
+    sms_max_attempts: int = 5
+    sms_retry_backoff_seconds: float = 2.0
+    sms_retry_backoff_max_seconds: float = 300.0
+    # Rate limits as "<count>/<period>" ("5/minute", "10/15minutes"); "memory" counts per worker
+    rate_limit_enabled: bool = True
+    rate_limit_backend: str = "redis"
+    rate_limit_memory_keys: int = 100_000
+    rate_limit_login_ip: str = "20/15minutes"
+    rate_limit_login_username: str = "5/15minutes"
+    rate_limit_send_otp_ip: str = "10/15minutes"
+    rate_limit_verify_otp_ip: str = "30/15minutes"
+    rate_limit_verify_otp_phone: str = "10/15minutes"
+    # Token bucket per user, or per IP for anonymous callers, on GET /products and /products/{id}
+    rate_limit_catalogue: str = "20/second"
+    rate_limit_catalogue_burst: int = 100
     payment_mock_mode: bool = Field(default=True, alias="PAYMENT_MOCK_MODE")
+    payme_merchant_id: str = ""
+    payme_key: str = ""
+    # One pooled keep-alive client per payment provider; limits apply to each provider separately
+    payment_http2: bool = True
+    payment_http_max_connections: int = 20
+    payment_http_max_keepalive_connections: int = 10
+    payment_http_keepalive_expiry_seconds: float = 30.0
+    payment_http_connect_timeout_seconds: float = 3.0
+    payment_http_read_timeout_seconds: float = 15.0
+    payment_http_pool_timeout_seconds: float = 5.0
+    # Stored payment webhooks: applied by a worker in each API process unless disabled
+    payment_webhook_worker_enabled: bool = True
+    payment_webhook_batch_size: int = 100
+    payment_webhook_poll_interval_seconds: float = 1.0
+    # Stale pending payments: run in one API process when enabled, or via scripts/reconcile_payments.py
+    payment_reconciliation_enabled: bool = False
+    payment_reconciliation_interval_seconds: float = 300.0
+    payment_reconciliation_stale_minutes: int = 15
+    # Still pending at the provider after this long: cancelled; 0 keeps them pending
+    payment_reconciliation_expire_minutes: int = 24 * 60
+    payment_reconciliation_batch_size: int = 200
+    payment_reconciliation_concurrency: int = 5
+    # Domain events (order.created, payment.completed, delivery.delivered) go through the
+    # outbox table; the relay publishes them to a Redis stream or, with "memory", keeps them in process
+    outbox_publisher_backend: str = "redis"
+    outbox_stream_key: str = "events:outbox"
+    outbox_stream_maxlen: int = 100_000
+    # Run the relay inside each API worker; disable when running scripts/outbox_relay.py
+    outbox_relay_enabled: bool = True
+    outbox_batch_size: int = 200
+    outbox_poll_interval_seconds: float = 1.0
+    # Published events are deleted after this long; 0 keeps them
+    outbox_retention_hours: int = 72
+    # Default total-count mode for list endpoints (app.db.counting.CountMode); a typo fails at startup
+    list_count_mode: Literal["exact", "cached", "estimate", "none"] = "exact"
+    list_count_cache_ttl_seconds: int = 30
+    list_count_cache_size: int = 1024
+    # Typo-tolerant product search via pg_trgm (PostgreSQL only; needs the extension)
+    product_search_trigram: bool = True
+    redis_socket_timeout_seconds: float = 0.5
+    # Read-through cache for GET /products: short-lived in-process tier in front of Redis
+    catalog_cache_enabled: bool = True
+    catalog_cache_ttl_seconds: int = 60
+    catalog_cache_local_ttl_seconds: float = 5.0
+    catalog_cache_local_size: int = 1024
+    # Authenticated principals (id, role, is_active) cached per worker, optionally shared via Redis
+    principal_cache_ttl_seconds: float = 10.0
+    principal_cache_size: int = 10000
+    principal_cache_redis: bool = False
+    principal_cache_redis_ttl_seconds: int = 300
+    # bcrypt runs on its own thread pool; extra logins beyond the queue limit get 503
+    password_hash_workers: int = 2
+    password_hash_max_pending: int = 32
+    # Prometheus /metrics; with several workers, point them at a shared empty directory
+    metrics_enabled: bool = True
+    metrics_multiproc_dir: str | None = None
+    metrics_flush_interval_seconds: float = 5.0
+    # /metrics and /health/db answer only these peers (comma-separated addresses or CIDRs, "*" for any), others get 404
+    ops_allowed_networks: str = "127.0.0.1/32,::1/128"
+    # Debug/staging: Server-Timing headers and warnings for statements repeated per request (N+1)
+    query_debug: bool = False
+    query_debug_repeat_threshold: int = 5
+    # POST /products/import: rows written per INSERT/UPDATE batch, row errors returned in detail
+    product_import_batch_size: int = 500
+    product_import_max_errors: int = 100
+    # GET /orders/export: rows fetched per round trip from the server-side cursor
+    order_export_batch_size: int = 1000
 
     class Config:
         env_file = ".env"
         env_file_encoding = "utf-8"
         populate_by_name = True
 
+    @property
+    def ops_allowed_networks_list(self) -> List[ipaddress.IPv4Network | ipaddress.IPv6Network]:
+        """Parsed OPS_ALLOWED_NETWORKS; "*" is every IPv4 and IPv6 address"""
+        if self.ops_allowed_networks.strip() == "*":
+            return [ipaddress.ip_network("0.0.0.0/0"), ipaddress.ip_network("::/0")]
+        return [
+            ipaddress.ip_network(network.strip(), strict=False)
+            for network in self.ops_allowed_networks.split(",")
+            if network.strip()
+        ]
+
     @property
     def allowed_hosts_list(self) -> List[str]:
         """Get allowed hosts as string list for CORS"""
@@ -0,0 +1,346 @@
+"""Request and database instrumentation feeding the process-wide metrics registry."""
+
+from __future__ import annotations
+
+import asyncio
+import functools
+import logging
+import re
+import time
+from collections import Counter
+from collections.abc import Callable
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Iterator
+
+from fastapi.datastructures import DefaultPlaceholder
+from fastapi.routing import APIRoute, request_response
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.config import get_settings
+from app.core.metrics import Histogram, Labels, MetricsRegistry, SnapshotDirectory, merge_snapshots, render_text
+from app.core.responses import FastJSONResponse, render_with_fast_json
+from app.db import session as db_session
+from app.db.pool import InstrumentedAsyncQueuePool
+from app.services.catalog_cache import catalog_cache
+
+logger = logging.getLogger(__name__)
+
+# Label for requests that matched no route (404s), so scanners cannot blow up cardinality
+UNMATCHED_ROUTE = "unmatched"
+# Label for queries issued outside a request, e.g. by scripts or background tasks
+BACKGROUND_ROUTE = "background"
+
+registry = MetricsRegistry()
+registry.describe("http_request_duration_seconds", "histogram", "HTTP request latency by route template and status.")
+registry.describe("db_queries_total", "counter", "SQL statements executed, attributed to the current route.")
+registry.describe("db_query_duration_seconds", "histogram", "SQL statement execution time by route.")
+registry.describe("db_pool_size", "gauge", "Configured pool size.")
+registry.describe("db_pool_checked_out", "gauge", "Connections currently checked out of the pool.")
+registry.describe("db_pool_overflow", "gauge", "Connections open beyond the pool size.")
+registry.describe("db_pool_checkout_timeouts_total", "counter", "Checkouts that gave up after the pool timeout.")
+registry.describe("db_pool_checkout_wait_seconds", "histogram", "Time spent waiting for a pool connection.")
+registry.describe("catalog_cache_lookups_total", "counter", "Catalogue cache lookups by result.")
+
+
+@dataclass(slots=True)
+class RequestContext:
+    """Per-request state shared by the middleware and the database hooks."""
+
+    scope: Scope
+    db_queries: int = 0
+    db_seconds: float = 0.0
+    started: float = field(default_factory=time.perf_counter)
+    # Set by TimedRoute when the endpoint returns; the rest is response serialization
+    endpoint_finished: float | None = None
+
+    @property
+    def route(self) -> str:
+        # FastAPI stores the matched route in the scope before calling the endpoint
+        route = self.scope.get("route")
+        return getattr(route, "path", None) or UNMATCHED_ROUTE
+
+
+_request_context: ContextVar[RequestContext | None] = ContextVar("request_context", default=None)
+
+
+_NORMALIZE_PATTERNS = (
+    (re.compile(r"'(?:[^']|'')*'"), "?"),  # string literals
+    (re.compile(r"\$\d+|\b\d+(?:\.\d+)?\b"), "?"),  # numbered placeholders and numbers
+    (re.compile(r"\(\s*\?(?:\s*,\s*\?)*\s*\)"), "(...)"),  # IN lists of any length
+    (re.compile(r"\s+"), " "),
+)
+
+
+def normalize_statement(statement: str) -> str:
+    """Statement text with literals and IN-list lengths erased, to group repeats of one query."""
+    for pattern, replacement in _NORMALIZE_PATTERNS:
+        statement = pattern.sub(replacement, statement)
+    return statement.strip()
+
+
+@dataclass(slots=True)
+class QueryLog:
+    """Statements executed while the log is active, for budgets and N+1 detection."""
+
+    statements: list[str] = field(default_factory=list)
+    seconds: float = 0.0
+
+    def __len__(self) -> int:
+        return len(self.statements)
+
+    def record(self, statement: str, elapsed: float) -> None:
+        self.statements.append(statement)
+        self.seconds += elapsed
+
+    def repeated(self, threshold: int) -> list[tuple[str, int]]:
+        """Statements run at least ``threshold`` times with different parameters, most frequent first."""
+        counts = Counter(normalize_statement(statement) for statement in self.statements)
+        return [(statement, count) for statement, count in counts.most_common() if count >= threshold]
+
+    def describe(self) -> str:
+        lines = [f"{len(self)} statements:"]
+        for statement, count in Counter(normalize_statement(s) for s in self.statements).most_common():
+            lines.append(f"  {count}x {statement[:300]}")
+        return "\n".join(lines)
+
+
+_query_log: ContextVar[QueryLog | None] = ContextVar("query_log", default=None)
+
+
+class QueryBudgetExceeded(AssertionError):
+    """A block ran more SQL statements than it was allowed, or repeated one per row."""
+
+
+@contextmanager
+def query_budget(max_queries: int, *, repeat_threshold: int | None = None) -> Iterator[QueryLog]:
+    """
+    Fail if the block executes more than ``max_queries`` statements.
+
+    With ``repeat_threshold`` it also fails when one statement runs that many times with
+    different parameters, the usual shape of an N+1 loop. Only engines passed to
+    ``instrument_engine`` are counted.
+    """
+    log = QueryLog()
+    token = _query_log.set(log)
+    try:
+        yield log
+    finally:
+        _query_log.reset(token)
+    if len(log) > max_queries:
+        raise QueryBudgetExceeded(f"Query budget of {max_queries} exceeded with {log.describe()}")
+    if repeat_threshold is not None and log.repeated(repeat_threshold):
+        raise QueryBudgetExceeded(f"Repeated statements (N+1) with {log.describe()}")
+
+
+class MetricsMiddleware:
+    """
+    Records request latency per method, route template and status.
+
+    A pure ASGI middleware rather than ``BaseHTTPMiddleware``, which would run the
+    endpoint in a separate task and lose the request context the database hooks read.
+    With ``server_timing`` (the QUERY_DEBUG mode) it also adds a ``Server-Timing``
+    header and logs statements that a request repeats ``repeat_threshold`` times.
+    """
+
+    def __init__(self, app: ASGIApp, *, server_timing: bool = False, repeat_threshold: int = 5) -> None:
+        self.app = app
+        self.server_timing = server_timing
+        self.repeat_threshold = repeat_threshold
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        context = RequestContext(scope)
+        token = _request_context.set(context)
+        query_log = QueryLog() if self.server_timing else None
+        log_token = _query_log.set(query_log) if query_log is not None else None
+        status_code = 500
+
+        async def send_with_status(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                if query_log is not None:
+                    header = (b"server-timing", server_timing_header(context).encode("latin-1"))
+                    message = {**message, "headers": [*message.get("headers", []), header]}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            _request_context.reset(token)
+            if log_token is not None:
+                _query_log.reset(log_token)
+            labels = (("method", scope["method"]), ("route", context.route), ("status", str(status_code)))
+            registry.histogram("http_request_duration_seconds", labels).observe(time.perf_counter() - context.started)
+            if query_log is not None:
+                for statement, count in query_log.repeated(self.repeat_threshold):
+                    logger.warning(f"Possible N+1 in {scope['method']} {context.route}: {count}x {statement[:300]}")
+
+
+def server_timing_header(context: RequestContext) -> str:
+    """``Server-Timing`` value with database, serialization and total time so far, in ms."""
+    now = time.perf_counter()
+    metrics = [f'db;dur={context.db_seconds * 1000:.1f};desc="{context.db_queries} queries"']
+    if context.endpoint_finished is not None:
+        metrics.append(f"serialize;dur={(now - context.endpoint_finished) * 1000:.1f}")
+    metrics.append(f"total;dur={(now - context.started) * 1000:.1f}")
+    return ", ".join(metrics)
+
+
+def _mark_endpoint_finished(call: Callable[..., Any]) -> Callable[..., Any]:
+    def finished() -> None:
+        context = _request_context.get()
+        if context is not None:
+            context.endpoint_finished = time.perf_counter()
+
+    if asyncio.iscoroutinefunction(call):
+
+        @functools.wraps(call)
+        async def timed_async(*args: Any, **kwargs: Any) -> Any:
+            try:
+                return await call(*args, **kwargs)
+            finally:
+                finished()
+
+        return timed_async
+
+    @functools.wraps(call)
+    def timed(*args: Any, **kwargs: Any) -> Any:
+        try:
+            return call(*args, **kwargs)
+        finally:
+            finished()
+
+    return timed
+
+
+class TimedRoute(APIRoute):
+    """
+    Route that notes when its endpoint returns.
+
+    The dependant is built from the original endpoint first, so parameter resolution is
+    unaffected; only the call that runs the endpoint is wrapped. Routes declared with
+    ``response_class=FastJSONResponse`` also have the result rendered in one pass,
+    skipping FastAPI's re-validation against ``response_model``.
+    """
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        call = _mark_endpoint_finished(self.dependant.call)
+        response_class = self.response_class
+        if isinstance(response_class, DefaultPlaceholder):
+            response_class = response_class.value
+        if isinstance(response_class, type) and issubclass(response_class, FastJSONResponse):
+            # Outside the timing mark, so rendering still counts as serialization
+            call = render_with_fast_json(call, self.response_model, self.status_code)
+        self.dependant.call = call
+        self.app = request_response(self.get_route_handler())
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    elapsed = time.perf_counter() - conn.info["query_started"].pop()
+    request = _request_context.get()
+    if request is None:
+        route = BACKGROUND_ROUTE
+    else:
+        route = request.route
+        request.db_queries += 1
+        request.db_seconds += elapsed
+    query_log = _query_log.get()
+    if query_log is not None:
+        query_log.record(statement, elapsed)
+    labels = (("route", route),)
+    registry.inc("db_queries_total", labels)
+    registry.histogram("db_query_duration_seconds", labels).observe(elapsed)
+
+
+def _handle_error(exception_context) -> None:
+    # after_cursor_execute does not run for failed statements; drop their start time
+    connection = exception_context.connection
+    if connection is not None and connection.info.get("query_started"):
+        connection.info["query_started"].pop()
+
+
+def instrument_engine(engine: AsyncEngine) -> None:
+    """Attribute the engine's queries to the current route; safe to call more than once."""
+    sync_engine = engine.sync_engine
+    if event.contains(sync_engine, "after_cursor_execute", _after_cursor_execute):
+        return
+    event.listen(sync_engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(sync_engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(sync_engine, "handle_error", _handle_error)
+
+
+def _collect_pools() -> Iterator[tuple[str, Labels, float | Histogram]]:
+    engines = {"primary": db_session.engine, "replica": db_session.read_engine}
+    for name, engine in engines.items():
+        if engine is None:
+            continue
+        pool = engine.sync_engine.pool
+        if not isinstance(pool, InstrumentedAsyncQueuePool):
+            continue
+        labels = (("pool", name),)
+        yield "db_pool_size", labels, pool.size()
+        yield "db_pool_checked_out", labels, pool.checkedout()
+        yield "db_pool_overflow", labels, max(pool.overflow(), 0)
+        yield "db_pool_checkout_timeouts_total", labels, pool.checkout_timeouts
+        yield "db_pool_checkout_wait_seconds", labels, pool.checkout_wait
+
+
+def _collect_catalog_cache() -> Iterator[tuple[str, Labels, float | Histogram]]:
+    stats = catalog_cache.stats
+    for result, value in (
+        ("local_hit", stats.local_hits),
+        ("redis_hit", stats.redis_hits),
+        ("miss", stats.misses),
+        ("redis_error", stats.redis_errors),
+    ):
+        yield "catalog_cache_lookups_total", (("result", result),), value
+
+
+registry.add_collector(_collect_pools)
+registry.add_collector(_collect_catalog_cache)
+
+
+def snapshot_directory() -> SnapshotDirectory | None:
+    path = get_settings().metrics_multiproc_dir
+    return SnapshotDirectory(path) if path else None
+
+
+def flush_snapshot() -> None:
+    """Publish this worker's metrics for the others to aggregate; a no-op with one process."""
+    directory = snapshot_directory()
+    if directory is not None:
+        directory.write(registry.snapshot())
+
+
+def render_metrics() -> str:
+    """Metrics of this worker, or of every worker sharing METRICS_MULTIPROC_DIR."""
+    directory = snapshot_directory()
+    if directory is None:
+        return render_text(registry.snapshot())
+    # Refresh our own file so the scraping worker is never a flush interval behind
+    directory.write(registry.snapshot())
+    return render_text(merge_snapshots(directory.read_all()))
+
+
+async def run_snapshot_flusher(interval: float) -> None:
+    """Flush this worker's snapshot every ``interval`` seconds until cancelled."""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            flush_snapshot()
+        except OSError as exc:
+            logger.warning(f"Failed to write metrics snapshot: {exc}")
+
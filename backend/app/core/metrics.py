@@ -0,0 +1,238 @@
+"""In-process metrics: histograms, a lock-free registry and Prometheus text rendering."""
+
+from __future__ import annotations
+
+import json
+import os
+from bisect import bisect_left
+from collections.abc import Callable, Iterable, Sequence
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+# Seconds; suits both pool checkout waits and request latencies
+DEFAULT_LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Histogram:
+    """
+    Fixed-bucket histogram.
+
+    ``observe`` only does a bisect and integer increments, so it is cheap enough for
+    per-request hot paths. Updates from threads may race and lose a count; that is an
+    accepted trade-off for not taking a lock.
+    """
+
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_LATENCY_BUCKETS) -> None:
+        self.buckets = tuple(buckets)
+        # One extra slot for observations above the last bound (+Inf)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def snapshot(self) -> dict[str, object]:
+        """Cumulative counts per upper bound, as in the Prometheus exposition format."""
+        cumulative = 0
+        buckets: dict[str, int] = {}
+        for bound, count in zip((*self.buckets, float("inf")), self.counts):
+            cumulative += count
+            buckets["+Inf" if bound == float("inf") else repr(bound)] = cumulative
+        return {"buckets": buckets, "sum": self.sum, "count": self.count}
+
+
+Labels = tuple[tuple[str, str], ...]
+# A collector returns (name, labels, value) samples read at scrape time, e.g. pool gauges;
+# the value is a number or a Histogram
+Collector = Callable[[], Iterable[tuple[str, Labels, "float | Histogram"]]]
+
+
+# How a gauge's values from several worker processes combine: "sum" for per-process quantities
+# (pool connections), "max" for one shared value that every worker reports (a queue's depth)
+GAUGE_MERGE_MODES = ("sum", "max")
+
+
+@dataclass(frozen=True)
+class MetricInfo:
+    kind: str  # counter, gauge or histogram
+    help: str
+    merge: str = "sum"
+
+
+class MetricsRegistry:
+    """
+    Named counters and histograms keyed by label tuples.
+
+    Recording is a dict lookup plus arithmetic, with no locks: everything that records
+    runs on the event loop thread. Snapshots are plain JSON-able dicts so snapshots of
+    several worker processes can be merged before rendering.
+    """
+
+    def __init__(self) -> None:
+        self._info: dict[str, MetricInfo] = {}
+        self._counters: dict[tuple[str, Labels], float] = {}
+        self._histograms: dict[tuple[str, Labels], Histogram] = {}
+        self._collectors: list[Collector] = []
+
+    def describe(self, name: str, kind: str, help: str, *, merge: str = "sum") -> None:
+        """``merge`` is how a gauge combines across worker processes; see ``GAUGE_MERGE_MODES``."""
+        if merge not in GAUGE_MERGE_MODES:
+            raise ValueError(f"{name}: unknown merge mode {merge!r}")
+        self._info[name] = MetricInfo(kind=kind, help=help, merge=merge)
+
+    def inc(self, name: str, labels: Labels = (), amount: float = 1.0) -> None:
+        key = (name, labels)
+        self._counters[key] = self._counters.get(key, 0.0) + amount
+
+    def histogram(self, name: str, labels: Labels = ()) -> Histogram:
+        key = (name, labels)
+        histogram = self._histograms.get(key)
+        if histogram is None:
+            histogram = self._histograms[key] = Histogram()
+        return histogram
+
+    def add_collector(self, collector: Collector) -> None:
+        self._collectors.append(collector)
+
+    def snapshot(self) -> dict[str, Any]:
+        samples: dict[str, dict[str, Any]] = {}
+
+        def add(name: str, labels: Labels, value: float | Histogram) -> None:
+            series = samples.setdefault(name, {})
+            label_key = json.dumps(labels)
+            if isinstance(value, Histogram):
+                series[label_key] = {"buckets": list(value.buckets), "counts": list(value.counts), "sum": value.sum}
+            else:
+                series[label_key] = value
+
+        for (name, labels), value in list(self._counters.items()):
+            add(name, labels, value)
+        for (name, labels), histogram in list(self._histograms.items()):
+            add(name, labels, histogram)
+        for collector in self._collectors:
+            for name, labels, value in collector():
+                add(name, labels, value)
+        info = {name: {"kind": meta.kind, "help": meta.help, "merge": meta.merge} for name, meta in self._info.items()}
+        return {"info": info, "samples": samples}
+
+
+def merge_snapshots(snapshots: Iterable[dict[str, Any]]) -> dict[str, Any]:
+    """
+    Combine snapshots from several processes.
+
+    Counters and histograms are summed over every snapshot, including those of exited
+    workers, so they never go backwards. Gauges describe the present: they are taken
+    only from snapshots of live workers (``"live"`` set by ``SnapshotDirectory``) and
+    combined by their merge mode, summed or the maximum.
+    """
+    snapshots = list(snapshots)
+    info: dict[str, Any] = {}
+    for snapshot in snapshots:
+        info.update(snapshot["info"])
+    samples: dict[str, dict[str, Any]] = {}
+    for snapshot in snapshots:
+        live = snapshot.get("live", True)
+        for name, series in snapshot["samples"].items():
+            meta = info.get(name, {})
+            gauge = meta.get("kind") == "gauge"
+            if gauge and not live:
+                continue
+            merged = samples.setdefault(name, {})
+            for label_key, value in series.items():
+                current = merged.get(label_key)
+                if current is None:
+                    merged[label_key] = json.loads(json.dumps(value))
+                elif isinstance(value, dict):
+                    current["counts"] = [a + b for a, b in zip(current["counts"], value["counts"])]
+                    current["sum"] += value["sum"]
+                elif gauge and meta.get("merge") == "max":
+                    merged[label_key] = max(current, value)
+                else:
+                    merged[label_key] = current + value
+    return {"info": info, "samples": samples}
+
+
+def _escape_label_value(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels: Iterable[Sequence[str]], extra: tuple[str, str] | None = None) -> str:
+    pairs = [*labels, *([extra] if extra else [])]
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape_label_value(str(value))}"' for name, value in pairs) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+def render_text(snapshot: dict[str, Any]) -> str:
+    """Render a snapshot in the Prometheus text exposition format (version 0.0.4)."""
+    lines: list[str] = []
+    for name in sorted(snapshot["samples"]):
+        meta = snapshot["info"].get(name, {"kind": "untyped", "help": name})
+        lines.append(f"# HELP {name} {meta['help']}")
+        lines.append(f"# TYPE {name} {meta['kind']}")
+        for label_key, value in sorted(snapshot["samples"][name].items()):
+            labels = json.loads(label_key)
+            if isinstance(value, dict):
+                cumulative = 0
+                for bound, count in zip([*value["buckets"], float("inf")], value["counts"]):
+                    cumulative += count
+                    lines.append(f"{name}_bucket{_format_labels(labels, ('le', _format_value(bound)))} {cumulative}")
+                lines.append(f"{name}_sum{_format_labels(labels)} {_format_value(value['sum'])}")
+                lines.append(f"{name}_count{_format_labels(labels)} {cumulative}")
+            else:
+                lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+    return "\n".join(lines) + "\n"
+
+
+class SnapshotDirectory:
+    """
+    Per-process snapshot files that let any worker serve metrics for all of them.
+
+    Each worker periodically replaces ``<pid>.json``. Files of exited workers are kept so
+    their counters and histograms do not go backwards; ``read_all`` marks them not live,
+    and their gauges are left out of the merge.
+    """
+
+    def __init__(self, path: str | os.PathLike[str]) -> None:
+        self.path = Path(path)
+
+    def write(self, snapshot: dict[str, Any]) -> None:
+        self.path.mkdir(parents=True, exist_ok=True)
+        target = self.path / f"{os.getpid()}.json"
+        tmp = target.with_suffix(".tmp")
+        tmp.write_text(json.dumps(snapshot))
+        os.replace(tmp, target)
+
+    def read_all(self) -> list[dict[str, Any]]:
+        snapshots = []
+        for file in sorted(self.path.glob("*.json")):
+            try:
+                snapshot = json.loads(file.read_text())
+            except (OSError, ValueError):
+                continue  # being replaced or truncated; picked up on the next scrape
+            snapshot["live"] = _pid_alive(file.stem)
+            snapshots.append(snapshot)
+        return snapshots
+
+
+def _pid_alive(name: str) -> bool:
+    """Whether the process a snapshot file is named after still runs on this host."""
+    try:
+        os.kill(int(name), 0)
+    except (ValueError, ProcessLookupError):
+        return False
+    except PermissionError:
+        return True
+    return True
@@ -0,0 +1,118 @@
+"""Authenticated principals and their cache."""
+
+from __future__ import annotations
+
+import json
+from dataclasses import dataclass
+from uuid import UUID
+
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.cache import TTLCache
+from app.core.config import get_settings
+from app.core.redis import RedisBackoff, get_redis
+from app.models.user import User, UserRole
+
+PRINCIPAL_KEY_PREFIX = "principal:"
+
+
+@dataclass(frozen=True, slots=True)
+class Principal:
+    """The fields of a user that authorization reads; enough for most endpoints."""
+
+    id: UUID
+    role: UserRole
+    is_active: bool
+
+
+class PrincipalCache:
+    """
+    In-process TTL cache of principals with an optional shared Redis tier.
+
+    ``invalidate`` clears the local entry and the Redis one, so other workers see a
+    deactivation after at most the local TTL.
+    """
+
+    def __init__(self, *, ttl: float, maxsize: int, redis: Redis | None = None, redis_ttl: int = 300) -> None:
+        self.enabled = True
+        self.redis = redis
+        self.redis_ttl = redis_ttl
+        self._local: TTLCache[UUID, Principal] = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._redis_backoff = RedisBackoff("Principal cache", "bypassing it")
+
+    def _redis(self) -> Redis | None:
+        if self.redis is None or not self._redis_backoff.available:
+            return None
+        return self.redis
+
+    async def get(self, db: AsyncSession, user_id: UUID) -> Principal | None:
+        """Return the principal for ``user_id``, loading it from the database on a miss."""
+        if not self.enabled:
+            return await load_principal(db, user_id)
+
+        principal = self._local.get(user_id)
+        if principal is not None:
+            return principal
+
+        redis = self._redis()
+        if redis is not None:
+            try:
+                raw = await redis.get(f"{PRINCIPAL_KEY_PREFIX}{user_id}")
+            except RedisError as exc:
+                self._redis_backoff.failed(exc)
+            else:
+                if raw is not None:
+                    data = json.loads(raw)
+                    principal = Principal(id=user_id, role=UserRole(data["role"]), is_active=data["is_active"])
+                    self._local.set(user_id, principal)
+                    return principal
+
+        principal = await load_principal(db, user_id)
+        if principal is None:
+            return None
+        self._local.set(user_id, principal)
+        redis = self._redis()
+        if redis is not None:
+            try:
+                await redis.set(
+                    f"{PRINCIPAL_KEY_PREFIX}{user_id}",
+                    json.dumps({"role": principal.role.value, "is_active": principal.is_active}),
+                    ex=self.redis_ttl,
+                )
+            except RedisError as exc:
+                self._redis_backoff.failed(exc)
+        return principal
+
+    async def invalidate(self, user_id: UUID) -> None:
+        """Forget a user after its role or active flag changed; call after commit."""
+        self._local.delete(user_id)
+        redis = self._redis()
+        if redis is None:
+            return
+        try:
+            await redis.delete(f"{PRINCIPAL_KEY_PREFIX}{user_id}")
+        except RedisError as exc:
+            self._redis_backoff.failed(exc)
+
+    def clear_local(self) -> None:
+        self._local.clear()
+
+
+async def load_principal(db: AsyncSession, user_id: UUID) -> Principal | None:
+    result = await db.execute(select(User.role, User.is_active).where(User.id == user_id))
+    row = result.one_or_none()
+    if row is None:
+        return None
+    return Principal(id=user_id, role=row.role, is_active=bool(row.is_active))
+
+
+settings = get_settings()
+principal_cache = PrincipalCache(
+    ttl=settings.principal_cache_ttl_seconds,
+    maxsize=settings.principal_cache_size,
+    redis=get_redis() if settings.principal_cache_redis else None,
+    redis_ttl=settings.principal_cache_redis_ttl_seconds,
+)
@@ -0,0 +1,325 @@
+"""Request rate limits: token bucket and sliding window, decided atomically in Redis or in process."""
+
+from __future__ import annotations
+
+import enum
+import logging
+import math
+import os
+import re
+import time
+from collections import OrderedDict, deque
+from collections.abc import Callable
+from dataclasses import dataclass
+
+from fastapi import HTTPException, Request, status
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+
+from app.core.cache import TTLCache
+from app.core.config import get_settings
+from app.core.instrumentation import registry
+from app.core.redis import RedisBackoff, get_redis
+from app.core.security import decode_token
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = "ratelimit:"
+
+registry.describe("rate_limit_decisions_total", "counter", "Rate limit decisions by rule and result (allowed, limited).")
+registry.describe("rate_limit_decision_seconds", "histogram", "Time to decide one rate limit check, by backend.")
+
+_RATE_PATTERN = re.compile(r"^\s*(\d+)\s*/\s*(\d*)\s*([a-z]+?)s?\s*$")
+_UNITS = {"s": 1, "second": 1, "m": 60, "minute": 60, "h": 3600, "hour": 3600, "d": 86400, "day": 86400}
+
+# Returns {allowed, tokens left, seconds until the next token}; floats go back as strings
+TOKEN_BUCKET_SCRIPT = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local time = redis.call('TIME')
+local now = tonumber(time[1]) + tonumber(time[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or capacity
+local ts = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+local allowed = 0
+local retry_after = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+    allowed = 1
+else
+    retry_after = (1 - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now)
+redis.call('PEXPIRE', KEYS[1], math.ceil(capacity / rate * 1000))
+return {allowed, tostring(tokens), tostring(retry_after)}
+"""
+
+# Sorted set of request timestamps (ms) inside the window; returns {allowed, remaining, retry after ms}.
+# With ARGV[4] = "0" the window is only checked and nothing is recorded.
+SLIDING_WINDOW_SCRIPT = """
+local limit = tonumber(ARGV[1])
+local window = tonumber(ARGV[2])
+local time = redis.call('TIME')
+local now = tonumber(time[1]) * 1000 + math.floor(tonumber(time[2]) / 1000)
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', now - window)
+local count = redis.call('ZCARD', KEYS[1])
+if count < limit then
+    if ARGV[4] == '0' then
+        return {1, limit - count, 0}
+    end
+    redis.call('ZADD', KEYS[1], now, ARGV[3])
+    redis.call('PEXPIRE', KEYS[1], window)
+    return {1, limit - count - 1, 0}
+end
+local oldest = redis.call('ZRANGE', KEYS[1], 0, 0, 'WITHSCORES')
+return {0, 0, tonumber(oldest[2]) + window - now}
+"""
+
+
+class Algorithm(str, enum.Enum):
+    # Steady rate with bursts up to the bucket size; for high-volume public reads
+    TOKEN_BUCKET = "token_bucket"
+    # Exact count over the trailing window; for low limits such as login attempts
+    SLIDING_WINDOW = "sliding_window"
+
+
+@dataclass(frozen=True)
+class Rate:
+    count: int
+    period: float
+
+    @classmethod
+    def parse(cls, spec: str) -> Rate:
+        """Parse ``"5/minute"``, ``"20/second"`` or ``"10/15minutes"``."""
+        match = _RATE_PATTERN.match(spec.lower())
+        if not match or match.group(3) not in _UNITS:
+            raise ValueError(f"Invalid rate limit {spec!r}; expected e.g. '5/minute' or '10/15minutes'")
+        count, multiplier, unit = match.groups()
+        period = int(multiplier or 1) * _UNITS[unit]
+        if int(count) < 1 or period < 1:
+            raise ValueError(f"Invalid rate limit {spec!r}")
+        return cls(int(count), float(period))
+
+
+@dataclass(frozen=True)
+class RateLimitRule:
+    name: str
+    rate: Rate
+    algorithm: Algorithm = Algorithm.SLIDING_WINDOW
+    # Token bucket size; defaults to the rate's count
+    burst: int | None = None
+
+    @classmethod
+    def parse(cls, name: str, spec: str, algorithm: Algorithm = Algorithm.SLIDING_WINDOW, burst: int | None = None) -> RateLimitRule:
+        return cls(name, Rate.parse(spec), algorithm, burst)
+
+    @property
+    def capacity(self) -> int:
+        return self.burst or self.rate.count
+
+    @property
+    def refill_per_second(self) -> float:
+        return self.rate.count / self.rate.period
+
+
+@dataclass(frozen=True)
+class Decision:
+    allowed: bool
+    remaining: int
+    retry_after: float = 0.0
+
+
+class MemoryRateLimitBackend:
+    """
+    Per-process state, bounded to ``maxsize`` keys (least recently used dropped first).
+
+    Each worker counts on its own, so with N workers a client gets up to N times the limit.
+    """
+
+    def __init__(self, maxsize: int) -> None:
+        self.maxsize = maxsize
+        self._buckets: OrderedDict[str, list[float]] = OrderedDict()
+        self._windows: OrderedDict[str, deque[float]] = OrderedDict()
+
+    def _touch(self, entries: OrderedDict, key: str) -> None:
+        entries.move_to_end(key)
+        while len(entries) > self.maxsize:
+            entries.popitem(last=False)
+
+    def token_bucket(self, key: str, rule: RateLimitRule) -> Decision:
+        now = time.monotonic()
+        capacity, rate = rule.capacity, rule.refill_per_second
+        state = self._buckets.setdefault(key, [float(capacity), now])
+        self._touch(self._buckets, key)
+        tokens = min(capacity, state[0] + (now - state[1]) * rate)
+        state[1] = now
+        if tokens >= 1:
+            state[0] = tokens - 1
+            return Decision(True, int(tokens - 1))
+        state[0] = tokens
+        return Decision(False, 0, (1 - tokens) / rate)
+
+    def sliding_window(self, key: str, rule: RateLimitRule, record: bool = True) -> Decision:
+        now = time.monotonic()
+        hits = self._windows.setdefault(key, deque())
+        self._touch(self._windows, key)
+        while hits and hits[0] <= now - rule.rate.period:
+            hits.popleft()
+        if len(hits) < rule.rate.count:
+            if not record:
+                return Decision(True, rule.rate.count - len(hits))
+            hits.append(now)
+            return Decision(True, rule.rate.count - len(hits))
+        return Decision(False, 0, hits[0] + rule.rate.period - now)
+
+
+class RedisRateLimitBackend:
+    """One EVALSHA per decision; Redis' own clock is used, so API servers need not agree on time."""
+
+    def __init__(self, redis: Redis) -> None:
+        self._token_bucket = redis.register_script(TOKEN_BUCKET_SCRIPT)
+        self._sliding_window = redis.register_script(SLIDING_WINDOW_SCRIPT)
+
+    async def token_bucket(self, key: str, rule: RateLimitRule) -> Decision:
+        allowed, tokens, retry_after = await self._token_bucket(
+            keys=[key], args=[rule.capacity, rule.refill_per_second]
+        )
+        return Decision(bool(allowed), int(float(tokens)), float(retry_after))
+
+    async def sliding_window(self, key: str, rule: RateLimitRule, record: bool = True) -> Decision:
+        # Members must be unique: two hits in the same millisecond are two entries
+        allowed, remaining, retry_after_ms = await self._sliding_window(
+            keys=[key], args=[rule.rate.count, int(rule.rate.period * 1000), os.urandom(8).hex(), int(record)]
+        )
+        return Decision(bool(allowed), int(remaining), int(retry_after_ms) / 1000)
+
+
+class RateLimiter:
+    """
+    Decides whether a request under ``rule`` for ``key`` (an IP, phone number or user id) may proceed.
+
+    Redis makes limits shared by all workers. When it is unreachable the limiter falls back to
+    the in-process backend for a while instead of failing requests. A key that has been
+    limited is answered from a local cache until its Retry-After passes, so a client
+    hammering the API costs no Redis round trips.
+    """
+
+    def __init__(
+        self,
+        *,
+        redis: Callable[[], Redis] | None,
+        memory_size: int,
+        enabled: bool = True,
+    ) -> None:
+        self.enabled = enabled
+        self._redis_factory = redis
+        self._redis_backend: RedisRateLimitBackend | None = None
+        self._memory = MemoryRateLimitBackend(memory_size)
+        self._limited: TTLCache[str, float] = TTLCache(maxsize=memory_size, ttl=1.0)
+        self._redis_backoff = RedisBackoff("Rate limiter", "limiting in process")
+
+    def _backend(self) -> RedisRateLimitBackend | None:
+        if self._redis_factory is None or not self._redis_backoff.available:
+            return None
+        if self._redis_backend is None:
+            self._redis_backend = RedisRateLimitBackend(self._redis_factory())
+        return self._redis_backend
+
+    def _redis_failed(self, exc: RedisError) -> None:
+        self._redis_backoff.failed(exc)
+        self._redis_backend = None
+
+    async def hit(self, rule: RateLimitRule, key: str, *, record: bool = True) -> Decision:
+        """
+        Decide one request and count it when allowed.
+
+        ``record=False`` only checks whether the key is over the limit (sliding window rules);
+        it is used where just some outcomes count, e.g. failed logins, recorded afterwards.
+        """
+        if not record and rule.algorithm != Algorithm.SLIDING_WINDOW:
+            raise ValueError(f"{rule.name}: only sliding window limits can be checked without recording")
+        if not self.enabled:
+            return Decision(True, rule.capacity)
+
+        started = time.perf_counter()
+        full_key = f"{KEY_PREFIX}{rule.name}:{key}"
+        limited_until = self._limited.get(full_key)
+        if limited_until is not None:
+            decision, backend = Decision(False, 0, limited_until - time.monotonic()), "local"
+        else:
+            decision, backend = None, "memory"
+            check_only = {} if record else {"record": False}
+            redis_backend = self._backend()
+            if redis_backend is not None:
+                try:
+                    decision = await getattr(redis_backend, rule.algorithm.value)(full_key, rule, **check_only)
+                    backend = "redis"
+                except RedisError as exc:
+                    self._redis_failed(exc)
+            if decision is None:
+                decision = getattr(self._memory, rule.algorithm.value)(full_key, rule, **check_only)
+            if not decision.allowed:
+                self._limited.set(full_key, time.monotonic() + decision.retry_after, ttl=decision.retry_after)
+
+        registry.histogram("rate_limit_decision_seconds", (("backend", backend),)).observe(time.perf_counter() - started)
+        result = "allowed" if decision.allowed else "limited"
+        registry.inc("rate_limit_decisions_total", (("rule", rule.name), ("result", result)))
+        return decision
+
+    async def enforce(self, rule: RateLimitRule, key: str, *, record: bool = True) -> None:
+        """Raise 429 with Retry-After when the request is over the limit."""
+        decision = await self.hit(rule, key, record=record)
+        if not decision.allowed:
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="Too many requests. Try again later.",
+                headers={"Retry-After": str(max(math.ceil(decision.retry_after), 1))},
+            )
+
+
+def client_ip(request: Request) -> str:
+    """The peer address; behind a proxy run uvicorn with --proxy-headers so this is the client's."""
+    return f"ip:{request.client.host if request.client else 'unknown'}"
+
+
+def user_or_ip(request: Request) -> str:
+    """The bearer token's user for authenticated callers (no database lookup), the IP otherwise."""
+    scheme, _, token = request.headers.get("authorization", "").partition(" ")
+    if scheme.lower() == "bearer" and token:
+        try:
+            subject = decode_token(token).get("sub")
+        except ValueError:
+            subject = None
+        if subject:
+            return f"user:{subject}"
+    return client_ip(request)
+
+
+def rate_limit(rule: RateLimitRule, key: Callable[[Request], str] = client_ip):
+    """Route dependency: ``dependencies=[Depends(rate_limit(rule, key=user_or_ip))]``."""
+
+    async def dependency(request: Request) -> None:
+        await rate_limiter.enforce(rule, key(request))
+
+    return dependency
+
+
+settings = get_settings()
+rate_limiter = RateLimiter(
+    redis=get_redis if settings.rate_limit_backend == "redis" else None,
+    memory_size=settings.rate_limit_memory_keys,
+    enabled=settings.rate_limit_enabled,
+)
+
+LOGIN_BY_IP = RateLimitRule.parse("login:ip", settings.rate_limit_login_ip)
+# Failed logins per username and IP: checked before the password, so a guesser is stopped even when
+# the guess is right, while others (the account's owner) can still log in from their own addresses
+LOGIN_BY_USERNAME = RateLimitRule.parse("login:username", settings.rate_limit_login_username)
+# Each send-otp costs an SMS; the per-phone resend cooldown does not stop one client cycling numbers
+SEND_OTP_BY_IP = RateLimitRule.parse("send_otp:ip", settings.rate_limit_send_otp_ip)
+VERIFY_OTP_BY_IP = RateLimitRule.parse("verify_otp:ip", settings.rate_limit_verify_otp_ip)
+VERIFY_OTP_BY_PHONE = RateLimitRule.parse("verify_otp:phone", settings.rate_limit_verify_otp_phone)
+CATALOGUE = RateLimitRule.parse(
+    "catalogue", settings.rate_limit_catalogue, Algorithm.TOKEN_BUCKET, burst=settings.rate_limit_catalogue_burst
+)
@@ -0,0 +1,61 @@
+"""Shared Redis client."""
+
+from __future__ import annotations
+
+import logging
+import time
+
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+
+from app.core.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+# After a Redis error, callers with a fallback skip Redis for this long instead of failing every request
+REDIS_RETRY_AFTER_SECONDS = 10.0
+
+_client: Redis | None = None
+
+
+def get_redis() -> Redis:
+    """Return the process-wide Redis client, creating its connection pool on first use."""
+    global _client
+    if _client is None:
+        settings = get_settings()
+        _client = Redis.from_url(
+            settings.redis_url,
+            socket_connect_timeout=settings.redis_socket_timeout_seconds,
+            socket_timeout=settings.redis_socket_timeout_seconds,
+        )
+    return _client
+
+
+class RedisBackoff:
+    """
+    Tracks a Redis outage for one caller that can do without Redis for a while.
+
+    After ``failed`` the caller skips Redis for ``retry_after`` seconds and uses its
+    fallback, so an outage costs one timeout per interval instead of one per request.
+    """
+
+    def __init__(self, name: str, fallback: str, retry_after: float = REDIS_RETRY_AFTER_SECONDS) -> None:
+        self.name = name
+        self.fallback = fallback
+        self.retry_after = retry_after
+        self.down_until = 0.0
+
+    @property
+    def available(self) -> bool:
+        return time.monotonic() >= self.down_until
+
+    def failed(self, exc: RedisError) -> None:
+        self.down_until = time.monotonic() + self.retry_after
+        logger.warning(f"{self.name}: Redis unavailable, {self.fallback} for {self.retry_after}s: {exc}")
+
+
+async def close_redis() -> None:
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
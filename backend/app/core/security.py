@@ -1,7 +1,9 @@
 from __future__ import annotations
 
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import Any
+from typing import Any, Callable, TypeVar
 
 from jose import JWTError, jwt
 from passlib.context import CryptContext
@@ -10,6 +12,8 @@ from app.core.config import get_settings
 
 ALGORITHM = "HS256"
 
+T = TypeVar("T")
+
 # Password hashing context
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
@@ -40,3 +44,47 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
 def get_password_hash(password: str) -> str:
     """Hash a password."""
     return pwd_context.hash(password)
+
+
+class PasswordHasherBusyError(Exception):
+    """Too many password hashes are already queued; the caller should retry later."""
+
+
+_password_executor: ThreadPoolExecutor | None = None
+_password_jobs = 0
+
+
+async def _run_password_job(func: Callable[..., T], *args: Any) -> T:
+    """
+    Run a bcrypt call on the dedicated password executor.
+
+    bcrypt releases the GIL, so the event loop keeps serving requests meanwhile. The
+    executor has ``password_hash_workers`` threads, which caps the CPU a login storm
+    can take; beyond ``password_hash_max_pending`` queued jobs calls fail fast instead
+    of piling up.
+    """
+    global _password_executor, _password_jobs
+    settings = get_settings()
+    if _password_jobs >= settings.password_hash_max_pending:
+        raise PasswordHasherBusyError("Too many concurrent password checks")
+    if _password_executor is None:
+        _password_executor = ThreadPoolExecutor(
+            max_workers=settings.password_hash_workers,
+            thread_name_prefix="password-hash",
+        )
+
+    _password_jobs += 1
+    try:
+        return await asyncio.get_running_loop().run_in_executor(_password_executor, func, *args)
+    finally:
+        _password_jobs -= 1
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """Verify a password against a hash without blocking the event loop."""
+    return await _run_password_job(verify_password, plain_password, hashed_password)
+
+
+async def get_password_hash_async(password: str) -> str:
+    """Hash a password without blocking the event loop."""
+    return await _run_password_job(get_password_hash, password)
@@ -0,0 +1,73 @@
+"""Total row counts for paginated list endpoints."""
+
+from __future__ import annotations
+
+import enum
+import json
+from typing import Any
+
+from sqlalchemy import Select, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.cache import TTLCache
+from app.core.config import get_settings
+
+
+class CountMode(str, enum.Enum):
+    EXACT = "exact"  # COUNT(*) over the filtered query on every call
+    CACHED = "cached"  # exact count, reused per filter signature for a TTL
+    ESTIMATE = "estimate"  # planner row estimate (PostgreSQL), exact elsewhere
+    NONE = "none"  # no total; clients rely on has_more
+
+
+settings = get_settings()
+_count_cache: TTLCache[tuple[str, str], int] = TTLCache(
+    maxsize=settings.list_count_cache_size,
+    ttl=settings.list_count_cache_ttl_seconds,
+)
+
+
+def resolve_count_mode(mode: CountMode | None) -> CountMode:
+    return mode or CountMode(get_settings().list_count_mode)
+
+
+async def count_total(db: AsyncSession, stmt: Select[Any], mode: CountMode) -> int | None:
+    """
+    Count the rows matched by a filtered (not yet paginated) list query.
+
+    Returns:
+        the total according to ``mode``, or None for ``CountMode.NONE``
+    """
+    if mode == CountMode.NONE:
+        return None
+    dialect = db.get_bind().dialect
+    if mode == CountMode.ESTIMATE and dialect.name == "postgresql":
+        return await _estimate_rows(db, stmt)
+
+    count_stmt = select(func.count()).select_from(stmt.order_by(None).subquery())
+    if mode == CountMode.CACHED:
+        compiled = count_stmt.compile(dialect=dialect)
+        key = (compiled.string, repr(sorted(compiled.params.items())))
+        cached = _count_cache.get(key)
+        if cached is not None:
+            return cached
+        total = (await db.execute(count_stmt)).scalar_one()
+        _count_cache.set(key, total)
+        return total
+
+    return (await db.execute(count_stmt)).scalar_one()
+
+
+async def _estimate_rows(db: AsyncSession, stmt: Select[Any]) -> int:
+    """Read the planner's row estimate for ``stmt`` without executing it."""
+    compiled = stmt.order_by(None).compile(dialect=db.get_bind().dialect, compile_kwargs={"literal_binds": True})
+    conn = await db.connection()
+    result = await conn.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {compiled}")
+    plan = result.scalar_one()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+def clear_count_cache() -> None:
+    _count_cache.clear()
@@ -0,0 +1,53 @@
+"""Connection pool with checkout instrumentation."""
+
+from __future__ import annotations
+
+import time
+from typing import Any
+
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, PoolProxiedConnection, QueuePool
+
+from app.core.metrics import Histogram
+
+
+class InstrumentedAsyncQueuePool(AsyncAdaptedQueuePool):
+    """
+    Queue pool that records how long each checkout waited.
+
+    The wait includes opening a new connection when the pool grows, which is what a
+    request experiences as well.
+    """
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self.checkout_wait = Histogram()
+        self.checkout_timeouts = 0
+
+    def connect(self) -> PoolProxiedConnection:
+        started = time.perf_counter()
+        try:
+            return super().connect()
+        except PoolTimeoutError:
+            self.checkout_timeouts += 1
+            raise
+        finally:
+            self.checkout_wait.observe(time.perf_counter() - started)
+
+
+def pool_stats(engine: AsyncEngine) -> dict[str, Any]:
+    """Current occupancy of an engine's pool, plus checkout wait times when instrumented."""
+    pool = engine.sync_engine.pool
+    stats: dict[str, Any] = {"pool_class": type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        stats.update(
+            size=pool.size(),
+            checked_in=pool.checkedin(),
+            checked_out=pool.checkedout(),
+            overflow=pool.overflow(),
+        )
+    if isinstance(pool, InstrumentedAsyncQueuePool):
+        stats["checkout_timeouts"] = pool.checkout_timeouts
+        stats["checkout_wait_seconds"] = pool.checkout_wait.snapshot()
+    return stats
@@ -1,20 +1,83 @@
 from collections.abc import AsyncGenerator
+from typing import Any
 
-from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from fastapi import Depends
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import DeclarativeBase
 
-from app.core.config import get_settings
+from app.core.config import Settings, get_settings
+from app.db.pool import InstrumentedAsyncQueuePool
 
 
 class Base(DeclarativeBase):
     pass
 
 
+def engine_options(database_url: str, settings: Settings) -> dict[str, Any]:
+    """Pool and driver options for ``create_async_engine`` from settings."""
+    url = make_url(database_url)
+    options: dict[str, Any] = {"echo": False, "pool_pre_ping": settings.database_pool_pre_ping}
+    if url.get_backend_name() == "sqlite" and url.database in (None, "", ":memory:"):
+        # In-memory SQLite lives in a single connection; keep SQLAlchemy's default pool
+        return options
+
+    options.update(
+        poolclass=InstrumentedAsyncQueuePool,
+        pool_size=settings.database_pool_size,
+        max_overflow=settings.database_max_overflow,
+        pool_timeout=settings.database_pool_timeout_seconds,
+        pool_recycle=settings.database_pool_recycle_seconds,
+    )
+    if url.get_driver_name() == "asyncpg":
+        options["connect_args"] = {
+            # SQLAlchemy's per-connection cache of prepared statements, and asyncpg's own
+            # below it; 0 disables both, as needed behind PgBouncer in transaction mode
+            "prepared_statement_cache_size": settings.database_statement_cache_size,
+            "statement_cache_size": settings.database_statement_cache_size,
+        }
+    return options
+
+
+def create_db_engine(database_url: str, settings: Settings | None = None) -> AsyncEngine:
+    return create_async_engine(database_url, **engine_options(database_url, settings or get_settings()))
+
+
 settings = get_settings()
-engine = create_async_engine(settings.database_url, echo=False, future=True)
+engine = create_db_engine(settings.database_url, settings)
 async_session = async_sessionmaker(engine, expire_on_commit=False, class_=AsyncSession)
 
+# Optional streaming replica for read-only endpoints; None means reads use the primary
+read_engine = create_db_engine(settings.database_read_url, settings) if settings.database_read_url else None
+read_async_session = (
+    async_sessionmaker(read_engine, expire_on_commit=False, class_=AsyncSession) if read_engine else None
+)
+
 
 async def get_db() -> AsyncGenerator[AsyncSession, None]:
     async with async_session() as session:
         yield session
+
+
+async def get_read_db(db: AsyncSession = Depends(get_db)) -> AsyncGenerator[AsyncSession, None]:
+    """
+    Session for read-only endpoints: the replica when DATABASE_READ_URL is set.
+
+    Replica reads may lag the primary, so only use it where a just-committed write does
+    not have to be visible. Without a replica this is the request's primary session;
+    with one, that primary session stays unused and, being lazy, never connects.
+    """
+    if read_async_session is None:
+        yield db
+        return
+    async with read_async_session() as session:
+        yield session
+
+
+def get_read_sessionmaker() -> async_sessionmaker[AsyncSession]:
+    """
+    Session factory for streamed responses, which run after request dependencies exit.
+
+    Like ``get_read_db`` it prefers the replica; the caller opens and closes the session.
+    """
+    return read_async_session or async_session
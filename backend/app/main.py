@@ -1,15 +1,29 @@
 from __future__ import annotations
 
+import asyncio
+import contextlib
+import ipaddress
 import logging
 import sys
+from collections.abc import AsyncIterator
 
-from fastapi import FastAPI, Request, status
+from fastapi import Depends, FastAPI, HTTPException, Request, status
 from fastapi.exceptions import RequestValidationError
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse
 
 from app.api.v1 import auth, deliveries, orders, payments, products, users
+from app.core import instrumentation
 from app.core.config import get_settings
+from app.core.redis import close_redis
+from app.db import session as db_session
+from app.db.pool import pool_stats
+from app.services.outbox import get_outbox_relay
+from app.services.payments.http import close_provider_clients
+from app.services.payments.reconciliation import get_payment_reconciler
+from app.services.payments.webhooks import get_webhook_worker
+from app.services.sms import get_sms_dispatcher
+from app.utils.pagination import NEXT_CURSOR_HEADER
 
 # Настройка логирования
 logging.basicConfig(
@@ -21,7 +35,54 @@ logging.basicConfig(
 )
 
 settings = get_settings()
-app = FastAPI(title=settings.app_name)
+
+
+@contextlib.asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    flusher = None
+    if settings.metrics_enabled and settings.metrics_multiproc_dir:
+        flusher = asyncio.create_task(instrumentation.run_snapshot_flusher(settings.metrics_flush_interval_seconds))
+    sms_worker = None
+    if settings.sms_worker_enabled:
+        try:
+            sms_worker = asyncio.create_task(get_sms_dispatcher().run())
+        except NotImplementedError as exc:
+            # No gateway for SMS_PROVIDER yet: the API still boots, and send-otp answers 503 instead of queueing
+            logging.getLogger(__name__).warning(f"SMS dispatcher not started: {exc}")
+    webhook_worker = (
+        asyncio.create_task(get_webhook_worker().run()) if settings.payment_webhook_worker_enabled else None
+    )
+    outbox_relay = asyncio.create_task(get_outbox_relay().run()) if settings.outbox_relay_enabled else None
+    reconciler = (
+        asyncio.create_task(get_payment_reconciler().run(settings.payment_reconciliation_interval_seconds))
+        if settings.payment_reconciliation_enabled
+        else None
+    )
+    try:
+        yield
+    finally:
+        for task in (reconciler, outbox_relay, webhook_worker):
+            if task is not None:
+                task.cancel()
+                with contextlib.suppress(asyncio.CancelledError):
+                    await task
+        if sms_worker is not None:
+            sms_worker.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await sms_worker
+        if flusher is not None:
+            flusher.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await flusher
+            instrumentation.flush_snapshot()
+        await close_provider_clients()
+        await close_redis()
+        await db_session.engine.dispose()
+        if db_session.read_engine is not None:
+            await db_session.read_engine.dispose()
+
+
+app = FastAPI(title=settings.app_name, lifespan=lifespan)
 
 # CORS middleware with auto-detected hosts
 app.add_middleware(
@@ -30,7 +91,18 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER],
 )
+if settings.metrics_enabled or settings.query_debug:
+    # Added last so it wraps CORS too and times the whole request
+    app.add_middleware(
+        instrumentation.MetricsMiddleware,
+        server_timing=settings.query_debug,
+        repeat_threshold=settings.query_debug_repeat_threshold,
+    )
+    instrumentation.instrument_engine(db_session.engine)
+    if db_session.read_engine is not None:
+        instrumentation.instrument_engine(db_session.read_engine)
 
 app.include_router(auth.router, prefix=settings.api_v1_prefix)
 app.include_router(users.router, prefix=settings.api_v1_prefix)
@@ -64,6 +136,33 @@ async def validation_exception_handler(request: Request, exc: RequestValidationE
     )
 
 
+def ops_only(request: Request) -> None:
+    """Hide operational endpoints from peers outside OPS_ALLOWED_NETWORKS; /health stays public for probes."""
+    try:
+        peer = ipaddress.ip_address(request.client.host) if request.client else None
+    except ValueError:
+        peer = None
+    if peer is None or not any(peer in network for network in settings.ops_allowed_networks_list):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not Found")
+
+
 @app.get("/health", tags=["health"])
 async def health_check() -> dict[str, str]:
     return {"status": "ok"}
+
+
+@app.get("/health/db", tags=["health"], dependencies=[Depends(ops_only)])
+async def database_pool_health() -> dict[str, object]:
+    """Connection pool occupancy and checkout wait times for the primary and the read replica."""
+    pools = {"primary": pool_stats(db_session.engine)}
+    if db_session.read_engine is not None:
+        pools["replica"] = pool_stats(db_session.read_engine)
+    return pools
+
+
+@app.get("/metrics", include_in_schema=False, dependencies=[Depends(ops_only)])
+async def metrics() -> PlainTextResponse:
+    """Prometheus text exposition of request, database and cache metrics."""
+    if not settings.metrics_enabled:
+        return PlainTextResponse("metrics are disabled\n", status_code=status.HTTP_404_NOT_FOUND)
+    return PlainTextResponse(instrumentation.render_metrics(), media_type="text/plain; version=0.0.4")
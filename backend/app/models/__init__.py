@@ -2,6 +2,8 @@ from app.db.session import Base
 from app.models.delivery import Delivery  # noqa: F401
 from app.models.order import Order, OrderItem  # noqa: F401
 from app.models.otp import PhoneOTP  # noqa: F401
+from app.models.outbox import OutboxEvent  # noqa: F401
+from app.models.payment_webhook import PaymentWebhookEvent  # noqa: F401
 from app.models.product import Product  # noqa: F401
 from app.models.transaction import Transaction  # noqa: F401
 from app.models.user import User  # noqa: F401
@@ -0,0 +1,35 @@
+from __future__ import annotations
+
+import uuid
+from datetime import datetime
+
+from sqlalchemy import Index, String, Text, text
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.db.session import Base
+
+
+class OutboxEvent(Base):
+    """A domain event written in the same transaction as the change it describes; the relay publishes it."""
+
+    __tablename__ = "outbox_events"
+    __table_args__ = (
+        # Relay pickup: WHERE published_at IS NULL ORDER BY created_at, id
+        Index(
+            "ix_outbox_events_unpublished",
+            "created_at",
+            "id",
+            postgresql_where=text("published_at IS NULL"),
+            sqlite_where=text("published_at IS NULL"),
+        ),
+        # Purging published events past retention
+        Index("ix_outbox_events_published_at", "published_at"),
+    )
+
+    id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    event_type: Mapped[str] = mapped_column(String(64), nullable=False)
+    aggregate_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), nullable=False)
+    payload: Mapped[str] = mapped_column(Text, nullable=False)  # JSON
+    created_at: Mapped[datetime] = mapped_column(default=datetime.utcnow, nullable=False)
+    published_at: Mapped[datetime | None] = mapped_column(nullable=True)
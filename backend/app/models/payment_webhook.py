@@ -0,0 +1,43 @@
+from __future__ import annotations
+
+import enum
+import uuid
+from datetime import datetime
+
+from sqlalchemy import Enum, Index, Integer, String, Text, UniqueConstraint
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.db.session import Base
+from app.models.transaction import PaymentProvider
+
+
+class WebhookEventStatus(str, enum.Enum):
+    RECEIVED = "received"
+    PROCESSED = "processed"
+    # Parsed fine but refers to no known transaction
+    IGNORED = "ignored"
+    FAILED = "failed"
+
+
+class PaymentWebhookEvent(Base):
+    """A provider callback stored as received; the webhook worker applies it later."""
+
+    __tablename__ = "payment_webhook_events"
+    __table_args__ = (
+        # Provider retries of one event are stored once
+        UniqueConstraint("provider", "event_key", name="uq_payment_webhook_events_provider_event_key"),
+        # Worker pickup (WHERE status = 'received' ORDER BY received_at) and replay by time window
+        Index("ix_payment_webhook_events_status_received_at", "status", "received_at"),
+        Index("ix_payment_webhook_events_received_at", "received_at"),
+    )
+
+    id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    provider: Mapped[PaymentProvider] = mapped_column(Enum(PaymentProvider, values_callable=lambda obj: [e.value for e in obj]), nullable=False)
+    event_key: Mapped[str] = mapped_column(String(255), nullable=False)
+    payload: Mapped[str] = mapped_column(Text, nullable=False)
+    status: Mapped[WebhookEventStatus] = mapped_column(Enum(WebhookEventStatus, values_callable=lambda obj: [e.value for e in obj]), default=WebhookEventStatus.RECEIVED, nullable=False)
+    attempts: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    error: Mapped[str | None] = mapped_column(String(1000), nullable=True)
+    received_at: Mapped[datetime] = mapped_column(default=datetime.utcnow, nullable=False)
+    processed_at: Mapped[datetime | None] = mapped_column(nullable=True)
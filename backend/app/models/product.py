@@ -4,13 +4,21 @@ import enum
 import uuid
 from datetime import datetime
 
-from sqlalchemy import Enum, ForeignKey, Numeric, String, Text
+from sqlalchemy import Enum, ForeignKey, Index, Numeric, String, Text, text
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from app.db.session import Base
 
 
+# Weighted full-text document over name and description. Queries must use this exact
+# expression for PostgreSQL to match it against ix_products_search_document.
+PRODUCT_SEARCH_DOCUMENT = (
+    "(setweight(to_tsvector('simple'::regconfig, coalesce(name, '')), 'A') || "
+    "setweight(to_tsvector('simple'::regconfig, coalesce(description, '')), 'B'))"
+)
+
+
 class ProductCategory(str, enum.Enum):
     VEGETABLES = "vegetables"
     FRUITS = "fruits"
@@ -22,6 +30,33 @@ class ProductCategory(str, enum.Enum):
 
 class Product(Base):
     __tablename__ = "products"
+    __table_args__ = (
+        # Public catalogue only ever lists active products, newest first
+        Index(
+            "ix_products_active_created_at",
+            "created_at",
+            "id",
+            postgresql_where=text("is_active = true"),
+            sqlite_where=text("is_active = 1"),
+        ),
+        Index(
+            "ix_products_active_category_created_at",
+            "category",
+            "created_at",
+            "id",
+            postgresql_where=text("is_active = true"),
+            sqlite_where=text("is_active = 1"),
+        ),
+        # Not partial: also serves ownership lookups on inactive products
+        Index("ix_products_farmer_id_created_at", "farmer_id", "created_at", "id"),
+        # Full-text search; the pg_trgm index on name only exists in migrations since it
+        # needs the extension
+        Index(
+            "ix_products_search_document",
+            text(PRODUCT_SEARCH_DOCUMENT),
+            postgresql_using="gin",
+        ).ddl_if(dialect="postgresql"),
+    )
 
     id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     farmer_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
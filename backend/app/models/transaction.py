@@ -4,7 +4,7 @@ import enum
 import uuid
 from datetime import datetime
 
-from sqlalchemy import Enum, ForeignKey, Numeric, String
+from sqlalchemy import Enum, ForeignKey, Index, Numeric, String
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
@@ -27,6 +27,15 @@ class TransactionStatus(str, enum.Enum):
 
 class Transaction(Base):
     __tablename__ = "transactions"
+    __table_args__ = (
+        # Listing by order (ORDER BY created_at DESC, id DESC) and the pending check in /payments/init
+        Index("ix_transactions_order_id_created_at", "order_id", "created_at", "id"),
+        Index("ix_transactions_created_at", "created_at", "id"),
+        # Webhooks that identify the payment by the provider's id
+        Index("ix_transactions_external_id", "external_id"),
+        # Reconciliation walks stale pending payments oldest first
+        Index("ix_transactions_status_created_at", "status", "created_at", "id"),
+    )
 
     id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     order_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), ForeignKey("orders.id", ondelete="CASCADE"), nullable=False)
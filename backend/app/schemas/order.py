@@ -55,4 +55,6 @@ class OrderResponse(BaseModel):
 
 class OrderListResponse(BaseModel):
     items: list[OrderResponse]
-    total: int
+    total: int | None  # None when the list was requested with count=none
+    has_more: bool = False
+    next_cursor: str | None = None
@@ -33,6 +33,18 @@ class ProductUpdate(BaseModel):
     is_active: bool | None = None
 
 
+class ProductBulkChange(BaseModel):
+    product_id: UUID
+    # None leaves the field unchanged
+    price: float | None = Field(None, gt=0)
+    quantity: float | None = Field(None, ge=0)
+    is_active: bool | None = None
+
+
+class ProductBulkUpdate(BaseModel):
+    items: list[ProductBulkChange] = Field(..., min_length=1, max_length=1000)
+
+
 class ProductResponse(ProductBase):
     id: UUID
     farmer_id: UUID
@@ -46,4 +58,24 @@ class ProductResponse(ProductBase):
 
 class ProductListResponse(BaseModel):
     items: list[ProductResponse]
-    total: int
+    total: int | None  # None when the list was requested with count=none
+    has_more: bool = False
+    next_cursor: str | None = None
+
+
+class ProductBulkUpdateResponse(BaseModel):
+    items: list[ProductResponse]
+
+
+class ProductImportRowError(BaseModel):
+    line: int
+    message: str
+
+
+class ProductImportResponse(BaseModel):
+    created: int
+    updated: int
+    failed: int
+    errors: list[ProductImportRowError]
+    # More rows failed than are listed in errors
+    errors_truncated: bool = False
@@ -30,5 +30,9 @@ class UserUpdateRequest(BaseModel):
     email: str | None = Field(default=None, max_length=255)
 
 
+class UserStatusUpdate(BaseModel):
+    is_active: bool
+
+
 class UserResponse(UserBase):
     id: str
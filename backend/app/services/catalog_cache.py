@@ -0,0 +1,194 @@
+"""Read-through cache for the public product catalogue (GET /products, GET /products/{id})."""
+
+from __future__ import annotations
+
+import enum
+import hashlib
+import json
+import uuid
+from collections.abc import Awaitable, Callable, Iterable, Mapping
+from dataclasses import dataclass
+from typing import Any, TypeVar
+
+from pydantic import BaseModel
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+
+from app.core.cache import TTLCache
+from app.core.config import get_settings
+from app.core.redis import RedisBackoff, get_redis
+
+M = TypeVar("M", bound=BaseModel)
+
+LIST_KEY = "catalog:lists"
+PRODUCT_KEY_PREFIX = "catalog:product:"
+
+
+def list_cache_key(params: Mapping[str, Any]) -> str:
+    """
+    Build a stable key for a product list query.
+
+    None values are dropped and keys sorted, so ``?limit=20`` and ``?limit=20&category=``
+    share an entry; search text is whitespace-normalized.
+    """
+    normalized: dict[str, Any] = {}
+    for name, value in params.items():
+        if value is None:
+            continue
+        if isinstance(value, enum.Enum):
+            value = value.value
+        elif isinstance(value, uuid.UUID):
+            value = str(value)
+        elif isinstance(value, str):
+            value = " ".join(value.split())
+        normalized[name] = value
+    payload = json.dumps(normalized, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha1(payload.encode()).hexdigest()
+
+
+@dataclass
+class CacheStats:
+    local_hits: int = 0
+    redis_hits: int = 0
+    misses: int = 0
+    redis_errors: int = 0
+
+    @property
+    def hit_ratio(self) -> float:
+        lookups = self.local_hits + self.redis_hits + self.misses
+        return (self.local_hits + self.redis_hits) / lookups if lookups else 0.0
+
+
+class CatalogCache:
+    """
+    Two-tier cache: a small in-process LRU with a short TTL in front of Redis.
+
+    List pages live as fields of one Redis hash, so any catalogue write drops them all
+    with a single DEL; product details have one key each. The in-process tier is only
+    cleared on the worker that made the write, so other workers may serve a stale page
+    for up to ``local_ttl`` seconds. Redis failures degrade to loading from the database.
+    """
+
+    def __init__(
+        self,
+        *,
+        redis: Callable[[], Redis] | None,
+        ttl: int,
+        local_ttl: float,
+        local_size: int,
+        enabled: bool = True,
+    ) -> None:
+        self.enabled = enabled
+        self.ttl = ttl
+        self.stats = CacheStats()
+        self._redis_factory = redis
+        self._local: TTLCache[str, BaseModel] = TTLCache(maxsize=local_size, ttl=local_ttl)
+        self._redis_backoff = RedisBackoff("Catalog cache", "bypassing it")
+
+    def _redis(self) -> Redis | None:
+        if self._redis_factory is None or not self._redis_backoff.available:
+            return None
+        return self._redis_factory()
+
+    def _redis_failed(self, exc: RedisError) -> None:
+        self.stats.redis_errors += 1
+        self._redis_backoff.failed(exc)
+
+    async def get_list(self, params: Mapping[str, Any], model: type[M], load: Callable[[], Awaitable[M]]) -> M:
+        field = list_cache_key(params)
+        return await self._get_or_load(
+            f"{LIST_KEY}:{field}",
+            model,
+            load,
+            read=lambda redis: redis.hget(LIST_KEY, field),
+            write=lambda redis, raw: self._write_list(redis, field, raw),
+        )
+
+    async def get_product(self, product_id: uuid.UUID, model: type[M], load: Callable[[], Awaitable[M]]) -> M:
+        key = f"{PRODUCT_KEY_PREFIX}{product_id}"
+        return await self._get_or_load(
+            key,
+            model,
+            load,
+            read=lambda redis: redis.get(key),
+            write=lambda redis, raw: redis.set(key, raw, ex=self.ttl),
+        )
+
+    async def _write_list(self, redis: Redis, field: str, raw: str) -> None:
+        async with redis.pipeline(transaction=False) as pipe:
+            pipe.hset(LIST_KEY, field, raw)
+            # The whole hash expires ttl seconds after its first entry; writes clear it sooner
+            pipe.expire(LIST_KEY, self.ttl, nx=True)
+            await pipe.execute()
+
+    async def _get_or_load(
+        self,
+        local_key: str,
+        model: type[M],
+        load: Callable[[], Awaitable[M]],
+        *,
+        read: Callable[[Redis], Awaitable[bytes | None]],
+        write: Callable[[Redis, str], Awaitable[Any]],
+    ) -> M:
+        if not self.enabled:
+            return await load()
+
+        cached = self._local.get(local_key)
+        if cached is not None:
+            self.stats.local_hits += 1
+            return cached  # type: ignore[return-value]
+
+        redis = self._redis()
+        if redis is not None:
+            try:
+                raw = await read(redis)
+            except RedisError as exc:
+                self._redis_failed(exc)
+            else:
+                if raw is not None:
+                    self.stats.redis_hits += 1
+                    value = model.model_validate_json(raw)
+                    self._local.set(local_key, value)
+                    return value
+
+        self.stats.misses += 1
+        value = await load()
+        self._local.set(local_key, value)
+        redis = self._redis()
+        if redis is not None:
+            try:
+                await write(redis, value.model_dump_json())
+            except RedisError as exc:
+                self._redis_failed(exc)
+        return value
+
+    async def invalidate(self, product_ids: Iterable[uuid.UUID] = ()) -> None:
+        """
+        Drop every cached list page and the given products' detail entries.
+
+        Call after the write has been committed; invalidating earlier lets a concurrent
+        miss re-cache the old rows until the TTL runs out.
+        """
+        # Writes are rare next to reads: dropping the whole local tier is simpler than
+        # tracking which pages contained the products
+        self._local.clear()
+        redis = self._redis()
+        if redis is None:
+            return
+        try:
+            await redis.delete(LIST_KEY, *(f"{PRODUCT_KEY_PREFIX}{product_id}" for product_id in product_ids))
+        except RedisError as exc:
+            self._redis_failed(exc)
+
+    def clear_local(self) -> None:
+        self._local.clear()
+
+
+settings = get_settings()
+catalog_cache = CatalogCache(
+    redis=get_redis,
+    ttl=settings.catalog_cache_ttl_seconds,
+    local_ttl=settings.catalog_cache_local_ttl_seconds,
+    local_size=settings.catalog_cache_local_size,
+    enabled=settings.catalog_cache_enabled,
+)
@@ -0,0 +1,124 @@
+"""Set-based stock reservation for orders."""
+
+from __future__ import annotations
+
+import logging
+from collections.abc import Iterable
+from dataclasses import dataclass
+from uuid import UUID
+
+from sqlalchemy import case, literal, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.product import Product
+
+logger = logging.getLogger(__name__)
+
+
+class StockReservationError(Exception):
+    """Base error for a reservation that could not be applied."""
+
+    def __init__(self, product_id: UUID, message: str) -> None:
+        super().__init__(message)
+        self.product_id = product_id
+
+
+class ProductNotFoundError(StockReservationError):
+    """Product does not exist or is inactive."""
+
+
+class ProductOwnershipError(StockReservationError):
+    """Product belongs to a different farmer than the order."""
+
+
+class InsufficientStockError(StockReservationError):
+    """Product does not have enough quantity left."""
+
+
+@dataclass(frozen=True)
+class ReservedProduct:
+    product_id: UUID
+    name: str
+    price: float
+    quantity: float
+
+
+async def reserve_stock(
+    db: AsyncSession,
+    *,
+    farmer_id: UUID,
+    items: Iterable[tuple[UUID, float]],
+) -> dict[UUID, ReservedProduct]:
+    """
+    Validate and decrement stock for all line items of an order.
+
+    Runs two statements regardless of the number of items: a ``SELECT ... FOR UPDATE``
+    that locks the product rows in primary key order (so concurrent orders sharing
+    products cannot deadlock), and one conditional ``UPDATE ... RETURNING`` that only
+    touches rows which are active, owned by ``farmer_id`` and still have enough stock.
+    If any row is left out the reason is looked up and a ``StockReservationError`` is
+    raised; the caller must roll back the transaction.
+
+    Returns:
+        dict of product id -> reserved product with the price at reservation time
+    """
+    requested: dict[UUID, float] = {}
+    for product_id, quantity in items:
+        requested[product_id] = requested.get(product_id, 0.0) + quantity
+    product_ids = sorted(requested)
+
+    lock_stmt = select(Product.id).where(Product.id.in_(product_ids)).order_by(Product.id).with_for_update()
+    await db.execute(lock_stmt)
+
+    requested_quantity = case(
+        *[(Product.id == product_id, literal(quantity, Product.quantity.type)) for product_id, quantity in requested.items()],
+    )
+    reserve_stmt = (
+        update(Product)
+        .where(
+            Product.id.in_(product_ids),
+            Product.is_active.is_(True),
+            Product.farmer_id == farmer_id,
+            Product.quantity >= requested_quantity,
+        )
+        .values(quantity=Product.quantity - requested_quantity)
+        .returning(Product.id, Product.name, Product.price)
+        .execution_options(synchronize_session=False)
+    )
+    result = await db.execute(reserve_stmt)
+    reserved = {
+        row.id: ReservedProduct(product_id=row.id, name=row.name, price=float(row.price), quantity=requested[row.id])
+        for row in result
+    }
+
+    if len(reserved) != len(product_ids):
+        missing = [product_id for product_id in product_ids if product_id not in reserved]
+        await _raise_reservation_error(db, farmer_id=farmer_id, product_ids=missing, requested=requested)
+
+    return reserved
+
+
+async def _raise_reservation_error(
+    db: AsyncSession,
+    *,
+    farmer_id: UUID,
+    product_ids: list[UUID],
+    requested: dict[UUID, float],
+) -> None:
+    """Explain why the first rejected product could not be reserved."""
+    stmt = select(Product.id, Product.name, Product.farmer_id, Product.is_active, Product.quantity).where(
+        Product.id.in_(product_ids)
+    )
+    result = await db.execute(stmt)
+    rows = {row.id: row for row in result}
+
+    for product_id in product_ids:
+        row = rows.get(product_id)
+        if row is None or not row.is_active:
+            raise ProductNotFoundError(product_id, f"Product {product_id} not found")
+        if row.farmer_id != farmer_id:
+            raise ProductOwnershipError(product_id, f"Product {product_id} does not belong to this farmer")
+        logger.info(
+            f"Insufficient quantity for product {product_id}: available={row.quantity}, requested={requested[product_id]}"
+        )
+        raise InsufficientStockError(product_id, f"Insufficient quantity for product {row.name}")
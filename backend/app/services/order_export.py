@@ -0,0 +1,193 @@
+"""Streaming export of orders with their items as CSV or NDJSON."""
+
+from __future__ import annotations
+
+import csv
+import enum
+import io
+import json
+import logging
+from collections.abc import AsyncIterator
+from dataclasses import dataclass
+from datetime import datetime
+from decimal import Decimal
+from typing import Any
+from uuid import UUID
+
+from sqlalchemy import Select, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.models.order import Order, OrderItem, OrderStatus
+from app.models.product import Product
+
+logger = logging.getLogger(__name__)
+
+
+class ExportFormat(str, enum.Enum):
+    CSV = "csv"
+    NDJSON = "ndjson"
+
+
+MEDIA_TYPES = {ExportFormat.CSV: "text/csv; charset=utf-8", ExportFormat.NDJSON: "application/x-ndjson"}
+
+ORDER_COLUMNS = (
+    "order_id",
+    "created_at",
+    "updated_at",
+    "status",
+    "shop_id",
+    "farmer_id",
+    "total_amount",
+    "delivery_address",
+    "notes",
+)
+ITEM_COLUMNS = ("item_id", "product_id", "product_name", "quantity", "price")
+# Text is flushed to the client in chunks of roughly this many characters
+CHUNK_CHARS = 64 * 1024
+# Spreadsheets evaluate cells starting with these as formulas; such text is exported with a leading '
+FORMULA_PREFIXES = ("=", "+", "-", "@", "\t", "\r")
+
+
+@dataclass(frozen=True)
+class OrderExportFilters:
+    created_from: datetime | None = None
+    created_to: datetime | None = None
+    status: OrderStatus | None = None
+    farmer_id: UUID | None = None
+    shop_id: UUID | None = None
+
+
+def export_statement(filters: OrderExportFilters) -> Select:
+    """
+    Flat order x item rows, oldest first, so each order's items are adjacent.
+
+    Ordered by (created_at, id) to walk ix_orders_created_at (or the farmer/shop/status
+    variants) instead of sorting the whole range.
+    """
+    stmt = (
+        select(
+            Order.id.label("order_id"),
+            Order.created_at,
+            Order.updated_at,
+            Order.status,
+            Order.shop_id,
+            Order.farmer_id,
+            Order.total_amount,
+            Order.delivery_address,
+            Order.notes,
+            OrderItem.id.label("item_id"),
+            OrderItem.product_id,
+            Product.name.label("product_name"),
+            OrderItem.quantity,
+            OrderItem.price,
+        )
+        .outerjoin(OrderItem, OrderItem.order_id == Order.id)
+        .outerjoin(Product, Product.id == OrderItem.product_id)
+        .order_by(Order.created_at, Order.id, OrderItem.id)
+    )
+    if filters.created_from is not None:
+        stmt = stmt.where(Order.created_at >= filters.created_from)
+    if filters.created_to is not None:
+        stmt = stmt.where(Order.created_at < filters.created_to)
+    if filters.status is not None:
+        stmt = stmt.where(Order.status == filters.status)
+    if filters.farmer_id is not None:
+        stmt = stmt.where(Order.farmer_id == filters.farmer_id)
+    if filters.shop_id is not None:
+        stmt = stmt.where(Order.shop_id == filters.shop_id)
+    return stmt
+
+
+def _plain(value: Any, *, numbers: bool = False) -> Any:
+    """CSV/JSON-friendly form of a column value; ``numbers`` keeps amounts numeric for JSON."""
+    if isinstance(value, enum.Enum):
+        return value.value
+    if isinstance(value, Decimal):
+        return float(value) if numbers else str(value)
+    if isinstance(value, UUID):
+        return str(value)
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+def _csv_cell(value: Any) -> Any:
+    """``_plain`` for CSV, with text that a spreadsheet would run as a formula escaped."""
+    if isinstance(value, str) and not isinstance(value, enum.Enum) and value.startswith(FORMULA_PREFIXES):
+        return f"'{value}"
+    return _plain(value)
+
+
+async def _stream_rows(
+    session_factory: async_sessionmaker[AsyncSession],
+    filters: OrderExportFilters,
+    batch_size: int,
+) -> AsyncIterator[Any]:
+    # The response body outlives the request's dependencies, so the export owns its session
+    async with session_factory() as session:
+        # yield_per makes asyncpg use a server-side cursor and fetch batch_size rows at a time
+        result = await session.stream(export_statement(filters).execution_options(yield_per=batch_size))
+        async for row in result:
+            yield row
+
+
+async def stream_orders_csv(
+    session_factory: async_sessionmaker[AsyncSession],
+    filters: OrderExportFilters,
+    *,
+    batch_size: int = 1000,
+) -> AsyncIterator[str]:
+    """One line per order item, order columns repeated; orders without items get one line."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow((*ORDER_COLUMNS, *ITEM_COLUMNS))
+    rows = 0
+    async for row in _stream_rows(session_factory, filters, batch_size):
+        writer.writerow([_csv_cell(getattr(row, column)) for column in (*ORDER_COLUMNS, *ITEM_COLUMNS)])
+        rows += 1
+        if buffer.tell() >= CHUNK_CHARS:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+    logger.info(f"Exported {rows} order item rows as CSV")
+
+
+async def stream_orders_ndjson(
+    session_factory: async_sessionmaker[AsyncSession],
+    filters: OrderExportFilters,
+    *,
+    batch_size: int = 1000,
+) -> AsyncIterator[str]:
+    """One JSON object per order with its items nested."""
+    chunk: list[str] = []
+    size = 0
+    orders = 0
+    current: dict[str, Any] | None = None
+
+    def finish(order: dict[str, Any]) -> None:
+        nonlocal size, orders
+        line = json.dumps(order, ensure_ascii=False) + "\n"
+        chunk.append(line)
+        size += len(line)
+        orders += 1
+
+    async for row in _stream_rows(session_factory, filters, batch_size):
+        if current is None or current["order_id"] != str(row.order_id):
+            if current is not None:
+                finish(current)
+            current = {column: _plain(getattr(row, column), numbers=True) for column in ORDER_COLUMNS}
+            current["items"] = []
+        if row.item_id is not None:
+            current["items"].append({column: _plain(getattr(row, column), numbers=True) for column in ITEM_COLUMNS})
+        if size >= CHUNK_CHARS:
+            yield "".join(chunk)
+            chunk.clear()
+            size = 0
+    if current is not None:
+        finish(current)
+    yield "".join(chunk)
+    logger.info(f"Exported {orders} orders as NDJSON")
+
+
+EXPORTERS = {ExportFormat.CSV: stream_orders_csv, ExportFormat.NDJSON: stream_orders_ndjson}
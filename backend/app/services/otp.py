@@ -0,0 +1,215 @@
+"""Storage for one-time login codes: Redis keys with native TTL, or the phone_otps table."""
+
+from __future__ import annotations
+
+import abc
+import math
+from datetime import datetime, timedelta
+
+from redis.asyncio import Redis
+from sqlalchemy import delete, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import get_settings
+from app.core.redis import get_redis
+from app.models.otp import PhoneOTP
+
+KEY_PREFIX = "otp:"
+
+# KEYS: cooldown, code; ARGV: code, code TTL, resend interval. Returns 0 once the code is
+# stored, else the seconds left on the cooldown. Cooldown and code are written together,
+# so a failed write never leaves a number in cooldown without a code.
+ISSUE_SCRIPT = """
+if not redis.call('SET', KEYS[1], 1, 'NX', 'EX', ARGV[3]) then
+    return math.max(redis.call('TTL', KEYS[1]), 1)
+end
+redis.call('DEL', KEYS[2])
+redis.call('HSET', KEYS[2], 'code', ARGV[1], 'attempts', 0)
+redis.call('EXPIRE', KEYS[2], ARGV[2])
+return 0
+"""
+
+
+class OTPError(Exception):
+    """A code could not be issued or verified; the message is safe to show to the client."""
+
+
+class OTPCooldownError(OTPError):
+    """A code was sent to this number too recently."""
+
+    def __init__(self, retry_after: int) -> None:
+        super().__init__("OTP recently sent. Try again later.")
+        self.retry_after = retry_after
+
+
+class OTPNotFoundError(OTPError):
+    def __init__(self) -> None:
+        super().__init__("OTP not found")
+
+
+class OTPExpiredError(OTPError):
+    def __init__(self) -> None:
+        super().__init__("OTP expired")
+
+
+class OTPAttemptsExceededError(OTPError):
+    def __init__(self) -> None:
+        super().__init__("OTP attempt limit exceeded")
+
+
+class OTPInvalidError(OTPError):
+    def __init__(self) -> None:
+        super().__init__("Invalid OTP code")
+
+
+class OTPStore(abc.ABC):
+    """
+    Latest code per phone number.
+
+    ``verify`` counts every attempt, correct or not, with an atomic increment-and-check,
+    so concurrent guesses cannot exceed the limit. A verified code stays valid until
+    ``discard`` so a request rejected for other reasons (missing role) can be retried.
+    """
+
+    def __init__(self, *, ttl_seconds: int, resend_interval_seconds: int, max_attempts: int) -> None:
+        self.ttl_seconds = ttl_seconds
+        self.resend_interval_seconds = resend_interval_seconds
+        self.max_attempts = max_attempts
+
+    @abc.abstractmethod
+    async def issue(self, phone_number: str, code: str) -> None:
+        """Store a new code, replacing the previous one; raises OTPCooldownError during the resend interval."""
+
+    @abc.abstractmethod
+    async def verify(self, phone_number: str, code: str) -> None:
+        """Raise an OTPError subclass unless ``code`` is the current code for the number."""
+
+    @abc.abstractmethod
+    async def discard(self, phone_number: str) -> None:
+        """Forget the number's code once it has been used."""
+
+
+class RedisOTPStore(OTPStore):
+    """
+    Code and attempt counter in one hash that expires with the code, cooldown in its own key.
+
+    Expiry is left to Redis, so an expired code reports "OTP not found" and nothing has to
+    be purged. The cooldown key outlives ``discard`` so logging in does not reset it.
+    """
+
+    def __init__(self, redis: Redis, **limits: int) -> None:
+        super().__init__(**limits)
+        self.redis = redis
+        self._issue = redis.register_script(ISSUE_SCRIPT)
+
+    @staticmethod
+    def code_key(phone_number: str) -> str:
+        return f"{KEY_PREFIX}{phone_number}"
+
+    @staticmethod
+    def cooldown_key(phone_number: str) -> str:
+        return f"{KEY_PREFIX}{phone_number}:cooldown"
+
+    async def issue(self, phone_number: str, code: str) -> None:
+        retry_after = await self._issue(
+            keys=[self.cooldown_key(phone_number), self.code_key(phone_number)],
+            args=[code, self.ttl_seconds, self.resend_interval_seconds],
+        )
+        if retry_after:
+            raise OTPCooldownError(int(retry_after))
+
+    async def verify(self, phone_number: str, code: str) -> None:
+        key = self.code_key(phone_number)
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.hincrby(key, "attempts", 1)
+            pipe.hget(key, "code")
+            # HINCRBY on a missing key creates one without a TTL; give such strays the code's lifetime
+            pipe.expire(key, self.ttl_seconds, nx=True)
+            attempts, stored_code, _ = await pipe.execute()
+
+        if stored_code is None:
+            raise OTPNotFoundError()
+        if attempts > self.max_attempts:
+            raise OTPAttemptsExceededError()
+        if stored_code.decode() != code:
+            raise OTPInvalidError()
+
+    async def discard(self, phone_number: str) -> None:
+        await self.redis.delete(self.code_key(phone_number))
+
+
+class DatabaseOTPStore(OTPStore):
+    """
+    The phone_otps table, for deployments and tests without Redis.
+
+    Issuing a code deletes the number's previous rows, so the table holds at most one
+    row per number. ``discard`` only stages the delete; the caller commits it together
+    with the user it logs in.
+    """
+
+    def __init__(self, db: AsyncSession, **limits: int) -> None:
+        super().__init__(**limits)
+        self.db = db
+
+    async def _latest(self, phone_number: str) -> PhoneOTP | None:
+        stmt = (
+            select(PhoneOTP)
+            .where(PhoneOTP.phone_number == phone_number)
+            .order_by(PhoneOTP.created_at.desc())
+            .limit(1)
+        )
+        result = await self.db.execute(stmt)
+        return result.scalar_one_or_none()
+
+    async def issue(self, phone_number: str, code: str) -> None:
+        now = datetime.utcnow()
+        existing = await self._latest(phone_number)
+        if existing is not None:
+            elapsed = (now - existing.created_at).total_seconds()
+            if elapsed < self.resend_interval_seconds:
+                raise OTPCooldownError(max(math.ceil(self.resend_interval_seconds - elapsed), 1))
+            await self.db.execute(delete(PhoneOTP).where(PhoneOTP.phone_number == phone_number))
+
+        self.db.add(
+            PhoneOTP(
+                phone_number=phone_number,
+                code=code,
+                expires_at=now + timedelta(seconds=self.ttl_seconds),
+                max_attempts=self.max_attempts,
+            )
+        )
+        await self.db.commit()
+
+    async def verify(self, phone_number: str, code: str) -> None:
+        otp = await self._latest(phone_number)
+        if otp is None:
+            raise OTPNotFoundError()
+        if otp.expires_at < datetime.utcnow():
+            raise OTPExpiredError()
+
+        result = await self.db.execute(
+            update(PhoneOTP)
+            .where(PhoneOTP.id == otp.id, PhoneOTP.attempts < PhoneOTP.max_attempts)
+            .values(attempts=PhoneOTP.attempts + 1)
+            .execution_options(synchronize_session=False)
+        )
+        if result.rowcount == 0:
+            raise OTPAttemptsExceededError()
+        if otp.code != code:
+            await self.db.commit()
+            raise OTPInvalidError()
+
+    async def discard(self, phone_number: str) -> None:
+        await self.db.execute(delete(PhoneOTP).where(PhoneOTP.phone_number == phone_number))
+
+
+def get_otp_store(db: AsyncSession) -> OTPStore:
+    settings = get_settings()
+    limits = {
+        "ttl_seconds": settings.otp_expiration_minutes * 60,
+        "resend_interval_seconds": settings.otp_resend_interval_seconds,
+        "max_attempts": settings.otp_attempt_limit,
+    }
+    if settings.otp_store_backend == "database":
+        return DatabaseOTPStore(db, **limits)
+    return RedisOTPStore(get_redis(), **limits)
@@ -0,0 +1,232 @@
+"""Transactional outbox: domain events stored with the change they describe and relayed in batches."""
+
+from __future__ import annotations
+
+import asyncio
+import collections
+import enum
+import functools
+import json
+import logging
+import time
+import uuid
+from collections.abc import Iterator, Sequence
+from datetime import datetime, timedelta
+from typing import Any
+
+from redis.asyncio import Redis
+from sqlalchemy import delete, func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.core.config import get_settings
+from app.core.instrumentation import registry
+from app.core.metrics import Labels
+from app.core.redis import get_redis
+from app.db.session import async_session
+from app.models.outbox import OutboxEvent
+
+logger = logging.getLogger(__name__)
+
+# Published events older than the retention are deleted at most this often
+PURGE_INTERVAL_SECONDS = 3600.0
+
+registry.describe("outbox_events_published_total", "counter", "Outbox events published by the relay, by event type.")
+registry.describe("outbox_publish_delay_seconds", "histogram", "Time from writing an outbox event to publishing it.")
+registry.describe("outbox_relay_batch_seconds", "histogram", "Time per relay batch: claim, publish and mark published.")
+# Every API process runs a relay over the same table: merged as the maximum, not summed
+registry.describe(
+    "outbox_relay_lag_seconds",
+    "gauge",
+    "Age of the oldest unpublished outbox event after the last relay pass.",
+    merge="max",
+)
+
+
+class EventType(str, enum.Enum):
+    ORDER_CREATED = "order.created"
+    PAYMENT_COMPLETED = "payment.completed"
+    DELIVERY_DELIVERED = "delivery.delivered"
+
+
+def outbox_event(event_type: EventType, aggregate_id: uuid.UUID, **payload: Any) -> OutboxEvent:
+    return OutboxEvent(
+        id=uuid.uuid4(),
+        event_type=event_type.value,
+        aggregate_id=aggregate_id,
+        payload=json.dumps(payload, default=str),
+        created_at=datetime.utcnow(),
+    )
+
+
+def record_event(db: AsyncSession, event_type: EventType, aggregate_id: uuid.UUID, **payload: Any) -> OutboxEvent:
+    """Stage an event in the caller's transaction; it is published only if that transaction commits."""
+    event = outbox_event(event_type, aggregate_id, **payload)
+    db.add(event)
+    return event
+
+
+def _message(event: OutboxEvent) -> dict[str, str]:
+    return {
+        "id": str(event.id),
+        "type": event.event_type,
+        "aggregate_id": str(event.aggregate_id),
+        "payload": event.payload,
+        "created_at": event.created_at.isoformat(),
+    }
+
+
+class RedisStreamPublisher:
+    """Appends events to one Redis stream, trimmed to about ``maxlen`` entries; consumers use their own groups."""
+
+    def __init__(self, redis: Redis, *, stream: str = "events:outbox", maxlen: int | None = 100_000) -> None:
+        self.redis = redis
+        self.stream = stream
+        self.maxlen = maxlen
+
+    async def publish(self, events: Sequence[OutboxEvent]) -> None:
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for event in events:
+                pipe.xadd(self.stream, _message(event), maxlen=self.maxlen, approximate=True)
+            await pipe.execute()
+
+
+class MemoryEventPublisher:
+    """In-process stand-in for ``RedisStreamPublisher``: keeps the last ``maxlen`` messages, for dev and tests."""
+
+    def __init__(self, *, maxlen: int | None = 100_000) -> None:
+        self.messages: collections.deque[dict[str, str]] = collections.deque(maxlen=maxlen)
+
+    async def publish(self, events: Sequence[OutboxEvent]) -> None:
+        self.messages.extend(_message(event) for event in events)
+
+
+EventPublisher = RedisStreamPublisher | MemoryEventPublisher
+
+
+class OutboxRelay:
+    """
+    Publishes unpublished outbox events oldest first, ``batch_size`` at a time.
+
+    A batch is claimed with FOR UPDATE SKIP LOCKED, published, and marked published in the
+    same transaction. A relay that dies between publishing and committing publishes the
+    batch again, so delivery is at least once: consumers deduplicate on the event ``id``.
+    Several relays may run; order is kept within a batch, not across relays.
+    """
+
+    def __init__(
+        self,
+        sessionmaker: async_sessionmaker[AsyncSession],
+        publisher: EventPublisher,
+        *,
+        batch_size: int = 200,
+        poll_interval: float = 1.0,
+        retention: timedelta | None = timedelta(hours=72),
+    ) -> None:
+        self.sessionmaker = sessionmaker
+        self.publisher = publisher
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.retention = retention
+        self.lag_seconds = 0.0
+        self._purged_at = 0.0
+
+    async def run_once(self) -> int:
+        """Publish one batch; returns how many events it held."""
+        started = time.perf_counter()
+        async with self.sessionmaker() as db:
+            stmt = (
+                select(OutboxEvent)
+                .where(OutboxEvent.published_at.is_(None))
+                .order_by(OutboxEvent.created_at, OutboxEvent.id)
+                .limit(self.batch_size)
+                .with_for_update(skip_locked=True)
+            )
+            events = (await db.execute(stmt)).scalars().all()
+            if not events:
+                await db.commit()
+                return 0
+
+            await self.publisher.publish(events)
+            now = datetime.utcnow()
+            await db.execute(
+                update(OutboxEvent)
+                .where(OutboxEvent.id.in_([event.id for event in events]))
+                .values(published_at=now)
+                .execution_options(synchronize_session=False)
+            )
+            await db.commit()
+
+        for event in events:
+            registry.inc("outbox_events_published_total", (("type", event.event_type),))
+            registry.histogram("outbox_publish_delay_seconds", ()).observe((now - event.created_at).total_seconds())
+        registry.histogram("outbox_relay_batch_seconds", ()).observe(time.perf_counter() - started)
+        return len(events)
+
+    async def drain(self) -> int:
+        """Publish batches until none are left, then refresh the lag gauge."""
+        published = 0
+        while True:
+            count = await self.run_once()
+            published += count
+            if count < self.batch_size:
+                break
+        async with self.sessionmaker() as db:
+            oldest = await db.scalar(select(func.min(OutboxEvent.created_at)).where(OutboxEvent.published_at.is_(None)))
+        self.lag_seconds = (datetime.utcnow() - oldest).total_seconds() if oldest else 0.0
+        return published
+
+    async def purge(self) -> int:
+        """Delete events published longer than ``retention`` ago."""
+        if self.retention is None:
+            return 0
+        async with self.sessionmaker() as db:
+            result = await db.execute(
+                delete(OutboxEvent).where(OutboxEvent.published_at < datetime.utcnow() - self.retention)
+            )
+            await db.commit()
+        return result.rowcount
+
+    async def run(self) -> None:
+        """Relay until cancelled; publisher or database errors are logged and retried after ``poll_interval``."""
+        logger.info(f"Outbox relay started with {type(self.publisher).__name__}")
+        while True:
+            try:
+                published = await self.drain()
+                if published:
+                    logger.info(f"Outbox relay published {published} events")
+                if time.monotonic() - self._purged_at >= PURGE_INTERVAL_SECONDS:
+                    self._purged_at = time.monotonic()
+                    purged = await self.purge()
+                    if purged:
+                        logger.info(f"Outbox relay purged {purged} published events")
+            except Exception as exc:
+                logger.warning(f"Outbox relay failed, retrying in {self.poll_interval}s: {exc}")
+            await asyncio.sleep(self.poll_interval)
+
+
+@functools.lru_cache(maxsize=None)
+def get_event_publisher() -> EventPublisher:
+    settings = get_settings()
+    if settings.outbox_publisher_backend == "memory":
+        return MemoryEventPublisher(maxlen=settings.outbox_stream_maxlen)
+    return RedisStreamPublisher(get_redis(), stream=settings.outbox_stream_key, maxlen=settings.outbox_stream_maxlen)
+
+
+@functools.lru_cache(maxsize=None)
+def get_outbox_relay() -> OutboxRelay:
+    settings = get_settings()
+    return OutboxRelay(
+        async_session,
+        get_event_publisher(),
+        batch_size=settings.outbox_batch_size,
+        poll_interval=settings.outbox_poll_interval_seconds,
+        retention=timedelta(hours=settings.outbox_retention_hours) if settings.outbox_retention_hours else None,
+    )
+
+
+def _collect_lag() -> Iterator[tuple[str, Labels, float]]:
+    if get_outbox_relay.cache_info().currsize:
+        yield "outbox_relay_lag_seconds", (), get_outbox_relay().lag_seconds
+
+
+registry.add_collector(_collect_lag)
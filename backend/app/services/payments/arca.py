@@ -5,8 +5,6 @@ from __future__ import annotations
 import logging
 from typing import Any
 
-import httpx
-
 from app.core.config import get_settings
 from app.models.transaction import PaymentProvider
 from app.services.payments.base import PaymentAdapter
@@ -2,21 +2,33 @@
 
 from __future__ import annotations
 
+import hashlib
+import json
 from abc import ABC, abstractmethod
 from typing import Any
 
+import httpx
+
 from app.models.transaction import PaymentProvider, Transaction
+from app.services.payments.http import get_provider_client
 
 
 class PaymentAdapter(ABC):
     """Abstract base class for payment providers."""
 
+    base_url: str = ""
+
     @property
     @abstractmethod
     def provider(self) -> PaymentProvider:
         """Return the payment provider type."""
         pass
 
+    @property
+    def http(self) -> httpx.AsyncClient:
+        """The provider's pooled client (relative URLs resolve against ``base_url``); do not close it."""
+        return get_provider_client(self.provider, self.base_url)
+
     @abstractmethod
     async def create_payment(
         self,
@@ -49,10 +61,22 @@ class PaymentAdapter(ABC):
         Process webhook from payment provider.
         
         Returns:
-            dict with transaction_id, status, amount, etc.
+            dict with transaction_id (or external_id), status, amount, etc.
         """
         pass
 
+    def webhook_event_key(self, payload: dict[str, Any]) -> str:
+        """
+        Identify a webhook delivery so provider retries of the same event are stored once.
+
+        Uses the provider's event id when the payload has one, otherwise a hash of the payload.
+        """
+        event_id = payload.get("event_id")
+        if event_id:
+            return f"event:{event_id}"
+        canonical = json.dumps(payload, sort_keys=True, separators=(",", ":"), default=str)
+        return f"sha256:{hashlib.sha256(canonical.encode()).hexdigest()}"
+
     @abstractmethod
     async def refund_payment(self, external_id: str, amount: float | None = None, **kwargs: Any) -> dict[str, Any]:
         """
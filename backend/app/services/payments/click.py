@@ -6,8 +6,6 @@ import hashlib
 import logging
 from typing import Any
 
-import httpx
-
 from app.core.config import get_settings
 from app.models.transaction import PaymentProvider
 from app.services.payments.base import PaymentAdapter
@@ -1,5 +1,7 @@
 """Payment adapter factory."""
 
+import functools
+
 from app.models.transaction import PaymentProvider
 from app.services.payments.arca import ArcaAdapter
 from app.services.payments.base import PaymentAdapter
@@ -7,8 +9,9 @@ from app.services.payments.click import ClickAdapter
 from app.services.payments.payme import PaymeAdapter
 
 
+@functools.lru_cache(maxsize=None)
 def get_payment_adapter(provider: PaymentProvider) -> PaymentAdapter:
-    """Get payment adapter for the specified provider."""
+    """Get the payment adapter for the specified provider; one instance per provider and process."""
     adapters = {
         PaymentProvider.PAYME: PaymeAdapter,
         PaymentProvider.CLICK: ClickAdapter,
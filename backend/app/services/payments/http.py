@@ -0,0 +1,102 @@
+"""Pooled HTTP clients for payment provider APIs, one per provider, closed by the app lifespan."""
+
+from __future__ import annotations
+
+import importlib.util
+import logging
+import time
+
+import httpx
+
+from app.core.config import get_settings
+from app.core.instrumentation import registry
+from app.models.transaction import PaymentProvider
+
+logger = logging.getLogger(__name__)
+
+registry.describe(
+    "payment_provider_request_seconds",
+    "histogram",
+    "Payment provider API calls until response headers, by provider and outcome (2xx, 4xx, 5xx, error).",
+)
+
+_clients: dict[PaymentProvider, httpx.AsyncClient] = {}
+
+
+class InstrumentedTransport(httpx.AsyncBaseTransport):
+    """Wraps a transport to record per-provider latency, including calls that fail to connect or time out."""
+
+    def __init__(self, provider: PaymentProvider, transport: httpx.AsyncBaseTransport) -> None:
+        self.provider = provider
+        self.transport = transport
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        started = time.perf_counter()
+        outcome = "error"
+        try:
+            response = await self.transport.handle_async_request(request)
+            outcome = f"{response.status_code // 100}xx"
+            return response
+        finally:
+            labels = (("provider", self.provider.value), ("outcome", outcome))
+            registry.histogram("payment_provider_request_seconds", labels).observe(time.perf_counter() - started)
+
+    async def aclose(self) -> None:
+        await self.transport.aclose()
+
+
+def http2_available() -> bool:
+    return importlib.util.find_spec("h2") is not None
+
+
+def create_provider_client(
+    provider: PaymentProvider,
+    base_url: str,
+    transport: httpx.AsyncBaseTransport | None = None,
+) -> httpx.AsyncClient:
+    """
+    A keep-alive client with its own connection pool and explicit timeouts.
+
+    HTTP/2 multiplexes concurrent calls over one connection when the provider supports it;
+    it needs the ``h2`` package (``httpx[http2]``), without which the client speaks HTTP/1.1.
+    """
+    settings = get_settings()
+    if transport is None:
+        http2 = settings.payment_http2 and http2_available()
+        if settings.payment_http2 and not http2:
+            logger.warning(f"{provider.value}: h2 is not installed, using HTTP/1.1")
+        transport = httpx.AsyncHTTPTransport(
+            http2=http2,
+            limits=httpx.Limits(
+                max_connections=settings.payment_http_max_connections,
+                max_keepalive_connections=settings.payment_http_max_keepalive_connections,
+                keepalive_expiry=settings.payment_http_keepalive_expiry_seconds,
+            ),
+            # Retries only failed connection attempts, never a request that may have reached the provider
+            retries=1,
+        )
+    return httpx.AsyncClient(
+        base_url=base_url,
+        transport=InstrumentedTransport(provider, transport),
+        timeout=httpx.Timeout(
+            connect=settings.payment_http_connect_timeout_seconds,
+            read=settings.payment_http_read_timeout_seconds,
+            write=settings.payment_http_read_timeout_seconds,
+            pool=settings.payment_http_pool_timeout_seconds,
+        ),
+    )
+
+
+def get_provider_client(provider: PaymentProvider, base_url: str) -> httpx.AsyncClient:
+    """Return the provider's shared client, creating it on first use."""
+    client = _clients.get(provider)
+    if client is None or client.is_closed:
+        client = _clients[provider] = create_provider_client(provider, base_url)
+    return client
+
+
+async def close_provider_clients() -> None:
+    clients = list(_clients.values())
+    _clients.clear()
+    for client in clients:
+        await client.aclose()
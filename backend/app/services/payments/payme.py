@@ -7,23 +7,27 @@ import hmac
 import logging
 from typing import Any
 
-import httpx
-
 from app.core.config import get_settings
 from app.models.transaction import PaymentProvider
 from app.services.payments.base import PaymentAdapter
 
 logger = logging.getLogger(__name__)
 
+# Receipt states of the Payme Subscribe API that settle a payment; the others are still in progress
+RECEIPT_STATUSES = {4: "completed", 50: "cancelled"}
+
+
+class PaymeError(Exception):
+    """Payme answered a JSON-RPC call with an error."""
+
 
 class PaymeAdapter(PaymentAdapter):
     """Payme payment provider implementation."""
 
     def __init__(self) -> None:
         self.settings = get_settings()
-        # TODO: Load from settings
-        self.merchant_id = ""  # PAYME_MERCHANT_ID
-        self.key = ""  # PAYME_KEY
+        self.merchant_id = self.settings.payme_merchant_id
+        self.key = self.settings.payme_key
         self.base_url = "https://checkout.paycom.uz"  # Payme API base URL
 
     @property
@@ -35,6 +39,19 @@ class PaymeAdapter(PaymentAdapter):
         # TODO: Implement Payme signature generation
         return ""
 
+    async def _call(self, method: str, params: dict[str, Any]) -> dict[str, Any]:
+        """Call a Subscribe API method through the pooled client; returns its ``result``."""
+        response = await self.http.post(
+            "/api",
+            json={"id": 1, "method": method, "params": params},
+            headers={"X-Auth": f"{self.merchant_id}:{self.key}"},
+        )
+        response.raise_for_status()
+        body = response.json()
+        if body.get("error"):
+            raise PaymeError(f"{method}: {body['error'].get('message') or body['error']}")
+        return body["result"]
+
     async def create_payment(
         self,
         transaction: Any,
@@ -51,19 +68,32 @@ class PaymeAdapter(PaymentAdapter):
             mock = MockAdapter()
             return await mock.create_payment(transaction, amount, order_id, **kwargs)
         
-        # TODO: Implement Payme payment creation
-        # Reference: https://developer.help.paycom.uz/ru/protokol-merchant-api
+        # Reference: https://developer.help.paycom.uz/ru/metody-subscribe-api
         logger.info(f"Creating Payme payment for order {order_id}, amount {amount}")
+        result = await self._call(
+            "receipts.create",
+            # Amounts are in tiyin
+            {"amount": round(amount * 100), "account": {"order_id": order_id}},
+        )
+        receipt_id = result["receipt"]["_id"]
         return {
-            "payment_url": f"{self.base_url}/payment/{transaction.id}",
-            "payment_data": {"merchant_id": self.merchant_id},
+            "external_id": receipt_id,
+            "payment_url": f"{self.base_url}/{receipt_id}",
+            "payment_data": {"merchant_id": self.merchant_id, "receipt_id": receipt_id},
         }
 
     async def verify_payment(self, external_id: str, **kwargs: Any) -> dict[str, Any]:
-        """Verify payment status with Payme."""
-        # TODO: Implement Payme payment verification
+        """Verify payment status with Payme; in mock mode Payme is not asked and the payment stays pending."""
         logger.info(f"Verifying Payme payment {external_id}")
-        return {"status": "pending", "amount": 0.0}
+        if self.settings.sms_provider == "dev" or self.settings.payment_mock_mode:
+            return {"status": "pending", "amount": 0.0}
+
+        receipt = (await self._call("receipts.get", {"id": external_id}))["receipt"]
+        return {
+            "status": RECEIPT_STATUSES.get(receipt["state"], "pending"),
+            "amount": receipt["amount"] / 100,
+            "external_id": external_id,
+        }
 
     async def process_webhook(self, payload: dict[str, Any]) -> dict[str, Any]:
         """Process Payme webhook."""
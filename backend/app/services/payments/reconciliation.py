@@ -0,0 +1,205 @@
+"""Reconciliation of payments left pending: ask each provider and apply what it reports."""
+
+from __future__ import annotations
+
+import asyncio
+import functools
+import logging
+import time
+from collections import defaultdict
+from collections.abc import Callable, Iterator
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Any
+from uuid import UUID
+
+from sqlalchemy import func, literal, select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.core.config import get_settings
+from app.core.instrumentation import registry
+from app.core.metrics import Labels
+from app.db.session import async_session
+from app.models.transaction import PaymentProvider, Transaction, TransactionStatus
+from app.services.payments.base import PaymentAdapter
+from app.services.payments.factory import get_payment_adapter
+from app.services.payments.transitions import apply_transaction_statuses
+
+logger = logging.getLogger(__name__)
+
+# verify_payment statuses that settle a payment; anything else leaves it pending
+VERIFIED_STATUSES = {
+    "completed": TransactionStatus.COMPLETED,
+    "failed": TransactionStatus.FAILED,
+    "cancelled": TransactionStatus.CANCELLED,
+}
+
+registry.describe(
+    "payment_reconciliation_checks_total",
+    "counter",
+    "Stale pending transactions checked with the provider, by provider and result.",
+)
+registry.describe("payment_reconciliation_verify_seconds", "histogram", "verify_payment calls made by reconciliation, by provider.")
+# Global, but reported by every process that runs the reconciler: merged as the maximum
+registry.describe(
+    "payment_reconciliation_lag_seconds",
+    "gauge",
+    "Age of the oldest transaction still pending after the last reconciliation pass.",
+    merge="max",
+)
+
+
+@dataclass
+class ReconciliationReport:
+    checked: int = 0
+    errors: int = 0
+    # Transactions actually changed, by new status (expired ones are counted as cancelled)
+    updated: dict[str, int] = field(default_factory=dict)
+    elapsed: float = 0.0
+    lag_seconds: float = 0.0
+
+    @property
+    def per_second(self) -> float:
+        return self.checked / self.elapsed if self.elapsed else 0.0
+
+
+class PaymentReconciler:
+    """
+    Settles transactions that stayed pending longer than ``stale_after``.
+
+    One pass walks them oldest first in keyset batches over ``(created_at, id)``. Each batch
+    is verified with the providers concurrently, at most ``concurrency`` calls per provider.
+    The results are applied with the guarded set-wise updates used for webhooks, so a
+    webhook arriving meanwhile wins. No database connection is held while the providers
+    are called. Payments the provider still reports as pending after ``expire_after`` are
+    cancelled, which lets the shop start a new payment for the order.
+    """
+
+    def __init__(
+        self,
+        sessionmaker: async_sessionmaker[AsyncSession],
+        *,
+        stale_after: timedelta,
+        expire_after: timedelta | None = None,
+        batch_size: int = 200,
+        concurrency: int = 5,
+        adapter_for: Callable[[PaymentProvider], PaymentAdapter] = get_payment_adapter,
+    ) -> None:
+        self.sessionmaker = sessionmaker
+        self.stale_after = stale_after
+        self.expire_after = expire_after
+        self.batch_size = batch_size
+        self.adapter_for = adapter_for
+        self._semaphores: defaultdict[PaymentProvider, asyncio.Semaphore] = defaultdict(
+            lambda: asyncio.Semaphore(concurrency)
+        )
+        self.last_report: ReconciliationReport | None = None
+
+    def _batch_statement(self, cutoff: datetime, after: tuple[datetime, UUID] | None):
+        stmt = select(Transaction.id, Transaction.provider, Transaction.external_id, Transaction.created_at).where(
+            Transaction.status == TransactionStatus.PENDING,
+            Transaction.created_at < cutoff,
+        )
+        if after is not None:
+            stmt = stmt.where(
+                tuple_(Transaction.created_at, Transaction.id)
+                > tuple_(literal(after[0], Transaction.created_at.type), literal(after[1], Transaction.id.type))
+            )
+        return stmt.order_by(Transaction.created_at, Transaction.id).limit(self.batch_size)
+
+    async def _verify(self, row: Any) -> TransactionStatus | None:
+        """The provider's verdict, or None when asking failed."""
+        async with self._semaphores[row.provider]:
+            started = time.perf_counter()
+            try:
+                result = await self.adapter_for(row.provider).verify_payment(
+                    row.external_id or str(row.id), transaction_id=str(row.id)
+                )
+            except Exception as exc:
+                logger.warning(f"Reconciliation: verifying {row.provider.value} payment {row.id} failed: {exc}")
+                return None
+            finally:
+                registry.histogram("payment_reconciliation_verify_seconds", (("provider", row.provider.value),)).observe(
+                    time.perf_counter() - started
+                )
+        return VERIFIED_STATUSES.get(str(result.get("status")), TransactionStatus.PENDING)
+
+    async def run_once(self) -> ReconciliationReport:
+        started = time.perf_counter()
+        now = datetime.utcnow()
+        cutoff = now - self.stale_after
+        report = ReconciliationReport()
+        after: tuple[datetime, UUID] | None = None
+
+        while True:
+            async with self.sessionmaker() as db:
+                rows = (await db.execute(self._batch_statement(cutoff, after))).all()
+            if not rows:
+                break
+            after = (rows[-1].created_at, rows[-1].id)
+
+            verdicts = await asyncio.gather(*(self._verify(row) for row in rows))
+            targets: dict[UUID, TransactionStatus] = {}
+            for row, verdict in zip(rows, verdicts):
+                result = "error" if verdict is None else verdict.value
+                if verdict == TransactionStatus.PENDING and self.expire_after and row.created_at < now - self.expire_after:
+                    verdict, result = TransactionStatus.CANCELLED, "expired"
+                if verdict not in (None, TransactionStatus.PENDING):
+                    targets[row.id] = verdict
+                report.errors += verdict is None
+                registry.inc("payment_reconciliation_checks_total", (("provider", row.provider.value), ("result", result)))
+            report.checked += len(rows)
+
+            if targets:
+                async with self.sessionmaker() as db:
+                    changed = await apply_transaction_statuses(db, targets)
+                    await db.commit()
+                for status, count in changed.items():
+                    report.updated[status.value] = report.updated.get(status.value, 0) + count
+            if len(rows) < self.batch_size:
+                break
+
+        async with self.sessionmaker() as db:
+            oldest = await db.scalar(
+                select(func.min(Transaction.created_at)).where(Transaction.status == TransactionStatus.PENDING)
+            )
+        report.lag_seconds = (datetime.utcnow() - oldest).total_seconds() if oldest else 0.0
+        report.elapsed = time.perf_counter() - started
+        self.last_report = report
+        return report
+
+    async def run(self, interval: float) -> None:
+        """Reconcile every ``interval`` seconds until cancelled."""
+        logger.info(f"Payment reconciliation started: transactions pending for more than {self.stale_after}")
+        while True:
+            try:
+                report = await self.run_once()
+                logger.info(
+                    f"Reconciliation: checked {report.checked} in {report.elapsed:.1f}s "
+                    f"({report.per_second:.0f}/s), updated {report.updated or 0}, errors {report.errors}, "
+                    f"oldest pending {report.lag_seconds:.0f}s"
+                )
+            except Exception as exc:
+                logger.error(f"Reconciliation pass failed: {exc}")
+            await asyncio.sleep(interval)
+
+
+@functools.lru_cache(maxsize=None)
+def get_payment_reconciler() -> PaymentReconciler:
+    settings = get_settings()
+    expire_minutes = settings.payment_reconciliation_expire_minutes
+    return PaymentReconciler(
+        async_session,
+        stale_after=timedelta(minutes=settings.payment_reconciliation_stale_minutes),
+        expire_after=timedelta(minutes=expire_minutes) if expire_minutes else None,
+        batch_size=settings.payment_reconciliation_batch_size,
+        concurrency=settings.payment_reconciliation_concurrency,
+    )
+
+
+def _collect_lag() -> Iterator[tuple[str, Labels, float]]:
+    if get_payment_reconciler.cache_info().currsize and get_payment_reconciler().last_report is not None:
+        yield "payment_reconciliation_lag_seconds", (), get_payment_reconciler().last_report.lag_seconds
+
+
+registry.add_collector(_collect_lag)
@@ -0,0 +1,74 @@
+"""Set-wise payment status changes shared by webhook processing and reconciliation."""
+
+from __future__ import annotations
+
+from collections.abc import Mapping
+from datetime import datetime
+from uuid import UUID
+
+from sqlalchemy import update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.order import Order, OrderStatus
+from app.models.transaction import Transaction, TransactionStatus
+from app.services.outbox import EventType, outbox_event
+
+# Allowed previous statuses per target; anything else (e.g. a late "failed" after "completed") is skipped.
+# Completion comes from the provider, so it also overrides a local cancel: reconciliation expires payments
+# without cancelling them at the provider, and a customer can still pay an expired one.
+TRANSITIONS = {
+    TransactionStatus.COMPLETED: (TransactionStatus.PENDING, TransactionStatus.FAILED, TransactionStatus.CANCELLED),
+    TransactionStatus.FAILED: (TransactionStatus.PENDING,),
+    TransactionStatus.CANCELLED: (TransactionStatus.PENDING,),
+}
+
+
+async def apply_transaction_statuses(
+    db: AsyncSession,
+    targets: Mapping[UUID, TransactionStatus],
+    now: datetime | None = None,
+) -> dict[TransactionStatus, int]:
+    """
+    Move transactions to their target statuses with one guarded UPDATE per status.
+
+    The guard makes repeated or racing updates no-ops. Orders of newly completed payments
+    move from pending to confirmed, and each of those payments gets a ``payment.completed``
+    outbox event. Returns how many transactions changed per status; the caller commits.
+    """
+    now = now or datetime.utcnow()
+    changed: dict[TransactionStatus, int] = {}
+    for target, allowed_from in TRANSITIONS.items():
+        ids = [transaction_id for transaction_id, status in targets.items() if status == target]
+        if not ids:
+            continue
+        rows = (
+            await db.execute(
+                update(Transaction)
+                .where(Transaction.id.in_(ids), Transaction.status.in_(allowed_from))
+                .values(status=target, updated_at=now)
+                .returning(Transaction.id, Transaction.order_id, Transaction.amount, Transaction.provider)
+                .execution_options(synchronize_session=False)
+            )
+        ).all()
+        changed[target] = len(rows)
+        if target == TransactionStatus.COMPLETED and rows:
+            db.add_all(
+                outbox_event(
+                    EventType.PAYMENT_COMPLETED,
+                    row.id,
+                    order_id=row.order_id,
+                    amount=float(row.amount),
+                    provider=row.provider.value,
+                )
+                for row in rows
+            )
+            await db.execute(
+                update(Order)
+                .where(
+                    Order.id.in_({row.order_id for row in rows}),
+                    Order.status == OrderStatus.PENDING,
+                )
+                .values(status=OrderStatus.CONFIRMED, updated_at=now)
+                .execution_options(synchronize_session=False)
+            )
+    return changed
@@ -0,0 +1,281 @@
+"""Durable payment webhook intake and the worker that applies stored events in batches."""
+
+from __future__ import annotations
+
+import asyncio
+import functools
+import json
+import logging
+import uuid
+from collections.abc import Callable
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any
+from uuid import UUID
+
+from sqlalchemy import or_, select, tuple_, update
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.core.config import get_settings
+from app.core.instrumentation import registry
+from app.db.session import async_session
+from app.models.payment_webhook import PaymentWebhookEvent, WebhookEventStatus
+from app.models.transaction import PaymentProvider, Transaction, TransactionStatus
+from app.services.payments.base import PaymentAdapter
+from app.services.payments.factory import get_payment_adapter
+from app.services.payments.transitions import apply_transaction_statuses
+
+logger = logging.getLogger(__name__)
+
+WEBHOOK_STATUSES = {"completed": TransactionStatus.COMPLETED, "failed": TransactionStatus.FAILED}
+
+registry.describe("payment_webhook_events_total", "counter", "Stored webhook events by provider and result (processed, ignored, failed).")
+registry.describe("payment_webhook_lag_seconds", "histogram", "Time from receiving a webhook to applying it.")
+
+
+class InvalidWebhookError(ValueError):
+    """The body is not a JSON object."""
+
+
+async def store_webhook_event(db: AsyncSession, provider: PaymentProvider, body: bytes) -> bool:
+    """
+    Persist a webhook as received; returns False for a duplicate of an already stored event.
+
+    The insert skips conflicts on (provider, event_key), so concurrent retries of one event
+    neither fail nor create a second row. The caller commits.
+    """
+    try:
+        payload = json.loads(body)
+    except ValueError as exc:
+        raise InvalidWebhookError("Webhook body is not valid JSON") from exc
+    if not isinstance(payload, dict):
+        raise InvalidWebhookError("Webhook body must be a JSON object")
+
+    event_key = get_payment_adapter(provider).webhook_event_key(payload)
+    insert = postgresql_insert if db.get_bind().dialect.name == "postgresql" else sqlite_insert
+    stmt = (
+        insert(PaymentWebhookEvent)
+        .values(
+            id=uuid.uuid4(),
+            provider=provider,
+            event_key=event_key[:255],
+            payload=body.decode("utf-8", errors="replace"),
+            status=WebhookEventStatus.RECEIVED,
+            attempts=0,
+            received_at=datetime.utcnow(),
+        )
+        .on_conflict_do_nothing(index_elements=["provider", "event_key"])
+    )
+    result = await db.execute(stmt)
+    return result.rowcount == 1
+
+
+@dataclass
+class _ParsedEvent:
+    event: PaymentWebhookEvent
+    transaction_id: UUID | None = None
+    external_id: str | None = None
+    status: TransactionStatus | None = None
+    outcome: str = "processed"
+    error: str | None = None
+
+
+@dataclass
+class WebhookBatchResult:
+    processed: int = 0
+    ignored: int = 0
+    failed: int = 0
+
+    @property
+    def total(self) -> int:
+        return self.processed + self.ignored + self.failed
+
+
+async def process_webhook_events(
+    db: AsyncSession,
+    *,
+    limit: int = 100,
+    adapter_for: Callable[[PaymentProvider], PaymentAdapter] = get_payment_adapter,
+) -> WebhookBatchResult:
+    """
+    Apply up to ``limit`` received events in one transaction.
+
+    Events are claimed with FOR UPDATE SKIP LOCKED, so several workers can share the table.
+    Their transactions are resolved with one query and changed by ``apply_transaction_statuses``,
+    whose guarded UPDATEs make applying an event twice (a provider retry with a new event
+    id, or a replay) a no-op. The batch is committed by this function.
+    """
+    stmt = (
+        select(PaymentWebhookEvent)
+        .where(PaymentWebhookEvent.status == WebhookEventStatus.RECEIVED)
+        .order_by(PaymentWebhookEvent.received_at)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+    )
+    events = (await db.execute(stmt)).scalars().all()
+    result = WebhookBatchResult()
+    if not events:
+        await db.commit()
+        return result
+
+    parsed = [await _parse(event, adapter_for) for event in events]
+    known_ids, by_external_id = await _resolve_transactions(db, parsed)
+
+    # The strongest outcome per transaction wins: completed over failed, whatever the arrival order
+    targets: dict[UUID, TransactionStatus] = {}
+    for item in parsed:
+        if item.outcome != "processed":
+            continue
+        transaction_id = item.transaction_id if item.transaction_id in known_ids else None
+        if transaction_id is None and item.external_id:
+            transaction_id = by_external_id.get((item.event.provider, item.external_id))
+        if transaction_id is None:
+            item.outcome, item.error = "ignored", "Transaction not found"
+            continue
+        if item.status is not None and targets.get(transaction_id) != TransactionStatus.COMPLETED:
+            targets[transaction_id] = item.status
+
+    now = datetime.utcnow()
+    await apply_transaction_statuses(db, targets, now)
+
+    for item in parsed:
+        event = item.event
+        event.status = WebhookEventStatus(item.outcome)
+        event.error = item.error[:1000] if item.error else None
+        event.attempts += 1
+        event.processed_at = now
+        setattr(result, item.outcome, getattr(result, item.outcome) + 1)
+        registry.inc("payment_webhook_events_total", (("provider", event.provider.value), ("result", item.outcome)))
+        registry.histogram("payment_webhook_lag_seconds", ()).observe((now - event.received_at).total_seconds())
+    await db.commit()
+    return result
+
+
+async def _parse(event: PaymentWebhookEvent, adapter_for: Callable[[PaymentProvider], PaymentAdapter]) -> _ParsedEvent:
+    item = _ParsedEvent(event)
+    try:
+        data: dict[str, Any] = await adapter_for(event.provider).process_webhook(json.loads(event.payload))
+    except Exception as exc:
+        logger.warning(f"Webhook event {event.id} from {event.provider.value} could not be parsed: {exc}")
+        item.outcome, item.error = "failed", f"{type(exc).__name__}: {exc}"
+        return item
+
+    try:
+        item.transaction_id = UUID(str(data["transaction_id"])) if data.get("transaction_id") else None
+    except ValueError:
+        item.transaction_id = None
+    item.external_id = str(data["external_id"]) if data.get("external_id") else None
+    item.status = WEBHOOK_STATUSES.get(str(data.get("status")))
+    return item
+
+
+async def _resolve_transactions(
+    db: AsyncSession, parsed: list[_ParsedEvent]
+) -> tuple[set[UUID], dict[tuple[PaymentProvider, str], UUID]]:
+    """
+    Existing transaction ids and a map of (provider, external id) to transaction ids, in one query.
+
+    External ids are only unique per provider, so each is matched with its event's provider.
+    """
+    ids = {item.transaction_id for item in parsed if item.transaction_id}
+    external_ids = {(item.event.provider, item.external_id) for item in parsed if item.external_id}
+    if not ids and not external_ids:
+        return set(), {}
+    conditions = []
+    if ids:
+        conditions.append(Transaction.id.in_(ids))
+    if external_ids:
+        conditions.append(tuple_(Transaction.provider, Transaction.external_id).in_(external_ids))
+    stmt = select(Transaction.id, Transaction.provider, Transaction.external_id).where(or_(*conditions))
+    rows = (await db.execute(stmt)).all()
+    return {row.id for row in rows}, {
+        (row.provider, row.external_id): row.id for row in rows if row.external_id
+    }
+
+
+async def requeue_webhook_events(
+    db: AsyncSession,
+    *,
+    received_from: datetime,
+    received_to: datetime,
+    provider: PaymentProvider | None = None,
+    statuses: tuple[WebhookEventStatus, ...] = (WebhookEventStatus.IGNORED, WebhookEventStatus.FAILED),
+) -> int:
+    """Mark events received in [received_from, received_to) for processing again; the caller commits."""
+    stmt = (
+        update(PaymentWebhookEvent)
+        .where(
+            PaymentWebhookEvent.received_at >= received_from,
+            PaymentWebhookEvent.received_at < received_to,
+            PaymentWebhookEvent.status.in_(statuses),
+        )
+        .values(status=WebhookEventStatus.RECEIVED, error=None)
+        .execution_options(synchronize_session=False)
+    )
+    if provider is not None:
+        stmt = stmt.where(PaymentWebhookEvent.provider == provider)
+    result = await db.execute(stmt)
+    return result.rowcount
+
+
+class WebhookWorker:
+    """Processes stored events until cancelled; intake in the same process wakes it immediately."""
+
+    def __init__(
+        self,
+        sessionmaker: async_sessionmaker[AsyncSession],
+        *,
+        batch_size: int = 100,
+        poll_interval: float = 1.0,
+    ) -> None:
+        self.sessionmaker = sessionmaker
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self._wakeup = asyncio.Event()
+
+    def notify(self) -> None:
+        self._wakeup.set()
+
+    async def run_once(self) -> WebhookBatchResult:
+        async with self.sessionmaker() as session:
+            return await process_webhook_events(session, limit=self.batch_size)
+
+    async def drain(self) -> WebhookBatchResult:
+        """Process batches until no received events are left."""
+        total = WebhookBatchResult()
+        while True:
+            batch = await self.run_once()
+            total.processed += batch.processed
+            total.ignored += batch.ignored
+            total.failed += batch.failed
+            if batch.total < self.batch_size:
+                return total
+
+    async def run(self) -> None:
+        logger.info("Payment webhook worker started")
+        while True:
+            self._wakeup.clear()
+            try:
+                batch = await self.drain()
+                if batch.total:
+                    logger.info(
+                        f"Webhook events: {batch.processed} processed, {batch.ignored} ignored, {batch.failed} failed"
+                    )
+            except Exception as exc:
+                logger.error(f"Payment webhook worker failed, retrying in {self.poll_interval}s: {exc}")
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+
+
+@functools.lru_cache(maxsize=None)
+def get_webhook_worker() -> WebhookWorker:
+    settings = get_settings()
+    return WebhookWorker(
+        async_session,
+        batch_size=settings.payment_webhook_batch_size,
+        poll_interval=settings.payment_webhook_poll_interval_seconds,
+    )
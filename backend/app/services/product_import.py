@@ -0,0 +1,235 @@
+"""Streaming bulk import of a farmer's products from CSV or NDJSON."""
+
+from __future__ import annotations
+
+import codecs
+import csv
+import json
+import logging
+import uuid
+from collections.abc import AsyncIterable, AsyncIterator, Callable, Iterable
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any
+from uuid import UUID
+
+from pydantic import ValidationError
+from sqlalchemy import insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.product import Product
+from app.schemas.product import ProductCreate
+
+logger = logging.getLogger(__name__)
+
+# A line (or quoted CSV record) longer than this is rejected instead of buffered
+MAX_RECORD_CHARS = 64 * 1024
+
+Record = tuple[int, Any]  # line number where the record starts, parsed value
+
+
+class ImportFormatError(Exception):
+    """The stream itself is unreadable (bad encoding, missing CSV header, oversized line)."""
+
+
+@dataclass(frozen=True)
+class MalformedRecord:
+    """A record the parser could not turn into a mapping; reported as a row error."""
+
+    message: str
+
+
+@dataclass
+class ImportRowError:
+    line: int
+    message: str
+
+
+@dataclass
+class ImportResult:
+    created: int = 0
+    updated: int = 0
+    failed: int = 0
+    errors: list[ImportRowError] = field(default_factory=list)
+    errors_truncated: bool = False
+    # Ids of updated rows, for cache invalidation; created rows are new and never cached
+    updated_ids: list[UUID] = field(default_factory=list)
+
+    def add_error(self, line: int, message: str, max_errors: int) -> None:
+        self.failed += 1
+        if len(self.errors) < max_errors:
+            self.errors.append(ImportRowError(line=line, message=message))
+        else:
+            self.errors_truncated = True
+
+
+async def iter_lines(chunks: AsyncIterable[bytes]) -> AsyncIterator[tuple[int, str]]:
+    """Decoded lines with their 1-based numbers; only the current partial line is buffered."""
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    pending = ""
+    line_number = 0
+    try:
+        async for chunk in chunks:
+            pending += decoder.decode(chunk)
+            *complete, pending = pending.split("\n")
+            for line in complete:
+                line_number += 1
+                yield line_number, line.removesuffix("\r")
+            if len(pending) > MAX_RECORD_CHARS:
+                raise ImportFormatError(f"Line {line_number + 1} is longer than {MAX_RECORD_CHARS} characters")
+        pending += decoder.decode(b"", final=True)
+    except UnicodeDecodeError as exc:
+        raise ImportFormatError(f"Line {line_number + 1} is not valid UTF-8") from exc
+    if pending.removesuffix("\r"):
+        yield line_number + 1, pending.removesuffix("\r")
+
+
+async def iter_ndjson_records(chunks: AsyncIterable[bytes]) -> AsyncIterator[Record]:
+    """One JSON document per non-blank line; unparsable lines become ``MalformedRecord``."""
+    async for line_number, line in iter_lines(chunks):
+        if not line.strip():
+            continue
+        try:
+            yield line_number, json.loads(line)
+        except ValueError as exc:
+            yield line_number, MalformedRecord(f"Invalid JSON: {exc}")
+
+
+async def iter_csv_records(chunks: AsyncIterable[bytes]) -> AsyncIterator[Record]:
+    """
+    Rows of a CSV file with a header line, as dicts of the non-empty cells.
+
+    Quoted fields may span lines: physical lines are joined until the record has an even
+    number of quote characters, which is when every quoted field is closed.
+    """
+    header: list[str] | None = None
+    record: list[str] = []
+    start = 0
+    async for line_number, line in iter_lines(chunks):
+        if not record:
+            start = line_number
+            if not line.strip():
+                continue
+        record.append(line)
+        text = "\n".join(record)
+        if text.count('"') % 2:
+            if len(text) > MAX_RECORD_CHARS:
+                raise ImportFormatError(f"Record at line {start} is longer than {MAX_RECORD_CHARS} characters")
+            continue
+        record = []
+        values = next(csv.reader([text]))
+        if header is None:
+            header = [name.strip().lower() for name in values]
+            continue
+        if len(values) > len(header):
+            yield start, MalformedRecord(f"Expected {len(header)} columns, got {len(values)}")
+            continue
+        # Empty cells mean "not given", so optional columns fall back to their defaults
+        yield start, {name: value for name, value in zip(header, values) if value != ""}
+    if record:
+        raise ImportFormatError(f"Unterminated quoted field in record at line {start}")
+    if header is None:
+        raise ImportFormatError("CSV file is empty, expected a header line")
+
+
+IMPORT_FORMATS: dict[str, Callable[[AsyncIterable[bytes]], AsyncIterator[Record]]] = {
+    "text/csv": iter_csv_records,
+    "application/x-ndjson": iter_ndjson_records,
+    "application/jsonl": iter_ndjson_records,
+}
+
+
+def _describe_validation_error(exc: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(str(part) for part in error['loc']) or 'row'}: {error['msg']}" for error in exc.errors()
+    )
+
+
+async def import_products(
+    db: AsyncSession,
+    *,
+    farmer_id: UUID,
+    records: AsyncIterable[Record],
+    batch_size: int = 500,
+    max_errors: int = 100,
+) -> ImportResult:
+    """
+    Validate records with ``ProductCreate`` and upsert them for ``farmer_id``.
+
+    Products are matched to the farmer's existing ones by exact name; a name repeated in
+    the file keeps its last row. Updates change only the columns the row gives. Valid
+    rows are written every ``batch_size`` rows with one lookup, one multi-row INSERT and
+    one batched UPDATE, all in the caller's transaction: the caller commits, or rolls
+    back on ``ImportFormatError``. Invalid rows are skipped and reported, at most
+    ``max_errors`` of them in detail.
+    """
+    result = ImportResult()
+    batch: dict[str, ProductCreate] = {}
+    async for line_number, record in records:
+        if isinstance(record, MalformedRecord):
+            result.add_error(line_number, record.message, max_errors)
+            continue
+        try:
+            product = ProductCreate.model_validate(record)
+        except ValidationError as exc:
+            result.add_error(line_number, _describe_validation_error(exc), max_errors)
+            continue
+        batch.pop(product.name, None)
+        batch[product.name] = product
+        if len(batch) >= batch_size:
+            await _upsert_batch(db, farmer_id, batch.values(), result)
+            batch.clear()
+    if batch:
+        await _upsert_batch(db, farmer_id, batch.values(), result)
+    logger.info(
+        f"Imported products for farmer {farmer_id}: created={result.created}, "
+        f"updated={result.updated}, failed={result.failed}"
+    )
+    return result
+
+
+async def _upsert_batch(
+    db: AsyncSession,
+    farmer_id: UUID,
+    products: Iterable[ProductCreate],
+    result: ImportResult,
+) -> None:
+    products = list(products)
+    # No unique constraint on (farmer_id, name), so ON CONFLICT is not an option; look the
+    # names up instead. Older duplicates of one name are all updated.
+    existing_stmt = select(Product.id, Product.name).where(
+        Product.farmer_id == farmer_id,
+        Product.name.in_([product.name for product in products]),
+    )
+    existing: dict[str, list[UUID]] = {}
+    for row in await db.execute(existing_stmt):
+        existing.setdefault(row.name, []).append(row.id)
+
+    now = datetime.utcnow()
+    new_rows = []
+    changes = []
+    for product in products:
+        if product.name in existing:
+            # Only the columns the row gives: re-importing a price list must not wipe descriptions
+            values = product.model_dump(exclude_unset=True)
+            changes.extend({"id": product_id, **values, "updated_at": now} for product_id in existing[product.name])
+        else:
+            new_rows.append(
+                {
+                    "id": uuid.uuid4(),
+                    "farmer_id": farmer_id,
+                    **product.model_dump(),
+                    "is_active": True,
+                    "created_at": now,
+                    "updated_at": now,
+                }
+            )
+
+    if new_rows:
+        await db.execute(insert(Product).values(new_rows))
+        result.created += len(new_rows)
+    if changes:
+        # ORM bulk UPDATE by primary key: one executemany round trip for the whole batch
+        await db.execute(update(Product), changes)
+        result.updated += len(products) - len(new_rows)
+        result.updated_ids.extend(change["id"] for change in changes)
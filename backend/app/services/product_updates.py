@@ -0,0 +1,104 @@
+"""Set-based price, stock and availability updates across many products."""
+
+from __future__ import annotations
+
+import logging
+from collections.abc import Iterable
+from dataclasses import dataclass
+from datetime import datetime
+from uuid import UUID
+
+from sqlalchemy import case, literal, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.product import Product
+
+logger = logging.getLogger(__name__)
+
+# Columns a bulk change may set; anything else goes through PATCH /products/{id}
+BULK_FIELDS = ("price", "quantity", "is_active")
+
+
+class BulkUpdateError(Exception):
+    """Base error for a bulk update that was rejected as a whole."""
+
+    def __init__(self, product_ids: list[UUID], message: str) -> None:
+        super().__init__(message)
+        self.product_ids = product_ids
+
+
+class ProductsNotFoundError(BulkUpdateError):
+    """Some products do not exist."""
+
+
+class ProductsNotOwnedError(BulkUpdateError):
+    """Some products belong to another farmer."""
+
+
+@dataclass(frozen=True)
+class ProductChange:
+    product_id: UUID
+    price: float | None = None
+    quantity: float | None = None
+    is_active: bool | None = None
+
+
+async def apply_product_changes(
+    db: AsyncSession,
+    *,
+    changes: Iterable[ProductChange],
+    owner_id: UUID | None,
+) -> list[Product]:
+    """
+    Apply all changes with one ownership check and one ``UPDATE``.
+
+    ``None`` fields are left as they are; when a product appears twice, later values win.
+    With ``owner_id`` every product must belong to that farmer (``None`` skips the check,
+    for admins). Nothing is written if any product is missing or not owned. The caller
+    commits.
+
+    Returns:
+        the updated products
+    """
+    merged: dict[UUID, dict[str, object]] = {}
+    for change in changes:
+        values = merged.setdefault(change.product_id, {})
+        values.update({name: getattr(change, name) for name in BULK_FIELDS if getattr(change, name) is not None})
+    product_ids = sorted(merged)
+
+    # Locked in primary key order, like reserve_stock, so concurrent bulk updates and
+    # orders touching the same products cannot deadlock
+    owners_stmt = (
+        select(Product.id, Product.farmer_id).where(Product.id.in_(product_ids)).order_by(Product.id).with_for_update()
+    )
+    owners = {row.id: row.farmer_id for row in await db.execute(owners_stmt)}
+    missing = [product_id for product_id in product_ids if product_id not in owners]
+    if missing:
+        raise ProductsNotFoundError(missing, f"Products not found: {', '.join(map(str, missing))}")
+    if owner_id is not None:
+        foreign = [product_id for product_id in product_ids if owners[product_id] != owner_id]
+        if foreign:
+            raise ProductsNotOwnedError(foreign, f"Products do not belong to this farmer: {', '.join(map(str, foreign))}")
+
+    # One CASE per column, keeping the current value for products that do not set it
+    assignments = {}
+    for name in BULK_FIELDS:
+        column = getattr(Product, name)
+        whens = [
+            (Product.id == product_id, literal(values[name], column.type))
+            for product_id, values in merged.items()
+            if name in values
+        ]
+        if whens:
+            assignments[name] = case(*whens, else_=column)
+    stmt = (
+        update(Product)
+        .where(Product.id.in_(product_ids))
+        .values(**assignments, updated_at=datetime.utcnow())
+        .returning(Product)
+        .execution_options(synchronize_session=False, populate_existing=True)
+    )
+    result = await db.execute(stmt)
+    products = sorted(result.scalars().all(), key=lambda product: product.id)
+    logger.info(f"Bulk updated {len(products)} products")
+    return products
@@ -0,0 +1,62 @@
+"""Product catalogue search."""
+
+from __future__ import annotations
+
+import re
+from typing import Any
+
+from sqlalchemy import ColumnElement, Select, String, func, literal, literal_column
+
+from app.core.config import get_settings
+from app.models.product import PRODUCT_SEARCH_DOCUMENT, Product
+
+SEARCH_TERM_RE = re.compile(r"\w+")
+
+
+def build_prefix_tsquery(search: str) -> str | None:
+    """
+    Turn free text into a ``to_tsquery`` expression that matches every word as a prefix.
+
+    Only word characters are kept, so user input can never inject tsquery operators.
+    "Помид черр" becomes "помид:* & черр:*".
+    """
+    terms = SEARCH_TERM_RE.findall(search.lower())
+    if not terms:
+        return None
+    return " & ".join(f"{term}:*" for term in terms)
+
+
+def apply_product_search(
+    stmt: Select[Any],
+    search: str,
+    *,
+    dialect_name: str,
+) -> tuple[Select[Any], ColumnElement[float] | None]:
+    """
+    Filter a product query by free-text ``search``.
+
+    On PostgreSQL products match when every word is a prefix of a word in the name or
+    description (GIN index over ``PRODUCT_SEARCH_DOCUMENT``) or, with pg_trgm enabled,
+    when the text is similar to a word of the name, which tolerates typos such as
+    "памидор". Other databases keep the plain ILIKE substring match.
+
+    Returns:
+        the filtered statement and a relevance expression to order by (None when the
+        database cannot rank)
+    """
+    tsquery_text = build_prefix_tsquery(search)
+    if dialect_name != "postgresql" or tsquery_text is None:
+        search_pattern = f"%{search}%"
+        return stmt.where(Product.name.ilike(search_pattern) | Product.description.ilike(search_pattern)), None
+
+    document = literal_column(PRODUCT_SEARCH_DOCUMENT)
+    tsquery = func.to_tsquery(literal_column("'simple'::regconfig"), literal(tsquery_text, String))
+    condition = document.op("@@")(tsquery)
+    rank = func.ts_rank_cd(document, tsquery)
+
+    if get_settings().product_search_trigram:
+        search_text = literal(search, String)
+        condition = condition | search_text.op("<%")(Product.name)
+        rank = rank + func.word_similarity(search_text, Product.name)
+
+    return stmt.where(condition), rank
@@ -1,23 +1,378 @@
+"""SMS providers and the queue that dispatches messages to them off the request path."""
+
 from __future__ import annotations
 
+import abc
+import asyncio
+import functools
+import heapq
+import itertools
+import json
 import logging
+import os
+import random
+import socket
+import time
+from collections.abc import Iterator, Sequence
+from dataclasses import asdict, dataclass
+
+from redis.asyncio import Redis
+from redis.exceptions import RedisError, ResponseError, WatchError
 
 from app.core.config import get_settings
+from app.core.instrumentation import registry
+from app.core.metrics import Labels
+from app.core.redis import REDIS_RETRY_AFTER_SECONDS, RedisBackoff, get_redis
 
 logger = logging.getLogger(__name__)
 
+STREAM_KEY = "sms:queue"
+RETRY_KEY = "sms:retry"
+CONSUMER_GROUP = "sms-dispatch"
+# Messages a crashed worker read but never acknowledged are taken over after this long
+CLAIM_IDLE_MS = 60_000
 
-class SMSProvider:
-    def __init__(self) -> None:
-        self.settings = get_settings()
+registry.describe("sms_send_duration_seconds", "histogram", "Time per provider send call (one batch).")
+registry.describe("sms_messages_total", "counter", "SMS messages by provider and result (sent, retried, failed).")
+# One shared queue that every dispatcher reports: merged as the maximum, not summed over workers
+registry.describe(
+    "sms_queue_depth", "gauge", "Messages waiting in the SMS queue, including scheduled retries.", merge="max"
+)
+
+
+@dataclass(frozen=True)
+class SMSMessage:
+    phone_number: str
+    text: str
+    attempt: int = 0
+
+    def dumps(self) -> str:
+        return json.dumps(asdict(self))
+
+    @classmethod
+    def loads(cls, raw: str | bytes) -> SMSMessage:
+        return cls(**json.loads(raw))
+
+
+def otp_message(phone_number: str, code: str) -> SMSMessage:
+    return SMSMessage(phone_number=phone_number, text=f"Your verification code: {code}")
+
+
+class SMSProvider(abc.ABC):
+    """
+    Gateway adapter. ``max_batch`` is how many messages one ``send_batch`` call may
+    carry; providers without a bulk API keep 1 and get concurrent single sends.
+    """
+
+    name = "base"
+    max_batch = 1
+
+    @abc.abstractmethod
+    async def send(self, message: SMSMessage) -> None:
+        """Send one message, raising on failure."""
+
+    async def send_batch(self, messages: Sequence[SMSMessage]) -> list[Exception | None]:
+        """Send messages; returns the error for each one that failed, else None."""
+        results = await asyncio.gather(*(self.send(message) for message in messages), return_exceptions=True)
+        return [result if isinstance(result, Exception) else None for result in results]
 
     async def send_code(self, *, phone_number: str, code: str) -> None:
-        if self.settings.sms_provider in {"mock", "dev"}:
-            logger.info("Sending OTP %s to %s", code, phone_number)
-            return
-        # TODO: integrate with real SMS providers (Infobip, Beeline, etc.)
-        raise NotImplementedError("Real SMS provider integration is not configured")
+        await self.send(otp_message(phone_number, code))
+
+
+class DevSMSProvider(SMSProvider):
+    """Logs messages instead of sending them; accepts batches like a bulk gateway."""
 
+    name = "dev"
+    max_batch = 100
 
+    async def send(self, message: SMSMessage) -> None:
+        logger.info(f"Sending SMS to {message.phone_number}: {message.text}")
+
+    async def send_batch(self, messages: Sequence[SMSMessage]) -> list[Exception | None]:
+        for message in messages:
+            await self.send(message)
+        return [None] * len(messages)
+
+
+@functools.lru_cache(maxsize=None)
 def get_sms_provider() -> SMSProvider:
-    return SMSProvider()
+    """The process-wide provider for SMS_PROVIDER."""
+    provider = get_settings().sms_provider
+    if provider in {"mock", "dev"}:
+        return DevSMSProvider()
+    # TODO: integrate with real SMS providers (Infobip, Beeline, etc.)
+    raise NotImplementedError(f"Real SMS provider integration is not configured: {provider}")
+
+
+class RedisSMSQueue:
+    """
+    Durable queue on a Redis stream with a consumer group.
+
+    Workers read batches with XREADGROUP and acknowledge after the provider call, so a
+    worker that dies mid-batch leaves its messages pending; another worker claims them
+    after ``CLAIM_IDLE_MS``. Retries wait in a sorted set scored by due time.
+    """
+
+    def __init__(self, redis: Redis, *, consumer: str | None = None) -> None:
+        self.redis = redis
+        self.consumer = consumer or f"{socket.gethostname()}-{os.getpid()}"
+        self._group_ready = False
+
+    async def _ensure_group(self) -> None:
+        if self._group_ready:
+            return
+        try:
+            await self.redis.xgroup_create(STREAM_KEY, CONSUMER_GROUP, id="0", mkstream=True)
+        except ResponseError as exc:
+            if "BUSYGROUP" not in str(exc):
+                raise
+        self._group_ready = True
+
+    async def enqueue(self, message: SMSMessage) -> None:
+        await self.redis.xadd(STREAM_KEY, {"message": message.dumps()})
+
+    async def read(self, count: int, block_ms: int) -> list[tuple[str, SMSMessage]]:
+        await self._ensure_group()
+        _, claimed, *_ = await self.redis.xautoclaim(
+            STREAM_KEY, CONSUMER_GROUP, self.consumer, min_idle_time=CLAIM_IDLE_MS, start_id="0-0", count=count
+        )
+        entries = list(claimed)
+        if len(entries) < count:
+            response = await self.redis.xreadgroup(
+                CONSUMER_GROUP, self.consumer, {STREAM_KEY: ">"}, count=count - len(entries), block=block_ms
+            )
+            for _, stream_entries in response or []:
+                entries.extend(stream_entries)
+        messages, malformed = [], []
+        for entry_id, fields in entries:
+            if not fields:
+                continue
+            try:
+                messages.append((_text(entry_id), SMSMessage.loads(fields[b"message"])))
+            except (KeyError, TypeError, ValueError) as exc:
+                logger.error(f"SMS queue: dropping malformed entry {_text(entry_id)}: {exc}")
+                malformed.append(_text(entry_id))
+        # Acknowledged right away, or every worker would claim and fail on them forever
+        await self.ack(malformed)
+        return messages
+
+    async def ack(self, entry_ids: Sequence[str]) -> None:
+        if entry_ids:
+            async with self.redis.pipeline(transaction=True) as pipe:
+                pipe.xack(STREAM_KEY, CONSUMER_GROUP, *entry_ids)
+                pipe.xdel(STREAM_KEY, *entry_ids)
+                await pipe.execute()
+
+    async def schedule_retry(self, message: SMSMessage, delay: float) -> None:
+        await self.redis.zadd(RETRY_KEY, {message.dumps(): time.time() + delay})
+
+    async def promote_due(self, limit: int = 500) -> int:
+        """Move retries that are due back onto the stream; WATCH keeps two workers from both doing it."""
+        async with self.redis.pipeline(transaction=True) as pipe:
+            try:
+                await pipe.watch(RETRY_KEY)
+                due = await pipe.zrangebyscore(RETRY_KEY, 0, time.time(), start=0, num=limit)
+                if not due:
+                    return 0
+                pipe.multi()
+                pipe.zrem(RETRY_KEY, *due)
+                for raw in due:
+                    pipe.xadd(STREAM_KEY, {"message": raw})
+                await pipe.execute()
+            except WatchError:
+                return 0
+        return len(due)
+
+    async def depth(self) -> int:
+        async with self.redis.pipeline(transaction=False) as pipe:
+            pipe.xlen(STREAM_KEY)
+            pipe.zcard(RETRY_KEY)
+            queued, retrying = await pipe.execute()
+        return queued + retrying
+
+
+class MemorySMSQueue:
+    """In-process stand-in for ``RedisSMSQueue``: same interface, nothing survives a restart."""
+
+    def __init__(self) -> None:
+        self._ready: asyncio.Queue[SMSMessage] = asyncio.Queue()
+        self._retries: list[tuple[float, int, SMSMessage]] = []
+        self._ids = itertools.count()
+
+    async def enqueue(self, message: SMSMessage) -> None:
+        self._ready.put_nowait(message)
+
+    async def read(self, count: int, block_ms: int) -> list[tuple[str, SMSMessage]]:
+        if self._ready.empty():
+            try:
+                first = await asyncio.wait_for(self._ready.get(), timeout=block_ms / 1000)
+            except asyncio.TimeoutError:
+                return []
+            self._ready.put_nowait(first)
+        messages = []
+        while len(messages) < count and not self._ready.empty():
+            messages.append((str(next(self._ids)), self._ready.get_nowait()))
+        return messages
+
+    async def ack(self, entry_ids: Sequence[str]) -> None:
+        pass
+
+    async def schedule_retry(self, message: SMSMessage, delay: float) -> None:
+        heapq.heappush(self._retries, (time.time() + delay, next(self._ids), message))
+
+    async def promote_due(self, limit: int = 500) -> int:
+        promoted = 0
+        while self._retries and self._retries[0][0] <= time.time() and promoted < limit:
+            self._ready.put_nowait(heapq.heappop(self._retries)[2])
+            promoted += 1
+        return promoted
+
+    async def depth(self) -> int:
+        return self._ready.qsize() + len(self._retries)
+
+
+def _text(value: str | bytes) -> str:
+    return value.decode() if isinstance(value, bytes) else value
+
+
+SMSQueue = RedisSMSQueue | MemorySMSQueue
+
+
+class SMSDispatcher:
+    """
+    Worker that drains the queue in provider-sized batches.
+
+    Failed messages are retried with exponential backoff and jitter up to
+    ``max_attempts`` sends, then dropped with an error log.
+    """
+
+    def __init__(
+        self,
+        queue: SMSQueue,
+        provider: SMSProvider,
+        *,
+        batch_size: int = 50,
+        max_attempts: int = 5,
+        backoff: float = 2.0,
+        backoff_max: float = 300.0,
+        block_ms: int = 1000,
+        error_pause: float = 5.0,
+    ) -> None:
+        self.queue = queue
+        self.provider = provider
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.backoff_max = backoff_max
+        self.block_ms = block_ms
+        self.error_pause = error_pause
+        self.queue_depth = 0
+
+    def retry_delay(self, attempt: int) -> float:
+        delay = min(self.backoff * 2**attempt, self.backoff_max)
+        return delay * random.uniform(0.5, 1.0)
+
+    async def run_once(self) -> int:
+        """Dispatch one batch; returns how many messages were taken from the queue."""
+        await self.queue.promote_due()
+        entries = await self.queue.read(self.batch_size, self.block_ms)
+        self.queue_depth = await self.queue.depth()
+        if not entries:
+            return 0
+
+        messages = [message for _, message in entries]
+        errors: list[Exception | None] = []
+        for start in range(0, len(messages), self.provider.max_batch):
+            chunk = messages[start:start + self.provider.max_batch]
+            started = time.perf_counter()
+            try:
+                errors.extend(await self.provider.send_batch(chunk))
+            except Exception as exc:
+                errors.extend([exc] * len(chunk))
+            registry.histogram("sms_send_duration_seconds", (("provider", self.provider.name),)).observe(
+                time.perf_counter() - started
+            )
+
+        for message, error in zip(messages, errors):
+            if error is None:
+                result = "sent"
+            elif message.attempt + 1 < self.max_attempts:
+                result = "retried"
+                delay = self.retry_delay(message.attempt)
+                logger.warning(f"SMS to {message.phone_number} failed, retry in {delay:.1f}s: {error}")
+                await self.queue.schedule_retry(
+                    SMSMessage(message.phone_number, message.text, message.attempt + 1), delay
+                )
+            else:
+                result = "failed"
+                logger.error(f"SMS to {message.phone_number} failed after {self.max_attempts} attempts: {error}")
+            registry.inc("sms_messages_total", (("provider", self.provider.name), ("result", result)))
+        await self.queue.ack([entry_id for entry_id, _ in entries])
+        return len(entries)
+
+    async def run(self) -> None:
+        """Dispatch until cancelled; any error is logged and retried after a pause, so OTP sends never stop."""
+        logger.info(f"SMS dispatcher started for provider {self.provider.name}")
+        while True:
+            try:
+                await self.run_once()
+            except RedisError as exc:
+                logger.warning(f"SMS dispatcher: Redis unavailable, retrying in {REDIS_RETRY_AFTER_SECONDS}s: {exc}")
+                await asyncio.sleep(REDIS_RETRY_AFTER_SECONDS)
+            except Exception as exc:
+                logger.error(f"SMS dispatcher failed, retrying in {self.error_pause}s: {exc}", exc_info=True)
+                await asyncio.sleep(self.error_pause)
+
+
+@functools.lru_cache(maxsize=None)
+def get_sms_queue() -> SMSQueue:
+    if get_settings().sms_queue_backend == "memory":
+        return MemorySMSQueue()
+    return RedisSMSQueue(get_redis())
+
+
+@functools.lru_cache(maxsize=None)
+def get_sms_dispatcher() -> SMSDispatcher:
+    settings = get_settings()
+    return SMSDispatcher(
+        get_sms_queue(),
+        get_sms_provider(),
+        batch_size=settings.sms_batch_size,
+        max_attempts=settings.sms_max_attempts,
+        backoff=settings.sms_retry_backoff_seconds,
+        backoff_max=settings.sms_retry_backoff_max_seconds,
+    )
+
+
+# After a Redis error enqueueing falls back to sending inline for a while
+_redis_backoff = RedisBackoff("SMS queue", "sending inline")
+
+
+async def enqueue_sms(message: SMSMessage, queue: SMSQueue | None = None) -> None:
+    """
+    Queue a message for the dispatcher.
+
+    If Redis is unreachable the message is sent inline instead, the behaviour from
+    before the queue, so OTP logins keep working through a Redis outage. Raises
+    NotImplementedError without queueing when SMS_PROVIDER has no gateway, since no
+    dispatcher could ever deliver the message.
+    """
+    provider = get_sms_provider()
+    queue = queue or get_sms_queue()
+    if isinstance(queue, RedisSMSQueue) and not _redis_backoff.available:
+        await provider.send(message)
+        return
+    try:
+        await queue.enqueue(message)
+    except RedisError as exc:
+        _redis_backoff.failed(exc)
+        await provider.send(message)
+
+
+def _collect_queue_depth() -> Iterator[tuple[str, Labels, float]]:
+    if get_sms_dispatcher.cache_info().currsize:
+        yield "sms_queue_depth", (), get_sms_dispatcher().queue_depth
+
+
+registry.add_collector(_collect_queue_depth)
@@ -0,0 +1,67 @@
+from __future__ import annotations
+
+import base64
+import binascii
+from collections.abc import Sequence
+from datetime import datetime
+from typing import Any, TypeVar
+from uuid import UUID
+
+from sqlalchemy import Select, literal, tuple_
+
+T = TypeVar("T")
+
+CURSOR_SEPARATOR = "|"
+# Endpoints that return a bare JSON list report the next page cursor in this header
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(created_at: datetime, row_id: UUID) -> str:
+    """Encode a ``(created_at, id)`` position into an opaque URL-safe token."""
+    raw = f"{created_at.isoformat()}{CURSOR_SEPARATOR}{row_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, UUID]:
+    """Decode a token produced by ``encode_cursor``; raises ValueError if it is malformed."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        created_at, row_id = raw.split(CURSOR_SEPARATOR, 1)
+        return datetime.fromisoformat(created_at), UUID(row_id)
+    except (binascii.Error, UnicodeDecodeError, ValueError) as exc:
+        raise ValueError("Invalid cursor") from exc
+
+
+def paginate_newest_first(
+    stmt: Select[Any],
+    model: Any,
+    *,
+    limit: int,
+    offset: int = 0,
+    cursor: str | None = None,
+) -> Select[Any]:
+    """
+    Order ``stmt`` newest first and select one page of it.
+
+    With a ``cursor`` the page starts strictly after the encoded ``(created_at, id)``
+    position (keyset pagination) and ``offset`` is ignored, so the database seeks
+    straight into the ``(created_at, id)`` index instead of scanning skipped rows.
+    One extra row is fetched so ``split_page`` can tell whether another page exists.
+    """
+    if cursor is not None:
+        created_at, row_id = decode_cursor(cursor)
+        stmt = stmt.where(
+            tuple_(model.created_at, model.id)
+            < tuple_(literal(created_at, model.created_at.type), literal(row_id, model.id.type))
+        )
+        offset = 0
+    return stmt.order_by(model.created_at.desc(), model.id.desc()).limit(limit + 1).offset(offset)
+
+
+def split_page(rows: Sequence[T], limit: int) -> tuple[list[T], str | None]:
+    """Trim the look-ahead row and build the cursor of the following page."""
+    page = list(rows[:limit])
+    if len(rows) <= limit or not page:
+        return page, None
+    last = page[-1]
+    return page, encode_cursor(last.created_at, last.id)
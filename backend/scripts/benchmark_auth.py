@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк аутентифицированных запросов: RPS с кэшем principal и без него.
+
+Запускает приложение в процессе (без сети), создаёт магазин с токеном и в
+несколько потоков опрашивает GET /api/v1/orders, сначала загружая пользователя
+из БД на каждый запрос, затем из кэша principal.
+
+    python scripts/benchmark_auth.py --database-url postgresql+asyncpg://... --seconds 5 --concurrency 32 --rounds 3
+"""
+import argparse
+import asyncio
+import logging
+import statistics
+import time
+from datetime import timedelta
+
+from httpx import AsyncClient
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from app.core.config import get_settings
+from app.core.principals import principal_cache
+from app.core.security import create_token
+from app.db.session import Base, get_db
+from app.main import app
+from app.models.user import User, UserRole
+
+
+async def run_load(client: AsyncClient, token: str, seconds: float, concurrency: int) -> int:
+    """Опрашивать список заказов seconds секунд; вернуть число успешных ответов."""
+    deadline = time.perf_counter() + seconds
+    headers = {"Authorization": f"Bearer {token}"}
+    completed = 0
+
+    async def worker() -> None:
+        nonlocal completed
+        while time.perf_counter() < deadline:
+            response = await client.get("/api/v1/orders", params={"limit": 1, "count": "none"}, headers=headers)
+            response.raise_for_status()
+            completed += 1
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return completed
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", default=get_settings().database_url)
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--rounds", type=int, default=3)
+    args = parser.parse_args()
+    # Логи каждого запроса искажают замер сильнее, чем сам запрос к БД
+    logging.disable(logging.INFO)
+
+    engine = create_async_engine(args.database_url)
+    session_factory = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    queries = 0
+
+    def count_query(*_args) -> None:
+        nonlocal queries
+        queries += 1
+
+    event.listen(engine.sync_engine, "before_cursor_execute", count_query)
+
+    async def _get_db():
+        async with session_factory() as session:
+            yield session
+
+    app.dependency_overrides[get_db] = _get_db
+    async with session_factory() as session:
+        shop = User(phone_number="+998000000001", role=UserRole.SHOP, is_active=True, is_verified=True)
+        session.add(shop)
+        await session.commit()
+    token = create_token(subject=str(shop.id), expires_delta=timedelta(hours=1))
+
+    try:
+        async with AsyncClient(app=app, base_url="http://bench") as client:
+            await run_load(client, token, 1.0, args.concurrency)  # прогрев
+            results: dict[bool, list[tuple[int, int]]] = {False: [], True: []}
+            # Чередуем режимы, чтобы прогрев и фоновая нагрузка не подыгрывали одному из них
+            for _ in range(args.rounds):
+                for enabled in (False, True):
+                    principal_cache.enabled = enabled
+                    principal_cache.clear_local()
+                    queries = 0
+                    completed = await run_load(client, token, args.seconds, args.concurrency)
+                    results[enabled].append((completed, queries))
+            for label, enabled in (("без кэша", False), ("с кэшем", True)):
+                rps = statistics.median(completed / args.seconds for completed, _ in results[enabled])
+                per_request = sum(q for _, q in results[enabled]) / max(sum(c for c, _ in results[enabled]), 1)
+                print(f"{label:<10} {rps:8.1f} RPS (медиана)  {per_request:.2f} SQL-запросов на запрос")
+    finally:
+        app.dependency_overrides.pop(get_db, None)
+        async with session_factory() as session:
+            await session.delete(await session.get(User, shop.id))
+            await session.commit()
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
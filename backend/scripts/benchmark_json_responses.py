@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+Микробенчмарк сериализации ответов списков: стандартный путь FastAPI против FastJSONResponse.
+
+Для страниц GET /products, GET /orders и GET /users из 100 элементов сравнивает
+стандартную обработку FastAPI (повторная валидация по response_model,
+jsonable_encoder, json.dumps) с однопроходной сериализацией pydantic-core и
+печатает время на страницу в микросекундах.
+
+    PYTHONPATH=. python scripts/benchmark_json_responses.py --items 100 --repeat 200
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import time
+import uuid
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+from fastapi.routing import APIRoute, serialize_response
+from starlette.responses import JSONResponse
+
+from app.api.v1.auth import _map_user_profile
+from app.core.responses import FastJSONResponse
+from app.main import app
+from app.models.order import OrderStatus
+from app.models.product import ProductCategory
+from app.models.user import User, UserRole
+from app.schemas.order import OrderItemResponse, OrderListResponse, OrderResponse
+from app.schemas.product import ProductListResponse, ProductResponse
+
+
+def product_page(items: int) -> ProductListResponse:
+    now = datetime.utcnow()
+    return ProductListResponse(
+        items=[
+            ProductResponse(
+                id=uuid.uuid4(),
+                farmer_id=uuid.uuid4(),
+                name=f"Помидоры {index}",
+                description="Свежие помидоры с фермы, урожай этой недели",
+                category=ProductCategory.VEGETABLES,
+                price=Decimal("15000.00"),
+                quantity=Decimal("120.50"),
+                unit="kg",
+                image_url=f"https://cdn.example.com/products/{index}.jpg",
+                is_active=True,
+                created_at=now - timedelta(minutes=index),
+                updated_at=now,
+            )
+            for index in range(items)
+        ],
+        total=10_000,
+        has_more=True,
+        next_cursor="eyJjIjoiMjAyNC0wMS0wMVQwMDowMDowMCIsImkiOiIxIn0",
+    )
+
+
+def order_page(items: int, lines: int = 3) -> OrderListResponse:
+    now = datetime.utcnow()
+    return OrderListResponse(
+        items=[
+            OrderResponse(
+                id=uuid.uuid4(),
+                shop_id=uuid.uuid4(),
+                farmer_id=uuid.uuid4(),
+                status=OrderStatus.CONFIRMED,
+                total_amount=Decimal("45000.00"),
+                delivery_address="Ташкент, ул. Навои, 1",
+                notes=None,
+                items=[
+                    OrderItemResponse(
+                        id=uuid.uuid4(),
+                        product_id=uuid.uuid4(),
+                        quantity=Decimal("1.00"),
+                        price=Decimal("15000.00"),
+                        created_at=now,
+                    )
+                    for _ in range(lines)
+                ],
+                created_at=now - timedelta(minutes=index),
+                updated_at=now,
+            )
+            for index in range(items)
+        ],
+        total=None,
+        has_more=True,
+        next_cursor="eyJjIjoiMjAyNC0wMS0wMVQwMDowMDowMCIsImkiOiIxIn0",
+    )
+
+
+def user_page(items: int) -> list:
+    """Как GET /users: профили, собранные _map_user_profile из ORM-объектов."""
+    now = datetime.utcnow()
+    users = [
+        User(
+            id=uuid.uuid4(),
+            phone_number=f"+99890{index:07d}",
+            role=UserRole.SHOP,
+            legal_name=f"ООО Магазин {index}",
+            is_active=True,
+            is_verified=True,
+            created_at=now,
+            updated_at=now,
+        )
+        for index in range(items)
+    ]
+    return [_map_user_profile(user) for user in users]
+
+
+def find_route(path: str) -> APIRoute:
+    for route in app.routes:
+        if isinstance(route, APIRoute) and route.path == path and "GET" in route.methods:
+            return route
+    raise LookupError(path)
+
+
+async def default_path(route: APIRoute, page) -> bytes:
+    """То, что FastAPI делает с возвращённой моделью без FastJSONResponse."""
+    content = await serialize_response(field=route.response_field, response_content=page, is_coroutine=True)
+    return JSONResponse(content).body
+
+
+async def fast_path(route: APIRoute, page) -> bytes:
+    return FastJSONResponse(page, annotation=route.response_model).body
+
+
+async def measure(render, route: APIRoute, page, repeat: int) -> float:
+    """Медиана времени одного рендера в микросекундах."""
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        await render(route, page)
+        samples.append((time.perf_counter() - started) * 1_000_000)
+    return statistics.median(samples)
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--items", type=int, default=100, help="элементов на странице")
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    cases = [
+        ("GET /products", find_route("/api/v1/products"), product_page(args.items)),
+        ("GET /orders", find_route("/api/v1/orders"), order_page(args.items)),
+        ("GET /users", find_route("/api/v1/users"), user_page(args.items)),
+    ]
+    print(f"{'endpoint':<16}{'FastAPI, мкс':>14}{'fast, мкс':>12}{'ускорение':>12}{'байт':>10}")
+    for name, route, page in cases:
+        # Оба пути должны выдавать одинаковый JSON
+        default_body, fast_body = await default_path(route, page), await fast_path(route, page)
+        assert json.loads(default_body) == json.loads(fast_body), name
+        for render in (default_path, fast_path):
+            await measure(render, route, page, 10)  # прогрев
+        default_us = await measure(default_path, route, page, args.repeat)
+        fast_us = await measure(fast_path, route, page, args.repeat)
+        print(f"{name:<16}{default_us:>14.0f}{fast_us:>12.0f}{default_us / fast_us:>11.1f}x{len(fast_body):>10}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк поиска товаров: старый ILIKE '%q%' против полнотекстового поиска.
+
+Заполняет таблицу products указанной PostgreSQL базы синтетическим каталогом
+(по умолчанию 1 000 000 строк), затем выполняет одни и те же поисковые запросы
+обоими способами и печатает p50/p95 задержки. Индексы должны быть созданы
+миграциями (alembic upgrade head).
+
+    python scripts/benchmark_product_search.py --database-url postgresql+asyncpg://... --rows 1000000
+"""
+import argparse
+import asyncio
+import statistics
+import time
+import uuid
+
+from sqlalchemy import select, text
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+
+from app.core.config import get_settings
+from app.models.product import Product
+from app.services.search import apply_product_search
+
+
+NAME_WORDS = [
+    "Помидоры", "Огурцы", "Картофель", "Морковь", "Яблоки", "Черешня", "Виноград",
+    "Pomidor", "Bodring", "Kartoshka", "Sabzi", "Olma", "Gilos", "Uzum", "Qovun",
+]
+DESCRIPTION_WORDS = [
+    "свежие", "фермерские", "сезонные", "органические", "отборные",
+    "yangi", "mahalliy", "organik", "sara", "shirin",
+]
+# Частые слова совпадают с каждым ~15-м товаром, редкие (номера в названии) с единицами
+SEARCH_TERMS = {
+    "частые": ["помид", "черешня", "kartosh", "olma", "фермерские", "qovun shirin"],
+    "редкие": ["4242", "77777", "123456", "помидоры 31337"],
+}
+PAGE_SIZE = 20
+
+
+async def seed_catalogue(engine: AsyncEngine, rows: int) -> uuid.UUID:
+    """Создать фермера и rows товаров одним INSERT ... SELECT generate_series."""
+    farmer_id = uuid.uuid4()
+    async with engine.begin() as conn:
+        await conn.execute(
+            text(
+                "INSERT INTO users (id, phone_number, role, is_active, is_verified, created_at, updated_at) "
+                "VALUES (:id, :phone, 'farmer', true, true, now(), now())"
+            ),
+            {"id": farmer_id, "phone": f"+998{farmer_id.int % 10**9:09d}"},
+        )
+        await conn.execute(
+            text(
+                """
+                INSERT INTO products (id, farmer_id, name, description, category, price, quantity, unit,
+                                      is_active, created_at, updated_at)
+                SELECT gen_random_uuid(), :farmer_id,
+                       names[1 + (n * 7919) % cardinality(names)] || ' ' || n,
+                       descriptions[1 + (n * 104729) % cardinality(descriptions)] || ' ' ||
+                       names[1 + (n * 31) % cardinality(names)],
+                       'vegetables', 1000 + n % 50000, 100, 'kg', n % 10 <> 0,
+                       now() - n * interval '1 second', now()
+                FROM generate_series(1, CAST(:rows AS bigint)) AS n,
+                     CAST(:names AS text[]) AS names,
+                     CAST(:descriptions AS text[]) AS descriptions
+                """
+            ),
+            {"farmer_id": farmer_id, "names": NAME_WORDS, "descriptions": DESCRIPTION_WORDS, "rows": rows},
+        )
+        await conn.execute(text("ANALYZE products"))
+    return farmer_id
+
+
+async def time_search(engine: AsyncEngine, dialect_name: str, terms: list[str], queries: int) -> list[float]:
+    """Выполнить поисковые запросы так же, как GET /products, и вернуть задержки в мс."""
+    latencies = []
+    async with engine.connect() as conn:
+        for i in range(queries):
+            search = terms[i % len(terms)]
+            stmt, rank = apply_product_search(
+                select(Product.id).where(Product.is_active == True),
+                search,
+                dialect_name=dialect_name,
+            )
+            order_by = [Product.created_at.desc(), Product.id.desc()]
+            if rank is not None:
+                order_by.insert(0, rank.desc())
+            stmt = stmt.order_by(*order_by).limit(PAGE_SIZE)
+
+            started = time.perf_counter()
+            await conn.execute(stmt)
+            latencies.append((time.perf_counter() - started) * 1000)
+    return latencies
+
+
+def report(label: str, latencies: list[float]) -> None:
+    ordered = sorted(latencies)
+    p95 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+    print(f"   {label:<10} p50={statistics.median(ordered):9.2f} ms  p95={p95:9.2f} ms  n={len(ordered)}")
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", default=get_settings().database_url)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--queries", type=int, default=60)
+    parser.add_argument("--keep", action="store_true", help="не удалять сгенерированные товары")
+    args = parser.parse_args()
+
+    engine = create_async_engine(args.database_url)
+    if engine.dialect.name != "postgresql":
+        raise SystemExit("Бенчмарк требует PostgreSQL: на SQLite поиск всегда ILIKE")
+
+    print(f"📦 Генерация {args.rows} товаров...")
+    started = time.perf_counter()
+    farmer_id = await seed_catalogue(engine, args.rows)
+    print(f"   готово за {time.perf_counter() - started:.1f} с")
+
+    try:
+        for group, terms in SEARCH_TERMS.items():
+            print(f"🔍 {group} слова: {', '.join(terms)}")
+            for label, dialect_name in (("ILIKE", "sqlite"), ("full-text", "postgresql")):
+                # Прогрев кэша страниц, чтобы сравнивать планы, а не холодный диск
+                await time_search(engine, dialect_name, terms, len(terms))
+                report(label, await time_search(engine, dialect_name, terms, args.queries))
+    finally:
+        if not args.keep:
+            async with engine.begin() as conn:
+                await conn.execute(text("DELETE FROM products WHERE farmer_id = :id"), {"id": farmer_id})
+                await conn.execute(text("DELETE FROM users WHERE id = :id"), {"id": farmer_id})
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -5,17 +5,36 @@
 - 20 фермеров
 - 20 магазинов
 - Товары для каждой категории (по несколько на категорию)
+
+С --bulk создаёт объёмы для воспроизведения планов запросов продакшена:
+фермеры, магазины, товары, заказы с позициями, транзакции и доставки. Строки
+генерируются параллельно в нескольких процессах и загружаются через COPY
+(PostgreSQL) или многострочными INSERT (другие СУБД). Данные детерминированы:
+одинаковый --seed даёт одинаковые строки и идентификаторы.
+
+    python scripts/generate_demo_data.py --bulk --farmers 100000 --shops 20000 \
+        --products 5000000 --orders 5000000 --workers 8 --seed 1
 """
+import argparse
 import asyncio
+import hashlib
+import math
+import multiprocessing
 import random
+import time
 import uuid
-from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass, replace
+from datetime import datetime, timedelta
 
-from sqlalchemy import select
-from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import Index, func, insert, select, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.pool import NullPool
 
+from app.core.config import get_settings
 from app.core.security import get_password_hash
-from app.db.session import async_session
+from app.db.session import Base, async_session
 from app.models.product import Product, ProductCategory
 from app.models.user import EntityType, User, UserRole
 
@@ -242,6 +261,292 @@ async def create_products(db: AsyncSession, farmers: list[User]) -> list[Product
     return products
 
 
+# --- Массовая генерация (--bulk) ---
+
+# Префиксы телефонов массовых пользователей: +99871XXXXXXX фермеры, +99872XXXXXXX магазины
+BULK_FARMER_PHONE_PREFIX = "+99871"
+BULK_SHOP_PHONE_PREFIX = "+99872"
+BULK_PASSWORD = "demo12345"
+MAX_ITEMS_PER_ORDER = 7
+ROWS_PER_TASK = 100_000
+ORDERS_PER_TASK = 25_000
+PRODUCT_TEMPLATES = [
+    (category, template) for category, templates in PRODUCTS_BY_CATEGORY.items() for template in templates
+]
+ORDER_STATUS_WEIGHTS = {"delivered": 60, "shipped": 5, "processing": 5, "confirmed": 10, "pending": 10, "cancelled": 10}
+
+
+@dataclass(frozen=True)
+class BulkConfig:
+    database_url: str
+    farmers: int
+    shops: int
+    products: int
+    orders: int
+    seed: int
+    zipf: float
+    days: int
+    password_hash: str
+    now: datetime
+    # Суперпользователь PostgreSQL может отключить триггеры внешних ключей на время COPY
+    skip_fk_checks: bool = False
+
+
+def bulk_id(config: BulkConfig, kind: str, index: int) -> uuid.UUID:
+    """
+    Детерминированный UUID строки: любой процесс вычисляет его по номеру без обмена данными.
+
+    Хеш, а не номер напрямую: порядок ключей не совпадает с порядком вставки, как у
+    uuid4 в продакшене, и планы запросов получаются те же.
+    """
+    digest = hashlib.blake2b(f"{config.seed}:{kind}:{index}".encode(), digest_size=16).digest()
+    return uuid.UUID(bytes=digest, version=4)
+
+
+def product_farmer(config: BulkConfig, index: int) -> int:
+    return index % config.farmers
+
+
+def product_price(index: int) -> float:
+    _, template = PRODUCT_TEMPLATES[index % len(PRODUCT_TEMPLATES)]
+    return round(template["price"] * (1 + (index * 2654435761 % 41) / 100), 2)
+
+
+def zipf_rank(u: float, n: int, s: float) -> int:
+    """Ранг 0..n-1 по обратной функции распределения непрерывного приближения закона Ципфа."""
+    if abs(s - 1.0) < 1e-9:
+        rank = n**u
+    else:
+        rank = (1 + u * (n ** (1 - s) - 1)) ** (1 / (1 - s))
+    return min(n - 1, max(0, int(rank) - 1))
+
+
+def _user_rows(config: BulkConfig, kind: str, start: int, stop: int) -> list[tuple]:
+    role, prefix, entity = (
+        ("farmer", BULK_FARMER_PHONE_PREFIX, "farmer") if kind == "farmer" else ("shop", BULK_SHOP_PHONE_PREFIX, "legal_entity")
+    )
+    names = FARMER_NAMES if kind == "farmer" else SHOP_NAMES
+    created_at = config.now - timedelta(days=config.days + 30)
+    return [
+        (
+            bulk_id(config, kind, index), f"{prefix}{index:07d}", f"{kind}{index}", config.password_hash, role, entity,
+            f"{names[index % len(names)]} {index}", f"{kind}{index}@demo.farm.uz", True, True, created_at, created_at,
+        )
+        for index in range(start, stop)
+    ]
+
+
+def _product_rows(config: BulkConfig, start: int, stop: int) -> list[tuple]:
+    rng = random.Random(f"{config.seed}:product:{start}")
+    rows = []
+    for index in range(start, stop):
+        category, template = PRODUCT_TEMPLATES[index % len(PRODUCT_TEMPLATES)]
+        created_at = config.now - timedelta(days=config.days, seconds=-rng.randrange(config.days * 86400))
+        rows.append(
+            (
+                bulk_id(config, "product", index), bulk_id(config, "farmer", product_farmer(config, index)),
+                f"{template['name']} {index}", f"Свежий {template['name'].lower()} от фермера", category.value,
+                product_price(index), round(rng.uniform(50, 5000), 2), template["unit"], rng.random() > 0.05,
+                created_at, created_at,
+            )
+        )
+    return rows
+
+
+def _order_rows(config: BulkConfig, start: int, stop: int) -> dict[str, list[tuple]]:
+    """Заказы с позициями, транзакциями и доставками; популярность товаров по Ципфу."""
+    rng = random.Random(f"{config.seed}:order:{start}")
+    statuses, weights = zip(*ORDER_STATUS_WEIGHTS.items())
+    # Популярные ранги разбросаны по всем фермерам, а не достаются первым из них
+    stride = 2654435761 if math.gcd(2654435761, config.products) == 1 else 1
+    tables: dict[str, list[tuple]] = {"orders": [], "order_items": [], "transactions": [], "deliveries": []}
+    for index in range(start, stop):
+        anchor = zipf_rank(rng.random(), config.products, config.zipf) * stride % config.products
+        farmer = product_farmer(config, anchor)
+        farmer_products = (config.products - farmer + config.farmers - 1) // config.farmers
+        lines = {anchor} | {
+            farmer + rng.randrange(farmer_products) * config.farmers for _ in range(rng.randint(0, MAX_ITEMS_PER_ORDER - 1))
+        }
+        order_id = bulk_id(config, "order", index)
+        created_at = config.now - timedelta(seconds=rng.randrange(config.days * 86400))
+        status = rng.choices(statuses, weights)[0]
+        address = f"г. Ташкент, ул. Демо, {index % 500 + 1}"
+        total = 0.0
+        for line, product in enumerate(sorted(lines)):
+            quantity = rng.randint(1, 50)
+            price = product_price(product)
+            total += price * quantity
+            tables["order_items"].append(
+                (bulk_id(config, "order_item", index * MAX_ITEMS_PER_ORDER + line), order_id,
+                 bulk_id(config, "product", product), quantity, price, created_at)
+            )
+        shop = bulk_id(config, "shop", rng.randrange(config.shops))
+        updated_at = created_at + timedelta(hours=rng.randint(0, 72))
+        tables["orders"].append(
+            (order_id, shop, bulk_id(config, "farmer", farmer), status, round(total, 2), address, created_at, updated_at)
+        )
+        if status != "pending":
+            payment_status = "failed" if status == "cancelled" else "completed"
+            tables["transactions"].append(
+                (bulk_id(config, "transaction", index), order_id, round(total, 2), rng.choice(("payme", "click", "arca")),
+                 payment_status, f"demo_{index}", created_at, updated_at)
+            )
+        if status in ("shipped", "delivered"):
+            delivered_at = updated_at if status == "delivered" else None
+            tables["deliveries"].append(
+                (bulk_id(config, "delivery", index), order_id, "delivered" if delivered_at else "in_transit", address,
+                 f"TRK{index:010d}", delivered_at, created_at, updated_at)
+            )
+    return tables
+
+
+BULK_COLUMNS = {
+    "users": ["id", "phone_number", "username", "password_hash", "role", "entity_type", "legal_name", "email",
+              "is_active", "is_verified", "created_at", "updated_at"],
+    "products": ["id", "farmer_id", "name", "description", "category", "price", "quantity", "unit", "is_active",
+                 "created_at", "updated_at"],
+    "orders": ["id", "shop_id", "farmer_id", "status", "total_amount", "delivery_address", "created_at", "updated_at"],
+    "order_items": ["id", "order_id", "product_id", "quantity", "price", "created_at"],
+    "transactions": ["id", "order_id", "amount", "provider", "status", "external_id", "created_at", "updated_at"],
+    "deliveries": ["id", "order_id", "status", "delivery_address", "tracking_number", "delivered_at", "created_at",
+                   "updated_at"],
+}
+
+
+async def _write_tables(config: BulkConfig, tables: dict[str, list[tuple]]) -> None:
+    """Записать строки: COPY для asyncpg, многострочные INSERT для остальных драйверов."""
+    engine = create_async_engine(config.database_url, poolclass=NullPool)
+    try:
+        async with engine.begin() as conn:
+            if engine.dialect.driver == "asyncpg":
+                raw = (await conn.get_raw_connection()).driver_connection
+                async with raw.transaction():
+                    if config.skip_fk_checks:
+                        # Ссылки согласованы по построению; проверка каждой строки вдвое замедляет COPY
+                        await raw.execute("SET LOCAL session_replication_role = replica")
+                    for table, rows in tables.items():
+                        await raw.copy_records_to_table(table, records=rows, columns=BULK_COLUMNS[table])
+                return
+            for table, rows in tables.items():
+                columns = BULK_COLUMNS[table]
+                for start in range(0, len(rows), 1000):
+                    chunk = [dict(zip(columns, row)) for row in rows[start : start + 1000]]
+                    await conn.execute(insert(Base.metadata.tables[table]), chunk)
+    finally:
+        await engine.dispose()
+
+
+def _bulk_task(config: BulkConfig, kind: str, start: int, stop: int) -> int:
+    """Сгенерировать и записать строки [start, stop) в отдельном процессе; вернуть число строк."""
+    if kind in ("farmer", "shop"):
+        tables = {"users": _user_rows(config, kind, start, stop)}
+    elif kind == "product":
+        tables = {"products": _product_rows(config, start, stop)}
+    else:
+        tables = _order_rows(config, start, stop)
+    asyncio.run(_write_tables(config, tables))
+    return sum(len(rows) for rows in tables.values())
+
+
+def _run_phase(executor, config: BulkConfig, kind: str, total: int, per_task: int) -> None:
+    started = time.perf_counter()
+    futures = [
+        executor.submit(_bulk_task, config, kind, start, min(start + per_task, total))
+        for start in range(0, total, per_task)
+    ]
+    rows = 0
+    for done, future in enumerate(futures, 1):
+        rows += future.result()
+        print(f"\r   {kind}: {done}/{len(futures)} пачек, {rows} строк", end="", flush=True)
+    elapsed = time.perf_counter() - started
+    print(f"\r✅ {kind}: {rows} строк за {elapsed:.1f} с ({rows / max(elapsed, 1e-9):,.0f} строк/с)")
+
+
+def _secondary_indexes() -> list[Index]:
+    """Неуникальные индексы моделей на заполняемых таблицах: их дешевле построить после загрузки."""
+    return [
+        index
+        for table in BULK_COLUMNS
+        for index in Base.metadata.tables[table].indexes
+        if not index.unique
+    ]
+
+
+async def _prepare_bulk(database_url: str, defer_indexes: bool) -> bool:
+    """Создать схему и администратора, снять индексы; вернуть, можно ли отключать проверку FK."""
+    engine = create_async_engine(database_url, poolclass=NullPool)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    async with AsyncSession(engine) as db:
+        await create_admin_user(db)
+        existing = await db.scalar(select(func.count()).where(User.phone_number.like(f"{BULK_FARMER_PHONE_PREFIX}%")))
+    if existing:
+        await engine.dispose()
+        raise SystemExit(f"В базе уже есть {existing} массовых фермеров; используйте пустую базу")
+    is_superuser = False
+    async with engine.begin() as conn:
+        if engine.dialect.name == "postgresql":
+            is_superuser = bool(await conn.scalar(text("SELECT rolsuper FROM pg_roles WHERE rolname = current_user")))
+        if defer_indexes:
+            for index in _secondary_indexes():
+                await conn.execute(text(f'DROP INDEX IF EXISTS "{index.name}"'))
+    await engine.dispose()
+    return is_superuser
+
+
+async def _finish_bulk(database_url: str, defer_indexes: bool) -> None:
+    engine = create_async_engine(database_url, poolclass=NullPool)
+    async with engine.begin() as conn:
+        if defer_indexes:
+            for index in _secondary_indexes():
+                started = time.perf_counter()
+                await conn.run_sync(lambda sync_conn: index.create(sync_conn, checkfirst=True))
+                print(f"✅ индекс {index.name} за {time.perf_counter() - started:.1f} с")
+        if engine.dialect.name == "postgresql":
+            # Свежая статистика, иначе планировщик видит пустые таблицы
+            for table in BULK_COLUMNS:
+                await conn.execute(text(f"ANALYZE {table}"))
+    await engine.dispose()
+
+
+def generate_bulk(args: argparse.Namespace) -> None:
+    database_url = args.database_url or get_settings().database_url
+    config = BulkConfig(
+        database_url=database_url,
+        farmers=args.farmers,
+        shops=args.shops,
+        products=args.products,
+        orders=args.orders,
+        seed=args.seed,
+        zipf=args.zipf,
+        days=args.days,
+        # Один хеш на всех: bcrypt на каждого из 100 000 пользователей занял бы часы
+        password_hash=get_password_hash(BULK_PASSWORD),
+        now=datetime(2025, 1, 1) + timedelta(days=args.seed % 365),
+    )
+    workers = args.workers
+    is_postgresql = make_url(database_url).get_backend_name() == "postgresql"
+    if make_url(database_url).get_backend_name() == "sqlite":
+        workers = 1  # SQLite пишет в один поток, параллельные процессы лишь ждали бы блокировку
+    # Индексы (особенно GIN полнотекстового поиска) дешевле построить один раз после COPY
+    defer_indexes = is_postgresql and not args.keep_indexes
+    print(f"🚀 Массовая генерация в {workers} процессах (seed={config.seed})")
+    if asyncio.run(_prepare_bulk(database_url, defer_indexes)):
+        config = replace(config, skip_fk_checks=True)
+
+    started = time.perf_counter()
+    # spawn: дочерние процессы не наследуют event loop и соединения родителя
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as executor:
+        _run_phase(executor, config, "farmer", config.farmers, ROWS_PER_TASK)
+        _run_phase(executor, config, "shop", config.shops, ROWS_PER_TASK)
+        _run_phase(executor, config, "product", config.products, ROWS_PER_TASK)
+        _run_phase(executor, config, "order", config.orders, ORDERS_PER_TASK)
+    asyncio.run(_finish_bulk(database_url, defer_indexes))
+    print("=" * 50)
+    print(f"✅ Готово за {time.perf_counter() - started:.1f} с. Пароль всех массовых пользователей: {BULK_PASSWORD}")
+    print(f"   Логины: farmer<N>, shop<N>; конфигурация: {asdict(config) | {'password_hash': '...'}}")
+
+
 async def main():
     """Основная функция для генерации демо данных."""
     print("🚀 Генерация демо данных...")
@@ -282,6 +587,26 @@ async def main():
         print(f"\n📄 Учетные данные администратора сохранены в: {credentials_file}")
 
 
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--bulk", action="store_true", help="Массовая генерация вместо небольшого демо-набора")
+    parser.add_argument("--database-url", help="По умолчанию DATABASE_URL из настроек")
+    parser.add_argument("--farmers", type=int, default=1000)
+    parser.add_argument("--shops", type=int, default=1000)
+    parser.add_argument("--products", type=int, default=100_000)
+    parser.add_argument("--orders", type=int, default=200_000)
+    parser.add_argument("--workers", type=int, default=multiprocessing.cpu_count())
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--zipf", type=float, default=1.1, help="Показатель Ципфа для популярности товаров")
+    parser.add_argument("--days", type=int, default=365, help="Глубина истории заказов в днях")
+    parser.add_argument("--keep-indexes", action="store_true", help="Не удалять индексы на время загрузки")
+    return parser.parse_args()
+
+
 if __name__ == "__main__":
-    asyncio.run(main())
+    arguments = parse_args()
+    if arguments.bulk:
+        generate_bulk(arguments)
+    else:
+        asyncio.run(main())
 
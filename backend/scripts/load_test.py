@@ -0,0 +1,465 @@
+#!/usr/bin/env python3
+"""
+Нагрузочный тест пользовательских сценариев с отчётом p50/p95/p99 по эндпоинтам.
+
+Заполняет базу воспроизводимым набором данных (фермеры, магазины, товары и
+история заказов, популярность товаров распределена по Ципфу), затем
+виртуальные пользователи параллельно проходят сценарий магазина:
+
+    вход по OTP → каталог → карточка товара → заказ → оплата → вебхук
+
+По умолчанию app.main:app запускается в этом же процессе (без сети); с
+--base-url запросы идут на уже запущенный сервер (uvicorn с несколькими
+воркерами), а скрипт лишь заполняет базу и подаёт нагрузку. Сервер должен
+работать с SMS_PROVIDER=dev, чтобы send-otp возвращал код, и с
+RATE_LIMIT_ENABLED=false: вся нагрузка идёт с одного IP.
+
+Результат сохраняется в JSON; с --baseline он сравнивается с базовой линией и
+рост p95 больше допуска считается регрессией (код выхода 1).
+
+    python scripts/load_test.py --database-url postgresql+asyncpg://... --seed \\
+        --journeys 400 --concurrency 20 --output /tmp/load.json --baseline scripts/baselines/load_test.json
+"""
+import argparse
+import asyncio
+import bisect
+import itertools
+import json
+import logging
+import os
+import platform
+import random
+import statistics
+import sys
+import time
+import uuid
+from collections import Counter, defaultdict
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from httpx import ASGITransport, AsyncClient, Response
+
+API = "/api/v1"
+# Телефоны тестовых пользователей: по префиксу их можно найти и удалить
+SHOP_PHONE_PREFIX = "+99877"
+FARMER_PHONE_PREFIX = "+99878"
+PRODUCT_NAMES = ["Помидоры", "Огурцы", "Картофель", "Морковь", "Яблоки", "Черешня", "Olma", "Uzum", "Qovun", "Sabzi"]
+BATCH_SIZE = 5000
+
+
+def batches(rows: list[dict], size: int = BATCH_SIZE):
+    for start in range(0, len(rows), size):
+        yield rows[start : start + size]
+
+
+class Zipf:
+    """Выбор ранга 0..n-1 с вероятностью ~ 1 / (ранг + 1) ** s."""
+
+    def __init__(self, n: int, s: float, rng: random.Random) -> None:
+        self.cumulative = list(itertools.accumulate(1 / rank**s for rank in range(1, n + 1)))
+        self.rng = rng
+
+    def sample(self) -> int:
+        return bisect.bisect_left(self.cumulative, self.rng.random() * self.cumulative[-1])
+
+
+@dataclass
+class Dataset:
+    shop_phones: list[str]
+    # Товары по убыванию популярности: (product_id, farmer_id)
+    products: list[tuple[str, str]]
+    products_by_farmer: dict[str, list[str]]
+
+
+async def seed(engine, args) -> None:
+    """Вставить пользователей, товары и историю заказов пачками, если их ещё нет."""
+    from sqlalchemy import func, insert, select
+    from sqlalchemy.ext.asyncio import AsyncSession
+
+    from app.models.order import Order, OrderItem, OrderStatus
+    from app.models.product import Product, ProductCategory
+    from app.models.user import User, UserRole
+
+    rng = random.Random(args.seed_value)
+    async with AsyncSession(engine) as session:
+        existing = await session.scalar(select(func.count()).where(User.phone_number.like(f"{FARMER_PHONE_PREFIX}%")))
+        if existing:
+            print(f"Данные уже есть ({existing} фермеров), заполнение пропущено")
+            return
+
+        started = time.perf_counter()
+        now = datetime.utcnow()
+
+        def users(prefix: str, role: UserRole, count: int) -> list[dict]:
+            return [
+                {
+                    "id": uuid.UUID(int=rng.getrandbits(128), version=4),
+                    "phone_number": f"{prefix}{index:07d}",
+                    "role": role,
+                    "is_active": True,
+                    "is_verified": True,
+                    "legal_name": f"{role.value.title()} {index}",
+                    "created_at": now - timedelta(days=365),
+                }
+                for index in range(count)
+            ]
+
+        farmers = users(FARMER_PHONE_PREFIX, UserRole.FARMER, args.farmers)
+        shops = users(SHOP_PHONE_PREFIX, UserRole.SHOP, args.shops)
+        for batch in batches(farmers + shops):
+            await session.execute(insert(User), batch)
+
+        categories = list(ProductCategory)
+        products = []
+        for index in range(args.products):
+            created_at = now - timedelta(minutes=rng.randrange(365 * 24 * 60))
+            products.append(
+                {
+                    "id": uuid.UUID(int=rng.getrandbits(128), version=4),
+                    "farmer_id": farmers[index % len(farmers)]["id"],
+                    "name": f"{rng.choice(PRODUCT_NAMES)} {index}",
+                    "description": "Свежие фермерские продукты",
+                    "category": rng.choice(categories),
+                    "price": round(rng.uniform(1, 500), 2),
+                    # Запаса хватает на любой прогон: сценарий не должен упираться в остатки
+                    "quantity": 1_000_000,
+                    "unit": "kg",
+                    "is_active": True,
+                    "created_at": created_at,
+                    "updated_at": created_at,
+                }
+            )
+        for batch in batches(products):
+            await session.execute(insert(Product), batch)
+
+        popularity = Zipf(len(products), args.zipf, rng)
+        by_farmer: dict[uuid.UUID, list[dict]] = defaultdict(list)
+        for product in products:
+            by_farmer[product["farmer_id"]].append(product)
+        statuses = [OrderStatus.DELIVERED] * 6 + [OrderStatus.CANCELLED, OrderStatus.PENDING, OrderStatus.CONFIRMED]
+        orders: list[dict] = []
+        items: list[dict] = []
+
+        async def flush() -> None:
+            if orders:
+                await session.execute(insert(Order), orders)
+                await session.execute(insert(OrderItem), items)
+                orders.clear()
+                items.clear()
+
+        for _ in range(args.orders):
+            anchor = products[popularity.sample()]
+            lines = [anchor, *rng.sample(by_farmer[anchor["farmer_id"]], k=min(rng.randint(0, 3), len(by_farmer[anchor["farmer_id"]])))]
+            order_id = uuid.UUID(int=rng.getrandbits(128), version=4)
+            created_at = max(now - timedelta(minutes=rng.randrange(180 * 24 * 60)), anchor["created_at"])
+            order_items = [
+                {
+                    "id": uuid.UUID(int=rng.getrandbits(128), version=4),
+                    "order_id": order_id,
+                    "product_id": product["id"],
+                    "quantity": rng.randint(1, 20),
+                    "price": product["price"],
+                    "created_at": created_at,
+                }
+                for product in {line["id"]: line for line in lines}.values()
+            ]
+            orders.append(
+                {
+                    "id": order_id,
+                    "shop_id": rng.choice(shops)["id"],
+                    "farmer_id": anchor["farmer_id"],
+                    "status": rng.choice(statuses),
+                    "total_amount": round(sum(item["price"] * item["quantity"] for item in order_items), 2),
+                    "created_at": created_at,
+                    "updated_at": created_at,
+                }
+            )
+            items.extend(order_items)
+            if len(items) >= BATCH_SIZE:
+                await flush()
+        await flush()
+        await session.commit()
+        print(
+            f"Заполнено за {time.perf_counter() - started:.1f} с: {len(farmers)} фермеров, {len(shops)} магазинов, "
+            f"{len(products)} товаров, {args.orders} заказов"
+        )
+
+
+async def clear_otp_codes(engine) -> None:
+    """Удалить коды и паузы повторной отправки тестовых магазинов — и в таблице, и в Redis."""
+    from redis.exceptions import RedisError
+    from sqlalchemy import delete
+    from sqlalchemy.ext.asyncio import AsyncSession
+
+    from app.core.config import get_settings
+    from app.core.redis import get_redis
+    from app.models.otp import PhoneOTP
+    from app.services.otp import KEY_PREFIX
+
+    async with AsyncSession(engine) as session:
+        await session.execute(delete(PhoneOTP).where(PhoneOTP.phone_number.like(f"{SHOP_PHONE_PREFIX}%")))
+        await session.commit()
+    if get_settings().otp_store_backend != "redis":
+        return
+    # С --base-url сервер должен использовать тот же REDIS_URL
+    redis = get_redis()
+    try:
+        keys = [key async for key in redis.scan_iter(match=f"{KEY_PREFIX}{SHOP_PHONE_PREFIX}*", count=BATCH_SIZE)]
+        for start in range(0, len(keys), BATCH_SIZE):
+            await redis.delete(*keys[start : start + BATCH_SIZE])
+    except RedisError as exc:
+        sys.exit(f"Redis недоступен, а коды OTP хранятся в нём ({exc}); запустите с OTP_STORE_BACKEND=database")
+
+
+async def load_dataset(engine, seed_value: int) -> Dataset:
+    """Прочитать тестовые данные; порядок популярности воспроизводим при том же --seed-value."""
+    from sqlalchemy import select
+    from sqlalchemy.ext.asyncio import AsyncSession
+
+    from app.models.product import Product
+    from app.models.user import User
+
+    # Коды прошлого прогона иначе дают 429 на send-otp в течение минуты
+    await clear_otp_codes(engine)
+    async with AsyncSession(engine) as session:
+        shop_phones = list(
+            await session.scalars(
+                select(User.phone_number).where(User.phone_number.like(f"{SHOP_PHONE_PREFIX}%")).order_by(User.phone_number)
+            )
+        )
+        rows = (
+            await session.execute(
+                select(Product.id, Product.farmer_id)
+                .join(User, User.id == Product.farmer_id)
+                .where(User.phone_number.like(f"{FARMER_PHONE_PREFIX}%"), Product.is_active.is_(True))
+                .order_by(Product.id)
+            )
+        ).all()
+    if not shop_phones or not rows:
+        sys.exit("Нет тестовых данных: запустите с --seed")
+    products = [(str(row.id), str(row.farmer_id)) for row in rows]
+    random.Random(seed_value).shuffle(products)
+    products_by_farmer: dict[str, list[str]] = defaultdict(list)
+    for product_id, farmer_id in products:
+        products_by_farmer[farmer_id].append(product_id)
+    return Dataset(shop_phones=shop_phones, products=products, products_by_farmer=products_by_farmer)
+
+
+@dataclass
+class Recorder:
+    latencies: dict[str, list[float]] = field(default_factory=lambda: defaultdict(list))
+    errors: Counter = field(default_factory=Counter)
+    failed_journeys: int = 0
+    completed_journeys: int = 0
+
+    async def call(self, step: str, request) -> Response | None:
+        """Выполнить запрос шага; None при ошибке, тогда сценарий прерывается."""
+        started = time.perf_counter()
+        try:
+            response = await request
+        except Exception as exc:  # сеть или исключение в приложении: учитываем как ошибку шага
+            self.errors[(step, type(exc).__name__)] += 1
+            return None
+        self.latencies[step].append(time.perf_counter() - started)
+        if response.status_code >= 400:
+            self.errors[(step, str(response.status_code))] += 1
+            return None
+        return response
+
+
+async def journey(client: AsyncClient, data: Dataset, phone: str, rng: random.Random, popularity: Zipf, rec: Recorder) -> bool:
+    response = await rec.call("POST /auth/send-otp", client.post(f"{API}/auth/send-otp", json={"phone_number": phone}))
+    if response is None:
+        return False
+    code = response.json().get("debug", {}).get("otp")
+    response = await rec.call(
+        "POST /auth/verify-otp", client.post(f"{API}/auth/verify-otp", json={"phone_number": phone, "code": code})
+    )
+    if response is None:
+        return False
+    headers = {"Authorization": f"Bearer {response.json()['token']['access_token']}"}
+
+    params = {"limit": 20, "offset": 20 * min(popularity.sample(), 4)}
+    if rng.random() < 0.5:
+        params["category"] = rng.choice(["vegetables", "fruits", "grains", "dairy", "meat", "other"])
+    if await rec.call("GET /products", client.get(f"{API}/products", params=params)) is None:
+        return False
+
+    product_id, farmer_id = data.products[popularity.sample()]
+    if await rec.call("GET /products/{product_id}", client.get(f"{API}/products/{product_id}")) is None:
+        return False
+
+    siblings = data.products_by_farmer[farmer_id]
+    product_ids = {product_id, *rng.sample(siblings, k=min(rng.randint(0, 2), len(siblings)))}
+    order = {"farmer_id": farmer_id, "items": [{"product_id": pid, "quantity": rng.randint(1, 5)} for pid in product_ids]}
+    response = await rec.call("POST /orders", client.post(f"{API}/orders", json=order, headers=headers))
+    if response is None:
+        return False
+
+    payment = {"order_id": response.json()["id"], "provider": "payme"}
+    response = await rec.call("POST /payments/init", client.post(f"{API}/payments/init", json=payment, headers=headers))
+    if response is None:
+        return False
+    webhook = {"transaction_id": response.json()["transaction_id"], "status": "completed"}
+    response = await rec.call(
+        "POST /payments/webhooks/{provider}", client.post(f"{API}/payments/webhooks/payme", json=webhook)
+    )
+    return response is not None
+
+
+async def run_load(client: AsyncClient, data: Dataset, args, journeys: int, rec: Recorder) -> float:
+    """Пройти journeys сценариев в concurrency потоков; вернуть длительность в секундах."""
+    counter = itertools.count()
+
+    async def user(worker: int) -> None:
+        rng = random.Random(args.seed_value * 1000 + worker)
+        popularity = Zipf(len(data.products), args.zipf, rng)
+        while (index := next(counter)) < journeys:
+            # Каждый сценарий входит под своим магазином: OTP нельзя запросить повторно чаще раза в минуту
+            phone = data.shop_phones[index % len(data.shop_phones)]
+            if await journey(client, data, phone, rng, popularity, rec):
+                rec.completed_journeys += 1
+            else:
+                rec.failed_journeys += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(user(worker) for worker in range(args.concurrency)))
+    return time.perf_counter() - started
+
+
+def percentile(sorted_values: list[float], q: float) -> float:
+    """Перцентиль по ближайшему рангу."""
+    index = max(0, min(len(sorted_values) - 1, round(q / 100 * len(sorted_values) + 0.5) - 1))
+    return sorted_values[index]
+
+
+def build_report(rec: Recorder, elapsed: float, args, dialect: str) -> dict:
+    steps = {}
+    for step, values in rec.latencies.items():
+        values = sorted(values)
+        steps[step] = {
+            "requests": len(values),
+            "errors": sum(count for (name, _), count in rec.errors.items() if name == step),
+            "throughput_rps": round(len(values) / elapsed, 2),
+            "p50_ms": round(percentile(values, 50) * 1000, 2),
+            "p95_ms": round(percentile(values, 95) * 1000, 2),
+            "p99_ms": round(percentile(values, 99) * 1000, 2),
+            "mean_ms": round(statistics.fmean(values) * 1000, 2),
+        }
+    return {
+        "meta": {
+            "created_at": datetime.utcnow().isoformat(timespec="seconds") + "Z",
+            "target": args.base_url or "in-process",
+            "database": dialect,
+            "python": platform.python_version(),
+            "cpus": os.cpu_count(),
+            "journeys": args.journeys,
+            "concurrency": args.concurrency,
+            "dataset": {key: getattr(args, key) for key in ("farmers", "shops", "products", "orders", "zipf", "seed_value")},
+        },
+        "elapsed_seconds": round(elapsed, 2),
+        "journeys": {
+            "completed": rec.completed_journeys,
+            "failed": rec.failed_journeys,
+            "per_second": round(rec.completed_journeys / elapsed, 2),
+        },
+        "errors": {f"{step} {kind}": count for (step, kind), count in sorted(rec.errors.items())},
+        "steps": dict(sorted(steps.items())),
+    }
+
+
+def print_report(report: dict, baseline: dict | None, tolerance: float) -> list[str]:
+    """Напечатать таблицу; вернуть список шагов, у которых p95 вырос сильнее допуска."""
+    regressions = []
+    print(f"\n{'шаг':<36} {'запросов':>8} {'ошибок':>7} {'RPS':>8} {'p50 мс':>8} {'p95 мс':>8} {'p99 мс':>8}  к базе p95")
+    for step, stats in report["steps"].items():
+        line = (
+            f"{step:<36} {stats['requests']:>8} {stats['errors']:>7} {stats['throughput_rps']:>8.1f} "
+            f"{stats['p50_ms']:>8.1f} {stats['p95_ms']:>8.1f} {stats['p99_ms']:>8.1f}"
+        )
+        base = (baseline or {}).get("steps", {}).get(step)
+        if base:
+            change = stats["p95_ms"] / base["p95_ms"] - 1 if base["p95_ms"] else 0.0
+            line += f"  {change:+.0%}"
+            if change > tolerance:
+                regressions.append(step)
+                line += "  РЕГРЕССИЯ"
+        print(line)
+    journeys = report["journeys"]
+    print(
+        f"\nСценариев: {journeys['completed']} успешно, {journeys['failed']} с ошибкой, "
+        f"{journeys['per_second']:.1f}/с за {report['elapsed_seconds']:.1f} с"
+    )
+    for name, count in report["errors"].items():
+        print(f"  ошибка {name}: {count}")
+    return regressions
+
+
+async def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", default=os.getenv("DATABASE_URL"))
+    parser.add_argument("--base-url", help="Нагружать запущенный сервер вместо приложения в процессе")
+    parser.add_argument("--seed", action="store_true", help="Заполнить базу, если тестовых данных ещё нет")
+    parser.add_argument("--seed-value", type=int, default=42)
+    parser.add_argument("--farmers", type=int, default=200)
+    parser.add_argument("--shops", type=int, default=2000)
+    parser.add_argument("--products", type=int, default=20000)
+    parser.add_argument("--orders", type=int, default=50000)
+    parser.add_argument("--zipf", type=float, default=1.1, help="Показатель Ципфа для популярности товаров")
+    parser.add_argument("--journeys", type=int, default=400)
+    parser.add_argument("--warmup", type=int, default=20, help="Сценарии прогрева, не входят в отчёт")
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--output", type=Path, help="Куда сохранить JSON-отчёт")
+    parser.add_argument("--baseline", type=Path, help="JSON-отчёт для сравнения")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Допустимый рост p95 относительно базы")
+    args = parser.parse_args()
+    if not args.database_url:
+        parser.error("нужен --database-url или DATABASE_URL")
+
+    # Настройки приложения читаются при импорте, поэтому окружение задаётся до него
+    os.environ["DATABASE_URL"] = args.database_url
+    os.environ.setdefault("REDIS_URL", "redis://localhost:6379/0")
+    os.environ.setdefault("SECRET_KEY", "load-test-secret")
+    os.environ["SMS_PROVIDER"] = "dev"
+    os.environ["PAYMENT_MOCK_MODE"] = "true"
+    # Все сценарии идут с одного адреса: лимиты по IP отвечали бы 429 вместо замера
+    os.environ["RATE_LIMIT_ENABLED"] = "false"
+    # Логи каждого запроса искажают замер сильнее, чем сам запрос
+    logging.disable(logging.WARNING)
+
+    from app.db.session import Base, engine
+    from app.main import app
+
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    if args.seed:
+        await seed(engine, args)
+    data = await load_dataset(engine, args.seed_value)
+    if args.journeys + args.warmup > len(data.shop_phones):
+        print(f"Внимание: сценариев больше, чем магазинов ({len(data.shop_phones)}); повторный OTP в течение минуты получит 429")
+
+    transport = None if args.base_url else ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url=args.base_url or "http://loadtest", timeout=30) as client:
+        await run_load(client, data, args, args.warmup, Recorder())
+        # Прогрев использовал первые магазины; сдвигаем, чтобы не получить 429
+        data.shop_phones = data.shop_phones[args.warmup :] + data.shop_phones[: args.warmup]
+        recorder = Recorder()
+        elapsed = await run_load(client, data, args, args.journeys, recorder)
+    await engine.dispose()
+
+    report = build_report(recorder, elapsed, args, engine.dialect.name)
+    baseline = json.loads(args.baseline.read_text()) if args.baseline and args.baseline.exists() else None
+    regressions = print_report(report, baseline, args.tolerance)
+    if args.output:
+        args.output.parent.mkdir(parents=True, exist_ok=True)
+        args.output.write_text(json.dumps(report, ensure_ascii=False, indent=2) + "\n")
+        print(f"Отчёт сохранён в {args.output}")
+    if regressions:
+        print(f"p95 вырос больше чем на {args.tolerance:.0%}: {', '.join(regressions)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
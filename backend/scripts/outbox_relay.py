@@ -0,0 +1,31 @@
+#!/usr/bin/env python3
+"""
+Отдельный процесс публикации доменных событий из таблицы outbox_events.
+
+Нужен, когда API запущен с OUTBOX_RELAY_ENABLED=false. События (order.created,
+payment.completed, delivery.delivered) пишутся в той же транзакции, что и изменение
+заказа, платежа или доставки; этот процесс пачками публикует их в поток Redis
+OUTBOX_STREAM_KEY. Доставка «хотя бы один раз»: потребители отбрасывают повторы по id
+события. Можно запускать несколько экземпляров — пачки разбираются через SKIP LOCKED.
+
+    PYTHONPATH=. python scripts/outbox_relay.py
+"""
+import asyncio
+import contextlib
+import logging
+
+from app.core.redis import close_redis
+from app.services.outbox import get_outbox_relay
+
+
+async def main() -> None:
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+    try:
+        await get_outbox_relay().run()
+    finally:
+        await close_redis()
+
+
+if __name__ == "__main__":
+    with contextlib.suppress(KeyboardInterrupt):
+        asyncio.run(main())
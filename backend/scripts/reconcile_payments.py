@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""
+Сверка зависших платежей с провайдерами.
+
+Берёт транзакции, которые дольше --stale-minutes остаются в статусе pending, и запрашивает
+их статус у провайдера (verify_payment), не больше --concurrency запросов к одному
+провайдеру одновременно. Подтверждённые и отклонённые платежи обновляются пакетно; те,
+что остаются pending дольше --expire-minutes, отменяются. С --loop сверка повторяется
+каждые PAYMENT_RECONCILIATION_INTERVAL_SECONDS секунд.
+
+    PYTHONPATH=. python scripts/reconcile_payments.py --stale-minutes 30
+"""
+import argparse
+import asyncio
+from datetime import timedelta
+
+from app.core.config import get_settings
+from app.db.session import async_session
+from app.services.payments.reconciliation import PaymentReconciler
+
+
+async def main() -> None:
+    settings = get_settings()
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--stale-minutes", type=int, default=settings.payment_reconciliation_stale_minutes)
+    parser.add_argument(
+        "--expire-minutes",
+        type=int,
+        default=settings.payment_reconciliation_expire_minutes,
+        help="0 — не отменять зависшие платежи",
+    )
+    parser.add_argument("--batch-size", type=int, default=settings.payment_reconciliation_batch_size)
+    parser.add_argument("--concurrency", type=int, default=settings.payment_reconciliation_concurrency)
+    parser.add_argument("--loop", action="store_true", help="Повторять сверку до остановки")
+    args = parser.parse_args()
+
+    reconciler = PaymentReconciler(
+        async_session,
+        stale_after=timedelta(minutes=args.stale_minutes),
+        expire_after=timedelta(minutes=args.expire_minutes) if args.expire_minutes else None,
+        batch_size=args.batch_size,
+        concurrency=args.concurrency,
+    )
+    if args.loop:
+        await reconciler.run(settings.payment_reconciliation_interval_seconds)
+        return
+
+    report = await reconciler.run_once()
+    print(f"Проверено: {report.checked} за {report.elapsed:.1f} с ({report.per_second:.0f}/с), ошибок: {report.errors}")
+    for status, count in sorted(report.updated.items()):
+        print(f"  {status}: {count}")
+    print(f"Самый старый pending: {report.lag_seconds:.0f} с")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
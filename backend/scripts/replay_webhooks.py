@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+"""
+Повторная обработка сохранённых вебхуков платёжных провайдеров за интервал времени.
+
+Переводит события, полученные в [--from, --to), обратно в статус received. По умолчанию
+это только ignored и failed; --all добавляет уже обработанные. Переходы статусов
+идемпотентны, поэтому повторное применение события ничего не ломает. Без --process
+события подхватит воркер API; с --process они обрабатываются прямо здесь.
+
+    PYTHONPATH=. python scripts/replay_webhooks.py --from 2026-10-01T00:00 --to 2026-10-02T00:00 --provider payme --process
+"""
+import argparse
+import asyncio
+from datetime import datetime
+
+from app.db.session import async_session
+from app.models.payment_webhook import WebhookEventStatus
+from app.models.transaction import PaymentProvider
+from app.services.payments.webhooks import get_webhook_worker, requeue_webhook_events
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--from", dest="received_from", type=datetime.fromisoformat, required=True, help="UTC, включительно")
+    parser.add_argument("--to", dest="received_to", type=datetime.fromisoformat, required=True, help="UTC, не включительно")
+    parser.add_argument("--provider", type=PaymentProvider, choices=list(PaymentProvider))
+    parser.add_argument("--all", action="store_true", help="Включая уже обработанные события")
+    parser.add_argument("--process", action="store_true", help="Обработать события в этом процессе")
+    args = parser.parse_args()
+
+    statuses = (WebhookEventStatus.IGNORED, WebhookEventStatus.FAILED)
+    if args.all:
+        statuses += (WebhookEventStatus.PROCESSED,)
+    async with async_session() as db:
+        count = await requeue_webhook_events(
+            db,
+            received_from=args.received_from,
+            received_to=args.received_to,
+            provider=args.provider,
+            statuses=statuses,
+        )
+        await db.commit()
+    print(f"Поставлено в очередь событий: {count}")
+
+    if args.process and count:
+        result = await get_webhook_worker().drain()
+        print(f"Обработано: {result.processed}, без транзакции: {result.ignored}, с ошибкой: {result.failed}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
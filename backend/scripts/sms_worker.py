@@ -0,0 +1,29 @@
+#!/usr/bin/env python3
+"""
+Отдельный процесс рассылки SMS из очереди Redis.
+
+Нужен, когда API запущен с SMS_WORKER_ENABLED=false: тогда веб-воркеры только
+ставят сообщения в очередь, а отправляет их этот процесс. Можно запускать
+несколько экземпляров — они делят очередь через consumer group.
+
+    PYTHONPATH=. python scripts/sms_worker.py
+"""
+import asyncio
+import contextlib
+import logging
+
+from app.core.redis import close_redis
+from app.services.sms import get_sms_dispatcher
+
+
+async def main() -> None:
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+    try:
+        await get_sms_dispatcher().run()
+    finally:
+        await close_redis()
+
+
+if __name__ == "__main__":
+    with contextlib.suppress(KeyboardInterrupt):
+        asyncio.run(main())
@@ -1,16 +1,34 @@
 """Pytest configuration and fixtures."""
 
 import os
+import random
 import pytest
 from collections.abc import AsyncGenerator
+from sqlalchemy import event
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
 from sqlalchemy.pool import StaticPool
 
+from app.core.config import get_settings
+from app.core.instrumentation import instrument_engine, query_budget as _query_budget
+from app.core.rate_limit import rate_limiter
 from app.db.session import Base, get_db
 from app.main import app
+from app.models.user import User, UserRole
+from app.services.catalog_cache import catalog_cache
 from httpx import AsyncClient
 
 
+# Backends with real concurrent connections; PostgreSQL runs only when TEST_POSTGRES_URL is set
+REAL_DB_BACKENDS = [
+    pytest.param("sqlite", id="sqlite"),
+    pytest.param(
+        "postgresql",
+        id="postgresql",
+        marks=pytest.mark.skipif(not os.getenv("TEST_POSTGRES_URL"), reason="TEST_POSTGRES_URL is not set"),
+    ),
+]
+
+
 # Override database URL for tests
 @pytest.fixture(scope="session", autouse=True)
 def setup_test_env():
@@ -22,6 +40,24 @@ def setup_test_env():
     os.environ["SMS_DEBUG_ECHO"] = "true"
 
 
+@pytest.fixture(autouse=True)
+def disable_catalog_cache(monkeypatch):
+    """Keep cached catalogue pages from leaking between tests; cache tests opt back in."""
+    monkeypatch.setattr(catalog_cache, "enabled", False)
+
+
+@pytest.fixture(autouse=True)
+def disable_rate_limits(monkeypatch):
+    """Every test client shares one IP; rate limit tests opt back in."""
+    monkeypatch.setattr(rate_limiter, "enabled", False)
+
+
+@pytest.fixture(autouse=True)
+def otp_store_in_database(monkeypatch):
+    """The test Redis is not reachable; OTP codes go to the phone_otps table on SQLite."""
+    monkeypatch.setattr(get_settings(), "otp_store_backend", "database")
+
+
 @pytest.fixture(scope="session")
 async def test_engine():
     """Create test database engine."""
@@ -36,6 +72,32 @@ async def test_engine():
     await engine.dispose()
 
 
+@pytest.fixture(params=REAL_DB_BACKENDS)
+async def real_db_engine(request, tmp_path):
+    """Fresh schema on a file-based SQLite database or on PostgreSQL."""
+    if request.param == "sqlite":
+        engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'test.db'}", connect_args={"timeout": 30})
+
+        # pysqlite defers BEGIN; take the write lock up front so transactions serialize
+        @event.listens_for(engine.sync_engine, "connect")
+        def _connect(dbapi_connection, connection_record):
+            dbapi_connection.isolation_level = None
+
+        @event.listens_for(engine.sync_engine, "begin")
+        def _begin(conn):
+            conn.exec_driver_sql("BEGIN IMMEDIATE")
+    else:
+        engine = create_async_engine(os.environ["TEST_POSTGRES_URL"], pool_size=20, max_overflow=20)
+
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+    yield engine
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+    await engine.dispose()
+
+
 @pytest.fixture
 async def db_session(test_engine):
     """Create database session for tests."""
@@ -45,6 +107,44 @@ async def db_session(test_engine):
         await session.rollback()
 
 
+@pytest.fixture
+def query_log(test_engine):
+    """Collect every SQL statement sent to the test database."""
+    statements: list[str] = []
+
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(test_engine.sync_engine, "before_cursor_execute", _before_cursor_execute)
+    yield statements
+    event.remove(test_engine.sync_engine, "before_cursor_execute", _before_cursor_execute)
+
+
+@pytest.fixture
+def query_budget(test_engine):
+    """``with query_budget(n, repeat_threshold=k):`` fails a block that runs too many or repeated statements."""
+    instrument_engine(test_engine)
+    return _query_budget
+
+
+@pytest.fixture
+def user_factory(db_session):
+    """Create users directly in the database, bypassing the OTP flow."""
+    async def _create(role: UserRole, **fields) -> User:
+        user = User(
+            phone_number=f"+99890{random.randint(0, 9999999):07d}",
+            role=role,
+            is_active=True,
+            is_verified=True,
+            **fields,
+        )
+        db_session.add(user)
+        await db_session.commit()
+        return user
+
+    return _create
+
+
 @pytest.fixture
 async def override_get_db(db_session):
     """Override get_db dependency for tests."""
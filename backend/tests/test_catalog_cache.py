@@ -0,0 +1,145 @@
+"""Tests for the product catalogue read-through cache."""
+
+import uuid
+
+import pytest
+from fakeredis import FakeAsyncRedis
+from httpx import AsyncClient
+from redis.asyncio import Redis
+
+from app.api.v1 import orders as orders_api
+from app.api.v1 import products as products_api
+from app.models.product import Product, ProductCategory
+from app.models.user import UserRole
+from app.schemas.order import OrderCreate, OrderItemCreate
+from app.schemas.product import ProductResponse, ProductUpdate
+from app.services.catalog_cache import LIST_KEY, CatalogCache, list_cache_key
+
+
+def _make_cache(redis: Redis | None) -> CatalogCache:
+    return CatalogCache(redis=(lambda: redis) if redis else None, ttl=60, local_ttl=60, local_size=16)
+
+
+@pytest.fixture
+def fake_redis():
+    return FakeAsyncRedis()
+
+
+@pytest.fixture
+def cache(fake_redis, monkeypatch):
+    """A fresh cache on fake Redis, installed in the product and order endpoints."""
+    cache = _make_cache(fake_redis)
+    monkeypatch.setattr(products_api, "catalog_cache", cache)
+    monkeypatch.setattr(orders_api, "catalog_cache", cache)
+    return cache
+
+
+def test_list_cache_key_normalizes_params():
+    farmer_id = uuid.uuid4()
+    key = list_cache_key({"category": ProductCategory.FRUITS, "farmer_id": farmer_id, "search": " red  apple ", "limit": 20})
+    assert key == list_cache_key(
+        {"limit": 20, "search": "red apple", "farmer_id": str(farmer_id), "category": "fruits", "cursor": None}
+    )
+    assert key != list_cache_key({"category": "fruits", "farmer_id": str(farmer_id), "search": "red apple", "limit": 21})
+
+
+def _product_response(**fields) -> ProductResponse:
+    from datetime import datetime
+
+    defaults = dict(
+        id=uuid.uuid4(),
+        farmer_id=uuid.uuid4(),
+        name="Olma",
+        description=None,
+        category=ProductCategory.FRUITS,
+        price=1.0,
+        quantity=1.0,
+        unit="kg",
+        image_url=None,
+        is_active=True,
+        created_at=datetime(2025, 1, 1),
+        updated_at=datetime(2025, 1, 1),
+    )
+    defaults.update(fields)
+    return ProductResponse(**defaults)
+
+
+@pytest.mark.asyncio
+async def test_tiers_and_invalidation(cache: CatalogCache, fake_redis):
+    product = _product_response()
+    loads = 0
+
+    async def load() -> ProductResponse:
+        nonlocal loads
+        loads += 1
+        return product
+
+    assert await cache.get_product(product.id, ProductResponse, load) == product
+    assert await cache.get_product(product.id, ProductResponse, load) == product
+    # A second worker only shares the Redis tier
+    cache.clear_local()
+    assert await cache.get_product(product.id, ProductResponse, load) == product
+    assert (loads, cache.stats.misses, cache.stats.local_hits, cache.stats.redis_hits) == (1, 1, 1, 1)
+
+    await cache.get_list({"limit": 20}, ProductResponse, load)
+    assert await fake_redis.hlen(LIST_KEY) == 1
+    assert await fake_redis.ttl(LIST_KEY) > 0
+
+    await cache.invalidate([product.id])
+    assert await fake_redis.exists(LIST_KEY, f"catalog:product:{product.id}") == 0
+    await cache.get_product(product.id, ProductResponse, load)
+    assert loads == 3
+
+
+@pytest.mark.asyncio
+async def test_redis_outage_falls_back_to_loader():
+    """An unreachable Redis costs one failed call, then is bypassed until the retry delay."""
+    unreachable = Redis.from_url("redis://127.0.0.1:1/0", socket_connect_timeout=0.2)
+    cache = _make_cache(unreachable)
+    product = _product_response()
+
+    async def load() -> ProductResponse:
+        return product
+
+    assert await cache.get_product(product.id, ProductResponse, load) == product
+    cache.clear_local()
+    assert await cache.get_product(product.id, ProductResponse, load) == product
+    await cache.invalidate([product.id])
+    assert cache.stats.misses == 2
+    assert cache.stats.redis_errors == 1
+    await unreachable.aclose()
+
+
+@pytest.mark.asyncio
+async def test_catalogue_endpoints_are_cached_and_invalidated(
+    client: AsyncClient, db_session, user_factory, query_log, cache: CatalogCache
+):
+    """Repeated reads skip the database; product writes and orders are visible right after."""
+    farmer = await user_factory(UserRole.FARMER)
+    shop = await user_factory(UserRole.SHOP)
+    product = Product(farmer_id=farmer.id, name="Cached", category=ProductCategory.DAIRY, price=10.0, quantity=5.0)
+    db_session.add(product)
+    await db_session.commit()
+    product_id = product.id
+    params = {"farmer_id": str(farmer.id)}
+
+    first = await client.get("/api/v1/products", params=params)
+    detail = await client.get(f"/api/v1/products/{product_id}")
+    query_log.clear()
+    assert (await client.get("/api/v1/products", params=params)).json() == first.json()
+    assert (await client.get(f"/api/v1/products/{product_id}")).json() == detail.json()
+    assert query_log == []
+
+    await products_api.update_product(product_id, ProductUpdate(price=12.0), db=db_session, current_user=farmer)
+    assert (await client.get("/api/v1/products", params=params)).json()["items"][0]["price"] == 12.0
+    assert (await client.get(f"/api/v1/products/{product_id}")).json()["price"] == 12.0
+
+    await orders_api.create_order(
+        OrderCreate(farmer_id=farmer.id, items=[OrderItemCreate(product_id=product_id, quantity=2.0)]),
+        db=db_session,
+        current_user=shop,
+    )
+    # The next request would get its own session; drop the rows this one has cached
+    db_session.expire_all()
+    assert (await client.get(f"/api/v1/products/{product_id}")).json()["quantity"] == 3.0
+    assert cache.stats.misses == 5
@@ -0,0 +1,95 @@
+"""Tests for connection pool configuration and statistics."""
+
+import asyncio
+import os
+
+import pytest
+from httpx import AsyncClient
+from sqlalchemy import text
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+
+from app.core.config import get_settings
+from app.db.pool import InstrumentedAsyncQueuePool, pool_stats
+from app.db.session import create_db_engine, engine_options, get_read_db
+
+
+def _settings(**overrides):
+    return get_settings().model_copy(update=overrides)
+
+
+def test_engine_options_from_settings():
+    settings = _settings(
+        database_pool_size=7,
+        database_max_overflow=3,
+        database_pool_timeout_seconds=2.5,
+        database_pool_recycle_seconds=600,
+        database_statement_cache_size=0,
+    )
+    options = engine_options("postgresql+asyncpg://farm@db/farm", settings)
+    assert options["poolclass"] is InstrumentedAsyncQueuePool
+    assert (options["pool_size"], options["max_overflow"], options["pool_timeout"], options["pool_recycle"]) == (7, 3, 2.5, 600)
+    assert options["connect_args"] == {"prepared_statement_cache_size": 0, "statement_cache_size": 0}
+    assert options["pool_pre_ping"] is True
+
+    # In-memory SQLite keeps its single shared connection
+    assert "poolclass" not in engine_options("sqlite+aiosqlite:///:memory:", settings)
+
+
+@pytest.mark.asyncio
+async def test_pool_records_checkout_waits_and_timeouts(tmp_path):
+    engine = create_db_engine(
+        f"sqlite+aiosqlite:///{tmp_path / 'pool.db'}",
+        _settings(database_pool_size=1, database_max_overflow=0, database_pool_timeout_seconds=5),
+    )
+
+    async def hold_connection() -> None:
+        async with engine.connect() as conn:
+            await conn.execute(text("SELECT 1"))
+            await asyncio.sleep(0.1)
+
+    await asyncio.gather(hold_connection(), hold_connection())
+    stats = pool_stats(engine)
+    assert (stats["size"], stats["checked_out"]) == (1, 0)
+    waits = stats["checkout_wait_seconds"]
+    assert waits["count"] == 2
+    # The second checkout queued behind the first connection's 100 ms
+    assert waits["sum"] >= 0.09
+    assert waits["buckets"]["+Inf"] == 2
+    await engine.dispose()
+
+    engine = create_db_engine(
+        f"sqlite+aiosqlite:///{tmp_path / 'pool.db'}",
+        _settings(database_pool_size=1, database_max_overflow=0, database_pool_timeout_seconds=0.05),
+    )
+    async with engine.connect():
+        with pytest.raises(PoolTimeoutError):
+            async with engine.connect():
+                pass
+        assert pool_stats(engine)["checked_out"] == 1
+    assert pool_stats(engine)["checkout_timeouts"] == 1
+    await engine.dispose()
+
+
+@pytest.mark.asyncio
+@pytest.mark.skipif(not os.getenv("TEST_POSTGRES_URL"), reason="TEST_POSTGRES_URL is not set")
+async def test_postgresql_without_statement_cache():
+    """Statement caching can be turned off for PgBouncer in transaction mode."""
+    engine = create_db_engine(os.environ["TEST_POSTGRES_URL"], _settings(database_statement_cache_size=0))
+    async with engine.connect() as conn:
+        for value in range(3):
+            assert (await conn.execute(text("SELECT CAST(:value AS integer)"), {"value": value})).scalar() == value
+    await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_read_db_defaults_to_primary_session(db_session):
+    sessions = get_read_db(db_session)
+    assert await anext(sessions) is db_session
+    await sessions.aclose()
+
+
+@pytest.mark.asyncio
+async def test_pool_health_endpoint(client: AsyncClient):
+    response = await client.get("/health/db")
+    assert response.status_code == 200
+    assert "pool_class" in response.json()["primary"]
@@ -0,0 +1,113 @@
+"""Tests for set-based stock reservation."""
+
+import asyncio
+import random
+import uuid
+
+import pytest
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.models.product import Product, ProductCategory
+from app.models.user import User, UserRole
+from app.services.inventory import (
+    InsufficientStockError,
+    ProductNotFoundError,
+    ProductOwnershipError,
+    reserve_stock,
+)
+
+
+async def _create_farmer_with_products(session: AsyncSession, *quantities: float) -> tuple[User, list[Product]]:
+    farmer = User(phone_number=f"+99891{random.randint(0, 9999999):07d}", role=UserRole.FARMER, is_active=True)
+    session.add(farmer)
+    await session.flush()
+    products = [
+        Product(
+            farmer_id=farmer.id,
+            name=f"Product {index}",
+            category=ProductCategory.VEGETABLES,
+            price=10.0 * (index + 1),
+            quantity=quantity,
+        )
+        for index, quantity in enumerate(quantities)
+    ]
+    session.add_all(products)
+    await session.commit()
+    return farmer, products
+
+
+@pytest.mark.asyncio
+async def test_reserve_stock_decrements_all_items(db_session, query_log):
+    """All line items are validated and decremented with a fixed number of statements."""
+    farmer, products = await _create_farmer_with_products(db_session, *([100.0] * 30))
+
+    query_log.clear()
+    reserved = await reserve_stock(
+        db_session,
+        farmer_id=farmer.id,
+        items=[(product.id, 5.0) for product in products] + [(products[0].id, 1.0)],
+    )
+    await db_session.commit()
+
+    # SELECT ... FOR UPDATE + UPDATE ... RETURNING (+ COMMIT is not a cursor execute)
+    assert len(query_log) == 2
+    assert reserved[products[1].id].price == 20.0
+    assert reserved[products[0].id].quantity == 6.0
+
+    result = await db_session.execute(
+        select(Product.id, Product.quantity)
+        .where(Product.id.in_([product.id for product in products]))
+        .execution_options(populate_existing=True)
+    )
+    quantities = {row.id: float(row.quantity) for row in result}
+    assert quantities[products[0].id] == 94.0
+    assert all(quantities[product.id] == 95.0 for product in products[1:])
+
+
+@pytest.mark.asyncio
+async def test_reserve_stock_errors(db_session):
+    """Each rejection reason maps to its own error type."""
+    farmer, (product,) = await _create_farmer_with_products(db_session, 5.0)
+    other_farmer, _ = await _create_farmer_with_products(db_session)
+    farmer_id, other_farmer_id, product_id = farmer.id, other_farmer.id, product.id
+
+    with pytest.raises(InsufficientStockError, match="Insufficient quantity"):
+        await reserve_stock(db_session, farmer_id=farmer_id, items=[(product_id, 3.0), (product_id, 3.0)])
+    await db_session.rollback()
+
+    with pytest.raises(ProductOwnershipError):
+        await reserve_stock(db_session, farmer_id=other_farmer_id, items=[(product_id, 1.0)])
+    await db_session.rollback()
+
+    with pytest.raises(ProductNotFoundError):
+        await reserve_stock(db_session, farmer_id=farmer_id, items=[(product_id, 1.0), (uuid.uuid4(), 1.0)])
+    await db_session.rollback()
+
+
+@pytest.mark.asyncio
+async def test_concurrent_reservations_never_oversell(real_db_engine):
+    """Many coroutines racing on the same rows reserve exactly the available stock."""
+    session_factory = async_sessionmaker(real_db_engine, class_=AsyncSession, expire_on_commit=False)
+    async with session_factory() as session:
+        farmer, products = await _create_farmer_with_products(session, 10.0, 10.0)
+    product_ids = [product.id for product in products]
+
+    async def _order() -> bool:
+        # Alternate item order so PostgreSQL would deadlock without ordered locking
+        items = [(product_id, 1.0) for product_id in random.sample(product_ids, len(product_ids))]
+        async with session_factory() as session:
+            try:
+                await reserve_stock(session, farmer_id=farmer.id, items=items)
+            except InsufficientStockError:
+                await session.rollback()
+                return False
+            await session.commit()
+            return True
+
+    outcomes = await asyncio.gather(*[_order() for _ in range(40)])
+
+    assert sum(outcomes) == 10
+    async with session_factory() as session:
+        result = await session.execute(select(Product.quantity).where(Product.id.in_(product_ids)))
+        assert [float(quantity) for quantity in result.scalars()] == [0.0, 0.0]
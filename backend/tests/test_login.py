@@ -0,0 +1,79 @@
+"""Tests for username/password login."""
+
+import asyncio
+import time
+
+import pytest
+from httpx import AsyncClient
+
+from app.core.config import get_settings
+from app.core.security import get_password_hash, verify_password
+from app.models.user import UserRole
+
+PASSWORD = "correct horse"
+
+
+@pytest.fixture
+async def admin(user_factory):
+    return await user_factory(UserRole.ADMIN, username=f"admin{time.monotonic_ns()}", password_hash=get_password_hash(PASSWORD))
+
+
+async def _max_event_loop_lag(work) -> tuple[float, object]:
+    """Run ``work`` while a 10 ms ticker records how late the event loop wakes it up."""
+    lags: list[float] = []
+    done = asyncio.Event()
+
+    async def ticker() -> None:
+        while not done.is_set():
+            started = time.perf_counter()
+            await asyncio.sleep(0.01)
+            lags.append(time.perf_counter() - started - 0.01)
+
+    ticker_task = asyncio.create_task(ticker())
+    await asyncio.sleep(0.02)
+    try:
+        result = await work()
+    finally:
+        done.set()
+        await ticker_task
+    return max(lags), result
+
+
+@pytest.mark.asyncio
+async def test_concurrent_logins_do_not_block_event_loop(client: AsyncClient, admin):
+    """bcrypt runs off the loop: other coroutines keep running during a burst of logins."""
+
+    async def blocking_verify():
+        return verify_password(PASSWORD, admin.password_hash)
+
+    # Control: the same check run inline stalls the loop for the whole hash
+    blocked_lag, _ = await _max_event_loop_lag(blocking_verify)
+    assert blocked_lag > 0.05
+
+    async def logins():
+        return await asyncio.gather(
+            *(client.post("/api/v1/auth/login", json={"username": admin.username, "password": PASSWORD}) for _ in range(6))
+        )
+
+    lag, responses = await _max_event_loop_lag(logins)
+    assert [response.status_code for response in responses] == [200] * 6
+    assert lag < blocked_lag / 2, f"event loop stalled for {lag * 1000:.0f} ms"
+
+
+@pytest.mark.asyncio
+async def test_wrong_password_rejected(client: AsyncClient, admin):
+    response = await client.post("/api/v1/auth/login", json={"username": admin.username, "password": "wrong password"})
+    assert response.status_code == 401
+
+
+@pytest.mark.asyncio
+async def test_login_storm_beyond_queue_limit_fails_fast(client: AsyncClient, admin, monkeypatch):
+    monkeypatch.setattr(get_settings(), "password_hash_max_pending", 1)
+
+    responses = await asyncio.gather(
+        *(client.post("/api/v1/auth/login", json={"username": admin.username, "password": PASSWORD}) for _ in range(3))
+    )
+    statuses = sorted(response.status_code for response in responses)
+    assert statuses[0] == 200
+    assert 503 in statuses
+    assert all(r.headers["Retry-After"] == "1" for r in responses if r.status_code == 503)
@@ -0,0 +1,161 @@
+"""Tests for the Prometheus metrics endpoint and its instrumentation."""
+
+import json
+import os
+
+import pytest
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy import text
+
+from app.core import instrumentation
+from app.core.config import get_settings
+from app.core.metrics import Histogram, MetricsRegistry, SnapshotDirectory, merge_snapshots, render_text
+from app.main import app
+
+
+def _sample(body: str, prefix: str) -> float:
+    """Value of the first exposition line starting with ``prefix``."""
+    for line in body.splitlines():
+        if line.startswith(prefix):
+            return float(line.rsplit(" ", 1)[1])
+    raise AssertionError(f"no sample {prefix!r} in:\n{body}")
+
+
+def test_render_text_format():
+    registry = MetricsRegistry()
+    registry.describe("jobs_total", "counter", "Jobs run.")
+    registry.describe("job_seconds", "histogram", "Job duration.")
+    registry.inc("jobs_total", (("queue", 'a"b'),), 2)
+    histogram = registry.histogram("job_seconds")
+    for value in (0.002, 0.02, 20.0):
+        histogram.observe(value)
+
+    body = render_text(registry.snapshot())
+    assert "# TYPE jobs_total counter" in body
+    assert 'jobs_total{queue="a\\"b"} 2' in body
+    assert 'job_seconds_bucket{le="0.0025"} 1' in body
+    assert 'job_seconds_bucket{le="0.025"} 2' in body
+    assert 'job_seconds_bucket{le="+Inf"} 3' in body
+    assert "job_seconds_count 3" in body
+
+
+def test_snapshots_merge_across_workers(tmp_path):
+    """Every worker writes its own file; any of them can render the sum."""
+    first, second = MetricsRegistry(), MetricsRegistry()
+    for registry, requests in ((first, 3), (second, 4)):
+        registry.inc("requests_total", (("route", "/x"),), requests)
+        registry.histogram("latency_seconds").observe(0.01 * requests)
+    second.inc("requests_total", (("route", "/y"),))
+
+    # Two "processes" sharing one directory
+    (tmp_path / "101.json").write_text(json.dumps(first.snapshot()))
+    (tmp_path / "102.json").write_text(json.dumps(second.snapshot()))
+    (tmp_path / "103.json").write_text("{truncated")
+
+    merged = merge_snapshots(SnapshotDirectory(tmp_path).read_all())
+    body = render_text(merged)
+    assert _sample(body, 'requests_total{route="/x"}') == 7
+    assert _sample(body, 'requests_total{route="/y"}') == 1
+    assert _sample(body, "latency_seconds_count") == 2
+    assert _sample(body, "latency_seconds_sum") == pytest.approx(0.07)
+
+
+def test_gauges_merge_by_mode_over_live_workers(tmp_path, monkeypatch):
+    """Gauges of exited workers are dropped; a shared value is reported once, not summed."""
+    snapshots = {}
+    for pid, connections, depth in ((101, 2, 7), (102, 3, 7), (103, 5, 9)):
+        registry = MetricsRegistry()
+        registry.describe("requests_total", "counter", "Requests.")
+        registry.describe("pool_checked_out", "gauge", "Connections checked out, per worker.")
+        registry.describe("queue_depth", "gauge", "One shared queue.", merge="max")
+        registry.inc("requests_total", (), 1)
+        registry.add_collector(lambda connections=connections, depth=depth: [
+            ("pool_checked_out", (), connections),
+            ("queue_depth", (), depth),
+        ])
+        snapshots[pid] = registry.snapshot()
+        (tmp_path / f"{pid}.json").write_text(json.dumps(snapshots[pid]))
+    # 103 has exited
+    monkeypatch.setattr("app.core.metrics._pid_alive", lambda name: name != "103")
+
+    body = render_text(merge_snapshots(SnapshotDirectory(tmp_path).read_all()))
+    assert _sample(body, "requests_total") == 3
+    assert _sample(body, "pool_checked_out") == 5
+    assert _sample(body, "queue_depth") == 7
+
+    with pytest.raises(ValueError):
+        MetricsRegistry().describe("queue_depth", "gauge", "One shared queue.", merge="avg")
+
+
+def test_histogram_bucket_bounds_are_inclusive():
+    histogram = Histogram(buckets=(1.0,))
+    histogram.observe(0.5)
+    histogram.observe(1.0)
+    histogram.observe(3.0)
+    assert histogram.counts == [2, 1]
+
+
+@pytest.mark.asyncio
+async def test_request_latency_labelled_by_route_template(client: AsyncClient, test_engine):
+    instrumentation.instrument_engine(test_engine)
+    route = "/api/v1/products/{product_id}"
+    labels = f'method="GET",route="{route}",status="404"'
+    before = render_text(instrumentation.registry.snapshot())
+    seen = _sample(before, f"http_request_duration_seconds_count{{{labels}}}") if labels in before else 0
+
+    for _ in range(2):
+        response = await client.get("/api/v1/products/00000000-0000-0000-0000-000000000000")
+        assert response.status_code == 404
+    await client.get("/no/such/path")
+
+    response = await client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    body = response.text
+    # The template, not the concrete id, so label cardinality stays bounded
+    assert _sample(body, f"http_request_duration_seconds_count{{{labels}}}") == seen + 2
+    assert 'route="unmatched",status="404"' in body
+    assert _sample(body, f'db_queries_total{{route="{route}"}}') >= 2
+    assert f'db_query_duration_seconds_bucket{{route="{route}",le="+Inf"}}' in body
+
+
+@pytest.mark.asyncio
+async def test_queries_outside_requests_are_background(test_engine):
+    instrumentation.instrument_engine(test_engine)
+    before = instrumentation.registry.snapshot()["samples"].get("db_queries_total", {})
+    key = '[["route", "background"]]'
+    async with test_engine.connect() as conn:
+        await conn.execute(text("SELECT 1"))
+    after = instrumentation.registry.snapshot()["samples"]["db_queries_total"]
+    assert after[key] == before.get(key, 0) + 1
+
+
+@pytest.mark.asyncio
+async def test_metrics_endpoint_aggregates_worker_files(client: AsyncClient, tmp_path, monkeypatch):
+    monkeypatch.setattr(get_settings(), "metrics_multiproc_dir", str(tmp_path))
+    other = MetricsRegistry()
+    other.describe("http_request_duration_seconds", "histogram", "HTTP request latency.")
+    other.histogram("http_request_duration_seconds", (("method", "GET"), ("route", "/other-worker"), ("status", "200"))).observe(0.1)
+    SnapshotDirectory(tmp_path).write(other.snapshot())
+    # The helper writes under this process's pid; move it aside as another worker's file
+    (tmp_path / f"{os.getpid()}.json").rename(tmp_path / "1.json")
+
+    body = (await client.get("/metrics")).text
+    assert 'route="/other-worker"' in body
+    assert len(list(tmp_path.glob("*.json"))) == 2
+
+
+@pytest.mark.asyncio
+async def test_ops_endpoints_answer_allowed_networks_only(client: AsyncClient, monkeypatch):
+    outside = AsyncClient(transport=ASGITransport(app=app, client=("203.0.113.7", 40000)), base_url="http://test")
+    async with outside:
+        for path in ("/metrics", "/health/db"):
+            assert (await client.get(path)).status_code == 200
+            assert (await outside.get(path)).status_code == 404
+        assert (await outside.get("/health")).status_code == 200
+
+        monkeypatch.setattr(get_settings(), "ops_allowed_networks", "10.0.0.0/8, 203.0.113.0/24")
+        assert (await outside.get("/metrics")).status_code == 200
+        assert (await client.get("/metrics")).status_code == 404
+        monkeypatch.setattr(get_settings(), "ops_allowed_networks", "*")
+        assert (await outside.get("/health/db")).status_code == 200
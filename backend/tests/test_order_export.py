@@ -0,0 +1,137 @@
+"""Tests for the streaming admin order export."""
+
+import csv
+import io
+import json
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.api.v1.orders import export_orders
+from app.models.order import Order, OrderItem, OrderStatus
+from app.models.product import Product, ProductCategory
+from app.models.user import UserRole
+from app.services.order_export import ExportFormat
+
+
+async def _body(response) -> str:
+    return "".join([chunk async for chunk in response.body_iterator])
+
+
+async def _export(test_engine, admin, **params) -> str:
+    params = {
+        "export_format": ExportFormat.CSV,
+        "created_from": None,
+        "created_to": None,
+        "status_filter": None,
+        "farmer_id": None,
+        "shop_id": None,
+        **params,
+    }
+    session_factory = async_sessionmaker(test_engine, class_=AsyncSession, expire_on_commit=False)
+    response = await export_orders(**params, session_factory=session_factory, current_user=admin)
+    return await _body(response)
+
+
+@pytest.fixture
+async def orders(db_session, user_factory):
+    """Three orders a day apart: two items, one item, and none."""
+    farmer = await user_factory(UserRole.FARMER)
+    shop = await user_factory(UserRole.SHOP)
+    product = Product(farmer_id=farmer.id, name='Apples, "Gala"', category=ProductCategory.FRUITS, price=2.5, quantity=10)
+    db_session.add(product)
+    await db_session.flush()
+    start = datetime(2030, 1, 1)
+    created = []
+    for day, item_count in enumerate((2, 1, 0)):
+        order = Order(
+            shop_id=shop.id,
+            farmer_id=farmer.id,
+            status=OrderStatus.DELIVERED if day else OrderStatus.PENDING,
+            total_amount=2.5 * item_count,
+            created_at=start + timedelta(days=day),
+            items=[OrderItem(product_id=product.id, quantity=1, price=2.5) for _ in range(item_count)],
+        )
+        db_session.add(order)
+        created.append(order)
+    await db_session.commit()
+    return farmer, start, created
+
+
+@pytest.mark.asyncio
+async def test_export_csv_one_line_per_item(test_engine, user_factory, orders):
+    farmer, start, created = orders
+    admin = await user_factory(UserRole.ADMIN)
+
+    body = await _export(test_engine, admin, farmer_id=farmer.id, created_from=start, created_to=start + timedelta(days=3))
+
+    rows = list(csv.DictReader(io.StringIO(body)))
+    assert [row["order_id"] for row in rows] == [str(created[0].id)] * 2 + [str(created[1].id), str(created[2].id)]
+    assert rows[0]["product_name"] == 'Apples, "Gala"' and rows[0]["price"] == "2.50"
+    assert rows[3]["item_id"] == "" and rows[3]["status"] == "delivered"
+
+
+@pytest.mark.asyncio
+async def test_export_csv_escapes_formulas(test_engine, db_session, user_factory):
+    farmer = await user_factory(UserRole.FARMER)
+    shop = await user_factory(UserRole.SHOP)
+    admin = await user_factory(UserRole.ADMIN)
+    product = Product(farmer_id=farmer.id, name="=HYPERLINK(\"http://x\")", category=ProductCategory.FRUITS, price=1, quantity=1)
+    db_session.add(product)
+    await db_session.flush()
+    order = Order(
+        shop_id=shop.id,
+        farmer_id=farmer.id,
+        total_amount=1,
+        delivery_address="@SUM(A1)",
+        notes="\tcmd",
+        items=[OrderItem(product_id=product.id, quantity=1, price=1)],
+    )
+    db_session.add(order)
+    await db_session.commit()
+
+    body = await _export(test_engine, admin, farmer_id=farmer.id)
+
+    [row] = csv.DictReader(io.StringIO(body))
+    assert row["product_name"] == "'=HYPERLINK(\"http://x\")"
+    assert row["delivery_address"] == "'@SUM(A1)" and row["notes"] == "'\tcmd"
+    assert row["total_amount"] == "1.00"
+    # NDJSON is not opened in spreadsheets and keeps the text as is
+    [line] = (await _export(test_engine, admin, farmer_id=farmer.id, export_format=ExportFormat.NDJSON)).splitlines()
+    assert json.loads(line)["notes"] == "\tcmd"
+
+
+@pytest.mark.asyncio
+async def test_export_ndjson_nests_items_and_filters(test_engine, user_factory, orders):
+    farmer, start, created = orders
+    admin = await user_factory(UserRole.ADMIN)
+
+    body = await _export(
+        test_engine,
+        admin,
+        export_format=ExportFormat.NDJSON,
+        farmer_id=farmer.id,
+        status_filter=OrderStatus.DELIVERED,
+        created_to=start + timedelta(days=2),
+    )
+
+    lines = [json.loads(line) for line in body.splitlines()]
+    assert [line["order_id"] for line in lines] == [str(created[1].id)]
+    assert lines[0]["total_amount"] == 2.5 and len(lines[0]["items"]) == 1
+
+
+@pytest.mark.asyncio
+async def test_export_requires_admin_and_valid_range(test_engine, user_factory):
+    shop = await user_factory(UserRole.SHOP)
+    admin = await user_factory(UserRole.ADMIN)
+
+    with pytest.raises(HTTPException) as exc_info:
+        await _export(test_engine, shop)
+    assert exc_info.value.status_code == 403
+
+    now = datetime.utcnow()
+    with pytest.raises(HTTPException) as exc_info:
+        await _export(test_engine, admin, created_from=now, created_to=now)
+    assert exc_info.value.status_code == 400
@@ -218,3 +218,53 @@ async def test_update_order_invalid_status_transition(
     # Should fail or be ignored
     assert response.status_code in [400, 200]  # Either validation error or no-op
 
+
+
+@pytest.mark.asyncio
+async def test_list_orders_loads_items_in_constant_queries(db_session, user_factory, query_log):
+    """Items for a whole page must be loaded in a fixed number of queries, not one per order."""
+    from app.api.v1.orders import list_orders
+    from app.models.order import Order, OrderItem, OrderStatus
+    from app.models.product import Product, ProductCategory
+    from app.models.user import UserRole
+
+    admin = await user_factory(UserRole.ADMIN)
+    farmer = await user_factory(UserRole.FARMER)
+    shop = await user_factory(UserRole.SHOP)
+    product = Product(
+        farmer_id=farmer.id,
+        name="Carrots",
+        category=ProductCategory.VEGETABLES,
+        price=10.0,
+        quantity=1000.0,
+    )
+    db_session.add(product)
+    await db_session.flush()
+    for _ in range(30):
+        order = Order(shop_id=shop.id, farmer_id=farmer.id, status=OrderStatus.PENDING, total_amount=20.0)
+        order.items = [
+            OrderItem(product_id=product.id, quantity=1.0, price=10.0),
+            OrderItem(product_id=product.id, quantity=1.0, price=10.0),
+        ]
+        db_session.add(order)
+    await db_session.commit()
+    db_session.expunge_all()
+
+    query_log.clear()
+    response = await list_orders(
+        status_filter=None,
+        farmer_id=farmer.id,
+        shop_id=None,
+        limit=100,
+        offset=0,
+        cursor=None,
+        count=None,
+        db=db_session,
+        current_user=admin,
+    )
+
+    assert response.total == 30
+    assert len(response.items) == 30
+    assert all(len(order.items) == 2 for order in response.items)
+    # COUNT + page of orders + one batched load of their items
+    assert len(query_log) == 3
@@ -0,0 +1,122 @@
+"""Tests for the OTP stores."""
+
+import asyncio
+
+import pytest
+from fakeredis import FakeAsyncRedis
+from sqlalchemy import func, select
+
+from app.models.otp import PhoneOTP
+from app.services.otp import (
+    DatabaseOTPStore,
+    OTPAttemptsExceededError,
+    OTPCooldownError,
+    OTPInvalidError,
+    OTPNotFoundError,
+    RedisOTPStore,
+)
+
+LIMITS = {"ttl_seconds": 300, "resend_interval_seconds": 60, "max_attempts": 3}
+
+
+@pytest.fixture(params=["redis", "database"])
+def store(request, db_session):
+    if request.param == "redis":
+        return RedisOTPStore(FakeAsyncRedis(), **LIMITS)
+    return DatabaseOTPStore(db_session, **LIMITS)
+
+
+@pytest.mark.asyncio
+async def test_issue_verify_discard(store):
+    phone = "+998907770001"
+    with pytest.raises(OTPNotFoundError):
+        await store.verify(phone, "123456")
+
+    await store.issue(phone, "123456")
+    with pytest.raises(OTPCooldownError) as exc_info:
+        await store.issue(phone, "654321")
+    assert 0 < exc_info.value.retry_after <= 60
+
+    with pytest.raises(OTPInvalidError):
+        await store.verify(phone, "000000")
+    await store.verify(phone, "123456")
+
+    await store.discard(phone)
+    with pytest.raises(OTPNotFoundError):
+        await store.verify(phone, "123456")
+
+
+@pytest.mark.asyncio
+async def test_attempt_limit_holds_under_concurrent_guesses(store):
+    phone = "+998907770002"
+    await store.issue(phone, "123456")
+
+    if isinstance(store, DatabaseOTPStore):
+        # One session cannot run statements concurrently
+        results = [await _guess(store, phone, f"{index:06d}") for index in range(6)]
+    else:
+        results = await asyncio.gather(*(_guess(store, phone, f"{index:06d}") for index in range(6)))
+    assert sorted(type(error).__name__ for error in results) == ["OTPAttemptsExceededError"] * 3 + ["OTPInvalidError"] * 3
+
+    with pytest.raises(OTPAttemptsExceededError):
+        await store.verify(phone, "123456")
+
+
+async def _guess(store, phone: str, code: str) -> Exception:
+    try:
+        await store.verify(phone, code)
+    except (OTPInvalidError, OTPAttemptsExceededError) as exc:
+        return exc
+    raise AssertionError("guess was accepted")
+
+
+@pytest.mark.asyncio
+async def test_redis_keys_expire():
+    redis = FakeAsyncRedis()
+    store = RedisOTPStore(redis, **LIMITS)
+    await store.issue("+998907770003", "123456")
+    assert 0 < await redis.ttl(store.code_key("+998907770003")) <= 300
+    assert 0 < await redis.ttl(store.cooldown_key("+998907770003")) <= 60
+
+    # Guessing a number without a code must not leave a key behind forever
+    with pytest.raises(OTPNotFoundError):
+        await store.verify("+998907770004", "123456")
+    assert await redis.ttl(store.code_key("+998907770004")) > 0
+
+
+@pytest.mark.asyncio
+async def test_failed_issue_does_not_start_cooldown():
+    class BrokenRedis(FakeAsyncRedis):
+        fail = True
+
+        async def evalsha(self, *args, **kwargs):
+            if self.fail:
+                raise ConnectionError("connection reset")
+            return await super().evalsha(*args, **kwargs)
+
+    redis = BrokenRedis()
+    store = RedisOTPStore(redis, **LIMITS)
+    with pytest.raises(ConnectionError):
+        await store.issue("+998907770005", "123456")
+    assert not await redis.exists(store.cooldown_key("+998907770005"))
+
+    # The retry is not locked out and gets a working code
+    redis.fail = False
+    await store.issue("+998907770005", "654321")
+    await store.verify("+998907770005", "654321")
+    with pytest.raises(OTPCooldownError) as exc_info:
+        await store.issue("+998907770005", "111111")
+    assert 0 < exc_info.value.retry_after <= 60
+
+
+@pytest.mark.asyncio
+async def test_database_store_keeps_one_row_per_number(db_session):
+    store = DatabaseOTPStore(db_session, **{**LIMITS, "resend_interval_seconds": 0})
+    for code in ("111111", "222222", "333333"):
+        await store.issue("+998907770005", code)
+
+    count = await db_session.scalar(
+        select(func.count()).select_from(PhoneOTP).where(PhoneOTP.phone_number == "+998907770005")
+    )
+    assert count == 1
+    await store.verify("+998907770005", "333333")
@@ -0,0 +1,151 @@
+"""Tests for the transactional outbox and its relay."""
+
+import json
+import uuid
+from datetime import timedelta
+
+import pytest
+from fakeredis import FakeAsyncRedis
+from httpx import AsyncClient
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from app.core.security import create_token
+from app.models.delivery import Delivery
+from app.models.order import Order, OrderStatus
+from app.models.outbox import OutboxEvent
+from app.models.product import Product, ProductCategory
+from app.models.transaction import PaymentProvider, Transaction, TransactionStatus
+from app.models.user import UserRole
+from app.services.outbox import EventType, MemoryEventPublisher, OutboxRelay, RedisStreamPublisher, record_event
+from app.services.payments.transitions import apply_transaction_statuses
+
+
+def _headers(user_id) -> dict[str, str]:
+    return {"Authorization": f"Bearer {create_token(subject=str(user_id), expires_delta=timedelta(minutes=5))}"}
+
+
+async def _events(db_session, aggregate_id) -> list[OutboxEvent]:
+    stmt = select(OutboxEvent).where(OutboxEvent.aggregate_id == aggregate_id).execution_options(populate_existing=True)
+    return (await db_session.execute(stmt)).scalars().all()
+
+
+@pytest.fixture
+def sessionmaker(test_engine):
+    return async_sessionmaker(test_engine, expire_on_commit=False)
+
+
+@pytest.fixture
+async def no_unpublished_events(sessionmaker):
+    """The test database is shared; publish events recorded by earlier tests."""
+    await OutboxRelay(sessionmaker, MemoryEventPublisher(), batch_size=10_000).drain()
+
+
+class FlakyPublisher(MemoryEventPublisher):
+    def __init__(self, failures: int) -> None:
+        super().__init__()
+        self.failures = failures
+
+    async def publish(self, events):
+        if self.failures:
+            self.failures -= 1
+            raise ConnectionError("broker unavailable")
+        await super().publish(events)
+
+
+@pytest.mark.asyncio
+async def test_order_and_delivery_changes_write_events(client: AsyncClient, db_session, user_factory):
+    shop = await user_factory(UserRole.SHOP)
+    farmer = await user_factory(UserRole.FARMER)
+    admin = await user_factory(UserRole.ADMIN)
+    product = Product(farmer_id=farmer.id, name="Carrots", category=ProductCategory.VEGETABLES, price=10.0, quantity=50)
+    db_session.add(product)
+    await db_session.commit()
+
+    response = await client.post(
+        "/api/v1/orders",
+        json={"farmer_id": str(farmer.id), "items": [{"product_id": str(product.id), "quantity": 3}]},
+        headers=_headers(shop.id),
+    )
+    assert response.status_code == 201
+    order_id = response.json()["id"]
+
+    [created] = await _events(db_session, uuid.UUID(order_id))
+    assert created.event_type == EventType.ORDER_CREATED and created.published_at is None
+    payload = json.loads(created.payload)
+    assert payload["total_amount"] == 30.0
+    assert payload["items"] == [{"product_id": str(product.id), "quantity": 3.0}]
+
+    delivery = Delivery(order_id=created.aggregate_id, delivery_address="Market 1")
+    db_session.add(delivery)
+    await db_session.commit()
+    for _ in range(2):
+        response = await client.patch(
+            f"/api/v1/deliveries/order/{order_id}", json={"status": "delivered"}, headers=_headers(admin.id)
+        )
+        assert response.status_code == 200
+    # Only the transition to delivered is an event
+    [delivered] = await _events(db_session, delivery.id)
+    assert delivered.event_type == EventType.DELIVERY_DELIVERED
+    assert json.loads(delivered.payload)["order_id"] == order_id
+
+
+@pytest.mark.asyncio
+async def test_payment_completion_writes_one_event(db_session, user_factory):
+    shop = await user_factory(UserRole.SHOP)
+    farmer = await user_factory(UserRole.FARMER)
+    order = Order(shop_id=shop.id, farmer_id=farmer.id, total_amount=100)
+    db_session.add(order)
+    await db_session.flush()
+    transaction = Transaction(order_id=order.id, amount=100, provider=PaymentProvider.CLICK)
+    db_session.add(transaction)
+    await db_session.commit()
+
+    for _ in range(2):
+        await apply_transaction_statuses(db_session, {transaction.id: TransactionStatus.COMPLETED})
+        await db_session.commit()
+
+    [event] = await _events(db_session, transaction.id)
+    assert event.event_type == EventType.PAYMENT_COMPLETED
+    assert json.loads(event.payload) == {"order_id": str(order.id), "amount": 100.0, "provider": "click"}
+    assert await db_session.scalar(select(Order.status).where(Order.id == order.id)) == OrderStatus.CONFIRMED
+
+
+@pytest.mark.asyncio
+async def test_relay_publishes_in_batches_and_retries(db_session, sessionmaker, user_factory, no_unpublished_events):
+    user = await user_factory(UserRole.SHOP)
+    events = [record_event(db_session, EventType.ORDER_CREATED, user.id, number=number) for number in range(5)]
+    await db_session.commit()
+
+    publisher = FlakyPublisher(failures=1)
+    relay = OutboxRelay(sessionmaker, publisher, batch_size=2)
+    # A failed publish leaves the batch unpublished for the next pass
+    with pytest.raises(ConnectionError):
+        await relay.run_once()
+    assert len(publisher.messages) == 0
+
+    assert await relay.drain() == 5
+    assert [message["id"] for message in publisher.messages] == [str(event.id) for event in events]
+    assert json.loads(publisher.messages[0]["payload"]) == {"number": 0}
+    assert relay.lag_seconds == 0.0
+    assert all(event.published_at is not None for event in await _events(db_session, user.id))
+    assert await relay.drain() == 0
+
+    # Past the retention published events are purged
+    relay.retention = timedelta(seconds=-1)
+    assert await relay.purge() >= 5
+    assert await db_session.scalar(select(func.count()).select_from(OutboxEvent).where(OutboxEvent.aggregate_id == user.id)) == 0
+
+
+@pytest.mark.asyncio
+async def test_redis_stream_publisher(db_session, sessionmaker, user_factory, no_unpublished_events):
+    user = await user_factory(UserRole.FARMER)
+    event = record_event(db_session, EventType.DELIVERY_DELIVERED, user.id)
+    await db_session.commit()
+
+    redis = FakeAsyncRedis()
+    relay = OutboxRelay(sessionmaker, RedisStreamPublisher(redis, stream="test:outbox", maxlen=10))
+    assert await relay.drain() == 1
+    [(_, fields)] = await redis.xrange("test:outbox")
+    assert fields[b"id"] == str(event.id).encode()
+    assert fields[b"type"] == b"delivery.delivered"
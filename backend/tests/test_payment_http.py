@@ -0,0 +1,103 @@
+"""Tests for the pooled payment provider HTTP clients."""
+
+import json
+from types import SimpleNamespace
+
+import httpx
+import pytest
+
+from app.core.config import get_settings
+from app.core.instrumentation import registry
+from app.models.transaction import PaymentProvider
+from app.services.payments import base
+from app.services.payments.factory import get_payment_adapter
+from app.services.payments.http import close_provider_clients, create_provider_client
+from app.services.payments.payme import PaymeAdapter, PaymeError
+
+
+def _count(provider: PaymentProvider, outcome: str) -> int:
+    return registry.histogram(
+        "payment_provider_request_seconds", (("provider", provider.value), ("outcome", outcome))
+    ).count
+
+
+@pytest.mark.asyncio
+async def test_adapters_and_clients_are_shared():
+    adapter = get_payment_adapter(PaymentProvider.CLICK)
+    assert get_payment_adapter(PaymentProvider.CLICK) is adapter
+
+    client = adapter.http
+    assert adapter.http is client
+    assert str(client.base_url).startswith(adapter.base_url)
+    assert get_payment_adapter(PaymentProvider.PAYME).http is not client
+    assert client.timeout.connect == 3.0 and client.timeout.pool == 5.0
+
+    await close_provider_clients()
+    assert client.is_closed
+    assert not adapter.http.is_closed
+    await close_provider_clients()
+
+
+@pytest.mark.asyncio
+async def test_provider_latency_is_recorded():
+    def handler(request: httpx.Request) -> httpx.Response:
+        if request.url.path == "/down":
+            raise httpx.ConnectTimeout("timed out", request=request)
+        return httpx.Response(200 if request.url.path == "/ok" else 503, json={})
+
+    provider = PaymentProvider.ARCA
+    before = {outcome: _count(provider, outcome) for outcome in ("2xx", "5xx", "error")}
+    async with create_provider_client(provider, "https://arca.test", transport=httpx.MockTransport(handler)) as client:
+        assert (await client.get("/ok")).status_code == 200
+        assert (await client.get("/busy")).status_code == 503
+        with pytest.raises(httpx.ConnectTimeout):
+            await client.get("/down")
+
+    assert {outcome: _count(provider, outcome) - before[outcome] for outcome in before} == {"2xx": 1, "5xx": 1, "error": 1}
+
+
+@pytest.mark.asyncio
+async def test_payme_calls_go_through_the_pooled_client(monkeypatch):
+    calls = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        body = json.loads(request.content)
+        calls.append((request.url.path, request.headers["X-Auth"], body["method"]))
+        if body["method"] == "receipts.create":
+            assert body["params"] == {"amount": 1250, "account": {"order_id": "order-1"}}
+            return httpx.Response(200, json={"result": {"receipt": {"_id": "r1", "state": 0}}})
+        return httpx.Response(200, json={"result": {"receipt": {"_id": body["params"]["id"], "state": 4, "amount": 1250}}})
+
+    settings = get_settings()
+    monkeypatch.setattr(settings, "payment_mock_mode", False)
+    monkeypatch.setattr(settings, "sms_provider", "eskiz")
+    monkeypatch.setattr(settings, "payme_merchant_id", "merchant")
+    monkeypatch.setattr(settings, "payme_key", "secret")
+    adapter = PaymeAdapter()
+    client = create_provider_client(adapter.provider, adapter.base_url, transport=httpx.MockTransport(handler))
+    monkeypatch.setattr(base, "get_provider_client", lambda provider, base_url: client)
+
+    before = _count(PaymentProvider.PAYME, "2xx")
+    created = await adapter.create_payment(SimpleNamespace(id="t1"), 12.5, "order-1")
+    assert created["external_id"] == "r1" and created["payment_url"] == "https://checkout.paycom.uz/r1"
+    assert await adapter.verify_payment("r1") == {"status": "completed", "amount": 12.5, "external_id": "r1"}
+
+    assert calls == [("/api", "merchant:secret", "receipts.create"), ("/api", "merchant:secret", "receipts.get")]
+    assert _count(PaymentProvider.PAYME, "2xx") - before == 2
+    await client.aclose()
+
+
+@pytest.mark.asyncio
+async def test_payme_errors_are_raised(monkeypatch):
+    def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(200, json={"error": {"code": -31050, "message": "Receipt not found"}})
+
+    monkeypatch.setattr(get_settings(), "payment_mock_mode", False)
+    monkeypatch.setattr(get_settings(), "sms_provider", "eskiz")
+    adapter = PaymeAdapter()
+    client = create_provider_client(adapter.provider, adapter.base_url, transport=httpx.MockTransport(handler))
+    monkeypatch.setattr(base, "get_provider_client", lambda provider, base_url: client)
+
+    with pytest.raises(PaymeError, match="Receipt not found"):
+        await adapter.verify_payment("missing")
+    await client.aclose()
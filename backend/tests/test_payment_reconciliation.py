@@ -0,0 +1,168 @@
+"""Tests for reconciliation of stale pending payments."""
+
+import asyncio
+import json
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from app.models.order import Order, OrderStatus
+from app.models.transaction import PaymentProvider, Transaction, TransactionStatus
+from app.models.user import UserRole
+from app.services.payments.mock import MockAdapter
+from app.services.payments.reconciliation import PaymentReconciler
+from app.services.payments.webhooks import process_webhook_events, store_webhook_event
+
+
+class VerifyAdapter(MockAdapter):
+    """Answers verify_payment from a table of external ids and records the peak concurrency."""
+
+    def __init__(self, statuses: dict[str, str]) -> None:
+        super().__init__()
+        self.statuses = statuses
+        self.calls = 0
+        self.active = 0
+        self.peak = 0
+
+    async def verify_payment(self, external_id, **kwargs):
+        self.calls += 1
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        try:
+            await asyncio.sleep(0.01)
+            status = self.statuses.get(external_id, "pending")
+            if status == "error":
+                raise RuntimeError("provider unavailable")
+            return {"status": status, "external_id": external_id}
+        finally:
+            self.active -= 1
+
+
+class WebhookAdapter(MockAdapter):
+    """Identifies payments by the payload's external id, like the real providers."""
+
+    async def process_webhook(self, payload):
+        return {"external_id": payload.get("external_id"), "status": payload.get("status", "completed")}
+
+
+@pytest.fixture
+def sessionmaker(test_engine):
+    return async_sessionmaker(test_engine, expire_on_commit=False)
+
+
+@pytest.fixture
+async def no_stale_pending(db_session):
+    """The test database is shared; move stale pending payments of earlier tests out of the way."""
+    await db_session.execute(
+        update(Transaction)
+        .where(Transaction.status == TransactionStatus.PENDING, Transaction.created_at < datetime.utcnow())
+        .values(status=TransactionStatus.CANCELLED)
+    )
+    await db_session.commit()
+
+
+async def _pending(db_session, user_factory, external_id: str, age: timedelta):
+    shop = await user_factory(UserRole.SHOP)
+    farmer = await user_factory(UserRole.FARMER)
+    order = Order(shop_id=shop.id, farmer_id=farmer.id, total_amount=100)
+    db_session.add(order)
+    await db_session.flush()
+    created_at = datetime.utcnow() - age
+    transaction = Transaction(
+        order_id=order.id,
+        amount=100,
+        provider=PaymentProvider.PAYME,
+        external_id=external_id,
+        created_at=created_at,
+        updated_at=created_at,
+    )
+    db_session.add(transaction)
+    await db_session.commit()
+    return order.id, transaction.id
+
+
+async def _status(db_session, model, row_id):
+    return await db_session.scalar(select(model.status).where(model.id == row_id).execution_options(populate_existing=True))
+
+
+@pytest.mark.asyncio
+async def test_reconciliation_applies_provider_statuses(db_session, sessionmaker, user_factory, no_stale_pending):
+    prefix = uuid.uuid4().hex
+    statuses = {f"{prefix}-paid": "completed", f"{prefix}-declined": "failed", f"{prefix}-down": "error"}
+    stale = timedelta(minutes=30)
+    paid = await _pending(db_session, user_factory, f"{prefix}-paid", stale)
+    declined = await _pending(db_session, user_factory, f"{prefix}-declined", stale)
+    down = await _pending(db_session, user_factory, f"{prefix}-down", stale)
+    waiting = await _pending(db_session, user_factory, f"{prefix}-waiting", stale)
+    abandoned = await _pending(db_session, user_factory, f"{prefix}-abandoned", timedelta(days=2))
+    fresh = await _pending(db_session, user_factory, f"{prefix}-paid-fresh", timedelta(minutes=1))
+
+    adapter = VerifyAdapter(statuses)
+    reconciler = PaymentReconciler(
+        sessionmaker,
+        stale_after=timedelta(minutes=15),
+        expire_after=timedelta(days=1),
+        batch_size=2,
+        adapter_for=lambda provider: adapter,
+    )
+    report = await reconciler.run_once()
+
+    # Every stale row is visited once across the keyset batches; the fresh one is left alone
+    assert report.checked == adapter.calls == 5
+    assert report.errors == 1
+    assert report.updated == {"completed": 1, "failed": 1, "cancelled": 1}
+    assert await _status(db_session, Transaction, paid[1]) == TransactionStatus.COMPLETED
+    assert await _status(db_session, Order, paid[0]) == OrderStatus.CONFIRMED
+    assert await _status(db_session, Transaction, declined[1]) == TransactionStatus.FAILED
+    assert await _status(db_session, Transaction, down[1]) == TransactionStatus.PENDING
+    assert await _status(db_session, Transaction, waiting[1]) == TransactionStatus.PENDING
+    assert await _status(db_session, Transaction, abandoned[1]) == TransactionStatus.CANCELLED
+    assert await _status(db_session, Transaction, fresh[1]) == TransactionStatus.PENDING
+    assert 30 * 60 <= report.lag_seconds < 31 * 60
+    assert reconciler.last_report is report
+
+
+@pytest.mark.asyncio
+async def test_reconciliation_bounds_provider_concurrency(db_session, sessionmaker, user_factory, no_stale_pending):
+    for _ in range(8):
+        await _pending(db_session, user_factory, f"ext-{uuid.uuid4()}", timedelta(hours=1))
+
+    adapter = VerifyAdapter({})
+    reconciler = PaymentReconciler(
+        sessionmaker,
+        stale_after=timedelta(minutes=15),
+        batch_size=100,
+        concurrency=3,
+        adapter_for=lambda provider: adapter,
+    )
+    report = await reconciler.run_once()
+    assert report.checked == 8 and report.updated == {}
+    assert 1 < adapter.peak <= 3
+
+
+@pytest.mark.asyncio
+async def test_expired_payment_paid_later_is_completed(db_session, sessionmaker, user_factory, no_stale_pending):
+    external_id = f"late-{uuid.uuid4()}"
+    order_id, transaction_id = await _pending(db_session, user_factory, external_id, timedelta(days=2))
+    reconciler = PaymentReconciler(
+        sessionmaker,
+        stale_after=timedelta(minutes=15),
+        expire_after=timedelta(days=1),
+        adapter_for=lambda provider: VerifyAdapter({}),
+    )
+    assert (await reconciler.run_once()).updated == {"cancelled": 1}
+    assert await _status(db_session, Transaction, transaction_id) == TransactionStatus.CANCELLED
+
+    # The receipt was never cancelled at the provider and the customer paid it
+    await store_webhook_event(
+        db_session, PaymentProvider.PAYME, json.dumps({"external_id": external_id, "status": "completed"}).encode()
+    )
+    await db_session.commit()
+    async with sessionmaker() as session:
+        result = await process_webhook_events(session, limit=100_000, adapter_for=lambda provider: WebhookAdapter())
+    assert result.processed >= 1
+    assert await _status(db_session, Transaction, transaction_id) == TransactionStatus.COMPLETED
+    assert await _status(db_session, Order, order_id) == OrderStatus.CONFIRMED
@@ -0,0 +1,158 @@
+"""Tests for durable payment webhook processing."""
+
+import json
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+from httpx import AsyncClient
+from sqlalchemy import func, select
+
+from app.models.order import Order, OrderStatus
+from app.models.payment_webhook import PaymentWebhookEvent, WebhookEventStatus
+from app.models.transaction import PaymentProvider, Transaction, TransactionStatus
+from app.models.user import UserRole
+from app.services.payments.mock import MockAdapter
+from app.services.payments.webhooks import process_webhook_events, requeue_webhook_events, store_webhook_event
+
+
+def _mock_adapter(provider: PaymentProvider) -> MockAdapter:
+    return MockAdapter()
+
+
+class StatusAdapter(MockAdapter):
+    """Reports the payload's own status and identifies payments by external id."""
+
+    async def process_webhook(self, payload):
+        if payload.get("broken"):
+            raise KeyError("params")
+        return {"external_id": payload["external_id"], "status": payload["status"]}
+
+
+@pytest.fixture
+async def no_pending_events(db_session):
+    """The test database is shared; apply events left received by earlier tests."""
+    await process_webhook_events(db_session, limit=100_000, adapter_for=_mock_adapter)
+
+
+async def _order_with_transaction(
+    db_session, user_factory, external_id: str | None = None, provider: PaymentProvider = PaymentProvider.PAYME
+):
+    shop = await user_factory(UserRole.SHOP)
+    farmer = await user_factory(UserRole.FARMER)
+    order = Order(shop_id=shop.id, farmer_id=farmer.id, total_amount=100)
+    db_session.add(order)
+    await db_session.flush()
+    transaction = Transaction(order_id=order.id, amount=100, provider=provider, external_id=external_id)
+    db_session.add(transaction)
+    await db_session.commit()
+    return order.id, transaction.id
+
+
+async def _store(db_session, payload: dict, provider=PaymentProvider.PAYME) -> bool:
+    stored = await store_webhook_event(db_session, provider, json.dumps(payload).encode())
+    await db_session.commit()
+    return stored
+
+
+async def _status(db_session, model, row_id):
+    return await db_session.scalar(select(model.status).where(model.id == row_id))
+
+
+@pytest.mark.asyncio
+async def test_intake_stores_each_event_once(client: AsyncClient, db_session):
+    body = {"event_id": f"evt-{uuid.uuid4()}", "transaction_id": str(uuid.uuid4())}
+    for _ in range(3):
+        response = await client.post("/api/v1/payments/webhooks/click", json=body)
+        assert response.status_code == 200
+        assert response.json() == {"status": "ok"}
+
+    count = await db_session.scalar(
+        select(func.count()).select_from(PaymentWebhookEvent).where(PaymentWebhookEvent.event_key == f"event:{body['event_id']}")
+    )
+    assert count == 1
+
+    response = await client.post("/api/v1/payments/webhooks/click", content=b"[1, 2]")
+    assert response.status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_batch_applies_transitions_once(db_session, user_factory, no_pending_events):
+    order_id, transaction_id = await _order_with_transaction(db_session, user_factory)
+    # Distinct deliveries for one payment; the completed one wins regardless of order
+    assert await _store(db_session, {"transaction_id": str(transaction_id), "attempt": 1})
+    assert await _store(db_session, {"transaction_id": str(transaction_id), "attempt": 2})
+    assert not await _store(db_session, {"transaction_id": str(transaction_id), "attempt": 2})
+    await _store(db_session, {"transaction_id": str(uuid.uuid4())})
+
+    result = await process_webhook_events(db_session, limit=1000, adapter_for=_mock_adapter)
+    assert (result.processed, result.ignored, result.failed) == (2, 1, 0)
+    assert await _status(db_session, Transaction, transaction_id) == TransactionStatus.COMPLETED
+    assert await _status(db_session, Order, order_id) == OrderStatus.CONFIRMED
+
+    # Nothing left to process
+    assert (await process_webhook_events(db_session, adapter_for=_mock_adapter)).total == 0
+
+
+@pytest.mark.asyncio
+async def test_late_failure_does_not_undo_completion(db_session, user_factory, no_pending_events):
+    external_id = f"ext-{uuid.uuid4()}"
+    order_id, transaction_id = await _order_with_transaction(db_session, user_factory, external_id=external_id)
+    adapter = StatusAdapter()
+
+    await _store(db_session, {"external_id": external_id, "status": "failed"})
+    await process_webhook_events(db_session, limit=1000, adapter_for=lambda provider: adapter)
+    assert await _status(db_session, Transaction, transaction_id) == TransactionStatus.FAILED
+    assert await _status(db_session, Order, order_id) == OrderStatus.PENDING
+
+    await _store(db_session, {"external_id": external_id, "status": "completed"})
+    await _store(db_session, {"external_id": external_id, "status": "failed", "retry": True})
+    await _store(db_session, {"broken": True})
+    result = await process_webhook_events(db_session, limit=1000, adapter_for=lambda provider: adapter)
+    assert (result.processed, result.failed) == (2, 1)
+    assert await _status(db_session, Transaction, transaction_id) == TransactionStatus.COMPLETED
+    assert await _status(db_session, Order, order_id) == OrderStatus.CONFIRMED
+
+
+@pytest.mark.asyncio
+async def test_external_ids_match_within_the_provider(db_session, user_factory, no_pending_events):
+    # Providers number their payments independently, so the same id can belong to two of them
+    external_id = f"ext-{uuid.uuid4()}"
+    _, payme_id = await _order_with_transaction(db_session, user_factory, external_id=external_id)
+    _, click_id = await _order_with_transaction(db_session, user_factory, external_id, PaymentProvider.CLICK)
+    adapter = StatusAdapter()
+
+    await _store(db_session, {"external_id": external_id, "status": "completed"}, provider=PaymentProvider.CLICK)
+    await _store(db_session, {"external_id": external_id, "status": "failed"}, provider=PaymentProvider.PAYME)
+    await _store(db_session, {"external_id": external_id, "status": "completed"}, provider=PaymentProvider.ARCA)
+    result = await process_webhook_events(db_session, limit=1000, adapter_for=lambda provider: adapter)
+    assert (result.processed, result.ignored) == (2, 1)
+    assert await _status(db_session, Transaction, click_id) == TransactionStatus.COMPLETED
+    assert await _status(db_session, Transaction, payme_id) == TransactionStatus.FAILED
+
+
+@pytest.mark.asyncio
+async def test_replay_window(db_session, user_factory, no_pending_events):
+    started = datetime.utcnow() - timedelta(seconds=1)
+    missing_id = uuid.uuid4()
+    await _store(db_session, {"transaction_id": str(missing_id)}, provider=PaymentProvider.ARCA)
+    await process_webhook_events(db_session, limit=1000, adapter_for=_mock_adapter)
+
+    # The transaction shows up later (e.g. the webhook raced the init request); replay picks it up
+    order_id, _ = await _order_with_transaction(db_session, user_factory)
+    db_session.add(Transaction(id=missing_id, order_id=order_id, amount=100, provider=PaymentProvider.ARCA))
+    await db_session.commit()
+
+    assert await requeue_webhook_events(
+        db_session, received_from=started - timedelta(days=1), received_to=started, provider=PaymentProvider.ARCA
+    ) == 0
+    requeued = await requeue_webhook_events(
+        db_session, received_from=started, received_to=datetime.utcnow() + timedelta(seconds=1), provider=PaymentProvider.ARCA
+    )
+    assert requeued >= 1
+    await db_session.commit()
+
+    await process_webhook_events(db_session, limit=1000, adapter_for=_mock_adapter)
+    assert await _status(db_session, Transaction, missing_id) == TransactionStatus.COMPLETED
+    event = await db_session.scalar(select(PaymentWebhookEvent).where(PaymentWebhookEvent.payload.contains(str(missing_id))))
+    assert event.status == WebhookEventStatus.PROCESSED and event.attempts == 2
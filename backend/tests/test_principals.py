@@ -0,0 +1,92 @@
+"""Tests for authenticated principal caching."""
+
+from datetime import timedelta
+
+import pytest
+from fakeredis import FakeAsyncRedis
+from fastapi import HTTPException
+from httpx import AsyncClient
+
+from app.api.v1 import users as users_api
+from app.core import dependencies
+from app.core.dependencies import get_current_principal
+from app.core.principals import Principal, PrincipalCache
+from app.core.security import create_token
+from app.models.user import UserRole
+from app.schemas.user import UserStatusUpdate, UserUpdateRequest
+
+
+def _token(user_id) -> str:
+    return create_token(subject=str(user_id), expires_delta=timedelta(minutes=5))
+
+
+@pytest.fixture
+def cache(monkeypatch):
+    """A fresh principal cache installed where the dependency and user endpoints use it."""
+    cache = PrincipalCache(ttl=60, maxsize=100)
+    monkeypatch.setattr(dependencies, "principal_cache", cache)
+    monkeypatch.setattr(users_api, "principal_cache", cache)
+    return cache
+
+
+@pytest.mark.asyncio
+async def test_principal_is_loaded_once(db_session, user_factory, query_log, cache):
+    farmer = await user_factory(UserRole.FARMER)
+    token = _token(farmer.id)
+    query_log.clear()
+
+    principal = await get_current_principal(token=token, db=db_session)
+    assert principal == Principal(id=farmer.id, role=UserRole.FARMER, is_active=True)
+    assert len(query_log) == 1
+    assert await get_current_principal(token=token, db=db_session) == principal
+    assert len(query_log) == 1
+
+    with pytest.raises(HTTPException) as exc_info:
+        await get_current_principal(token=create_token(subject="not-a-uuid", expires_delta=timedelta(minutes=5)), db=db_session)
+    assert exc_info.value.status_code == 401
+
+
+@pytest.mark.asyncio
+async def test_deactivation_and_profile_update_invalidate(db_session, user_factory, query_log, cache):
+    admin = await user_factory(UserRole.ADMIN)
+    shop = await user_factory(UserRole.SHOP)
+    token = _token(shop.id)
+    shop_principal = await get_current_principal(token=token, db=db_session)
+
+    await users_api.update_me(UserUpdateRequest(legal_name="Fresh Market"), db=db_session, current_user=shop)
+    query_log.clear()
+    await get_current_principal(token=token, db=db_session)
+    assert len(query_log) == 1
+
+    await users_api.update_user_status(shop.id, UserStatusUpdate(is_active=False), db=db_session, current_user=admin)
+    with pytest.raises(HTTPException) as exc_info:
+        await get_current_principal(token=token, db=db_session)
+    assert exc_info.value.status_code == 401
+
+    with pytest.raises(HTTPException) as exc_info:
+        await users_api.update_user_status(admin.id, UserStatusUpdate(is_active=True), db=db_session, current_user=shop_principal)
+    assert exc_info.value.status_code == 403
+
+
+@pytest.mark.asyncio
+async def test_redis_tier_is_shared_between_workers(db_session, user_factory, query_log):
+    redis = FakeAsyncRedis()
+    first_worker = PrincipalCache(ttl=60, maxsize=100, redis=redis)
+    second_worker = PrincipalCache(ttl=60, maxsize=100, redis=redis)
+    farmer = await user_factory(UserRole.FARMER)
+    query_log.clear()
+
+    principal = await first_worker.get(db_session, farmer.id)
+    assert await second_worker.get(db_session, farmer.id) == principal
+    assert len(query_log) == 1
+
+    await first_worker.invalidate(farmer.id)
+    assert await redis.exists(f"principal:{farmer.id}") == 0
+
+
+@pytest.mark.asyncio
+async def test_bearer_token_authenticates_over_http(client: AsyncClient, user_factory, cache):
+    farmer = await user_factory(UserRole.FARMER)
+    response = await client.get("/api/v1/users/me", headers={"Authorization": f"Bearer {_token(farmer.id)}"})
+    assert response.status_code == 200
+    assert response.json()["id"] == str(farmer.id)
@@ -0,0 +1,158 @@
+"""Tests for the streaming product import."""
+
+import json
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import select
+from starlette.requests import Request
+
+from app.api.v1.products import import_products
+from app.core.config import get_settings
+from app.models.product import Product, ProductCategory
+from app.models.user import UserRole
+from app.services.product_import import ImportFormatError, iter_csv_records, iter_lines
+
+
+async def _chunks(body: bytes, size: int = 7):
+    for start in range(0, len(body), size):
+        yield body[start:start + size]
+
+
+def _request(body: bytes, content_type: str) -> Request:
+    """A request whose body arrives in small chunks, like a slow upload."""
+    messages = [
+        {"type": "http.request", "body": body[start:start + 16], "more_body": start + 16 < len(body)}
+        for start in range(0, len(body), 16)
+    ] or [{"type": "http.request", "body": b"", "more_body": False}]
+
+    async def receive():
+        return messages.pop(0)
+
+    scope = {
+        "type": "http",
+        "method": "POST",
+        "path": "/api/v1/products/import",
+        "headers": [(b"content-type", content_type.encode())],
+    }
+    return Request(scope, receive)
+
+
+async def _farmer_products(db_session, farmer) -> dict[str, Product]:
+    stmt = select(Product).where(Product.farmer_id == farmer.id).execution_options(populate_existing=True)
+    result = await db_session.execute(stmt)
+    return {product.name: product for product in result.scalars()}
+
+
+@pytest.mark.asyncio
+async def test_csv_lines_split_across_chunks():
+    body = '\ufeffname,description\r\n"Apples","crisp,\nred"\r\nPears,\n'.encode()
+    lines = [line async for line in iter_lines(_chunks(body, size=3))]
+    assert lines == [(1, "name,description"), (2, '"Apples","crisp,'), (3, 'red"'), (4, "Pears,")]
+
+    records = [record async for record in iter_csv_records(_chunks(body, size=3))]
+    assert records == [(2, {"name": "Apples", "description": "crisp,\nred"}), (4, {"name": "Pears"})]
+
+
+@pytest.mark.asyncio
+async def test_import_csv_creates_updates_and_reports_rows(db_session, user_factory):
+    farmer = await user_factory(UserRole.FARMER)
+    existing = Product(farmer_id=farmer.id, name="Tomatoes", category=ProductCategory.VEGETABLES, price=10.0, quantity=5.0)
+    db_session.add(existing)
+    await db_session.commit()
+
+    body = (
+        "name,category,price,quantity,unit,description\n"
+        "Tomatoes,vegetables,12.5,40,,\n"
+        "Apples,fruits,8,100,kg,Sweet\n"
+        "Broken,fruits,-1,10,,\n"
+        "Milk,dairy,5,20,liter,\n"
+        ",grains,1,1,,\n"
+    ).encode()
+    response = await import_products(_request(body, "text/csv; charset=utf-8"), db=db_session, current_user=farmer)
+
+    assert (response.created, response.updated, response.failed) == (2, 1, 2)
+    assert [error.line for error in response.errors] == [4, 6]
+    assert "price" in response.errors[0].message
+
+    products = await _farmer_products(db_session, farmer)
+    assert set(products) == {"Tomatoes", "Apples", "Milk"}
+    assert products["Tomatoes"].id == existing.id
+    assert float(products["Tomatoes"].price) == 12.5
+    assert products["Tomatoes"].unit == "kg"
+    assert products["Milk"].unit == "liter" and products["Milk"].description is None
+
+
+@pytest.mark.asyncio
+async def test_reimport_keeps_columns_the_row_leaves_out(db_session, user_factory):
+    farmer = await user_factory(UserRole.FARMER)
+    first = b"name,category,price,quantity,unit,description,image_url\nHoney,other,20,10,liter,Mountain honey,https://img/honey.jpg\n"
+    await import_products(_request(first, "text/csv"), db=db_session, current_user=farmer)
+
+    # A price list: no description, image or unit columns, and an empty description cell
+    second = b"name,category,price,quantity,description\nHoney,other,25,8,\n"
+    response = await import_products(_request(second, "text/csv"), db=db_session, current_user=farmer)
+    assert response.updated == 1
+
+    honey = (await _farmer_products(db_session, farmer))["Honey"]
+    assert float(honey.price) == 25 and float(honey.quantity) == 8
+    assert honey.description == "Mountain honey"
+    assert honey.image_url == "https://img/honey.jpg"
+    assert honey.unit == "liter"
+
+
+@pytest.mark.asyncio
+async def test_import_ndjson_in_batches_within_query_budget(db_session, user_factory, query_budget, monkeypatch):
+    """Statements grow with the number of batches, not rows; repeated names keep the last row."""
+    monkeypatch.setattr(get_settings(), "product_import_batch_size", 50)
+    farmer = await user_factory(UserRole.FARMER)
+    rows = [{"name": f"Item {index}", "category": "grains", "price": 2.0, "quantity": index} for index in range(120)]
+    rows.append({"name": "Item 0", "category": "grains", "price": 3.0, "quantity": 1})
+    body = "\n".join([*map(json.dumps, rows), "{not json", ""]).encode()
+
+    # Three batches of lookup + insert (+ update for the repeated name)
+    with query_budget(7):
+        response = await import_products(_request(body, "application/x-ndjson"), db=db_session, current_user=farmer)
+
+    assert (response.created, response.updated, response.failed) == (120, 1, 1)
+    assert response.errors[0].line == 122 and "Invalid JSON" in response.errors[0].message
+    products = await _farmer_products(db_session, farmer)
+    assert len(products) == 120
+    assert float(products["Item 0"].price) == 3.0
+
+
+@pytest.mark.asyncio
+async def test_import_errors_are_capped(db_session, user_factory, monkeypatch):
+    monkeypatch.setattr(get_settings(), "product_import_max_errors", 3)
+    farmer = await user_factory(UserRole.FARMER)
+    body = "\n".join(json.dumps({"name": f"Bad {index}"}) for index in range(10)).encode()
+
+    response = await import_products(_request(body, "application/x-ndjson"), db=db_session, current_user=farmer)
+
+    assert response.failed == 10
+    assert len(response.errors) == 3 and response.errors_truncated
+
+
+@pytest.mark.asyncio
+async def test_import_rejects_unreadable_stream(db_session, user_factory, monkeypatch):
+    farmer = await user_factory(UserRole.FARMER)
+    shop = await user_factory(UserRole.SHOP)
+
+    with pytest.raises(HTTPException) as exc_info:
+        await import_products(_request(b"name\n", "text/csv"), db=db_session, current_user=shop)
+    assert exc_info.value.status_code == 403
+
+    with pytest.raises(HTTPException) as exc_info:
+        await import_products(_request(b"name\n", "application/json"), db=db_session, current_user=farmer)
+    assert exc_info.value.status_code == 415
+
+    # The whole import is rolled back, including batches written before the bad line
+    monkeypatch.setattr(get_settings(), "product_import_batch_size", 1)
+    body = b"name,category,price,quantity\nOats,grains,1,1\n" + b"\xff\xfe\n"
+    with pytest.raises(HTTPException) as exc_info:
+        await import_products(_request(body, "text/csv"), db=db_session, current_user=farmer)
+    assert exc_info.value.status_code == 400
+    assert await _farmer_products(db_session, farmer) == {}
+
+    with pytest.raises(ImportFormatError, match="Unterminated"):
+        [record async for record in iter_csv_records(_chunks(b'name\n"open'))]
@@ -0,0 +1,80 @@
+"""Tests for bulk price and stock updates."""
+
+from uuid import UUID
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import select
+
+from app.api.v1.products import bulk_update_products
+from app.core.principals import Principal
+from app.models.product import Product, ProductCategory
+from app.models.user import UserRole
+from app.schemas.product import ProductBulkChange, ProductBulkUpdate
+
+
+async def _products(db_session, farmer, count: int) -> list[Product]:
+    products = [
+        Product(farmer_id=farmer.id, name=f"Product {index}", category=ProductCategory.GRAINS, price=10.0, quantity=50.0)
+        for index in range(count)
+    ]
+    db_session.add_all(products)
+    await db_session.commit()
+    return products
+
+
+async def _reload(db_session, product_ids) -> dict:
+    stmt = select(Product).where(Product.id.in_(product_ids)).execution_options(populate_existing=True)
+    return {product.id: product for product in (await db_session.execute(stmt)).scalars()}
+
+
+@pytest.mark.asyncio
+async def test_bulk_update_applies_partial_changes(db_session, user_factory, query_budget):
+    """Ownership check and update are two statements however many products change."""
+    farmer = await user_factory(UserRole.FARMER)
+    products = await _products(db_session, farmer, 30)
+    payload = ProductBulkUpdate(
+        items=[
+            *[ProductBulkChange(product_id=product.id, price=12.0 + index) for index, product in enumerate(products)],
+            ProductBulkChange(product_id=products[0].id, quantity=0, is_active=False),
+            ProductBulkChange(product_id=products[1].id, quantity=7.5),
+        ]
+    )
+
+    with query_budget(2):
+        response = await bulk_update_products(payload, db=db_session, current_user=farmer)
+
+    assert len(response.items) == 30
+    stored = await _reload(db_session, [product.id for product in products])
+    first, second, last = stored[products[0].id], stored[products[1].id], stored[products[-1].id]
+    assert (float(first.price), float(first.quantity), first.is_active) == (12.0, 0.0, False)
+    assert (float(second.price), float(second.quantity), second.is_active) == (13.0, 7.5, True)
+    assert (float(last.price), float(last.quantity)) == (41.0, 50.0)
+
+
+@pytest.mark.asyncio
+async def test_bulk_update_is_all_or_nothing(db_session, user_factory):
+    farmer = await user_factory(UserRole.FARMER)
+    other = await user_factory(UserRole.FARMER)
+    # Principals, not ORM users: the failed attempts roll back and expire loaded objects
+    admin = Principal(id=(await user_factory(UserRole.ADMIN)).id, role=UserRole.ADMIN, is_active=True)
+    mine = await _products(db_session, farmer, 2)
+    theirs = await _products(db_session, other, 1)
+    mine_ids, their_id = [product.id for product in mine], theirs[0].id
+    farmer = Principal(id=farmer.id, role=UserRole.FARMER, is_active=True)
+    items = [ProductBulkChange(product_id=product_id, price=99.0) for product_id in [*mine_ids, their_id]]
+
+    with pytest.raises(HTTPException) as exc_info:
+        await bulk_update_products(ProductBulkUpdate(items=items), db=db_session, current_user=farmer)
+    assert exc_info.value.status_code == 403
+    assert str(their_id) in exc_info.value.detail
+    assert all(float(product.price) == 10.0 for product in (await _reload(db_session, mine_ids)).values())
+
+    missing = ProductBulkChange(product_id=UUID(int=1), price=1.0)
+    with pytest.raises(HTTPException) as exc_info:
+        await bulk_update_products(ProductBulkUpdate(items=[*items, missing]), db=db_session, current_user=admin)
+    assert exc_info.value.status_code == 404
+
+    # Admins may change any farmer's products
+    response = await bulk_update_products(ProductBulkUpdate(items=items), db=db_session, current_user=admin)
+    assert {float(item.price) for item in response.items} == {99.0}
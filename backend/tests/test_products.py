@@ -247,3 +247,118 @@ async def test_filter_products_by_category(client: AsyncClient, farmer_token: st
     data = response.json()
     assert all(item["category"] == "vegetables" for item in data["items"])
 
+
+
+@pytest.mark.asyncio
+async def test_list_products_cursor_pagination(client: AsyncClient, db_session, user_factory):
+    """Walking next_cursor visits every product exactly once in (created_at, id) order."""
+    from datetime import datetime, timedelta
+
+    from app.models.product import Product, ProductCategory
+    from app.models.user import UserRole
+
+    farmer = await user_factory(UserRole.FARMER)
+    base = datetime(2025, 1, 1)
+    # Pairs of products share a timestamp so the id tie-breaker is exercised
+    db_session.add_all(
+        [
+            Product(
+                farmer_id=farmer.id,
+                name=f"Paged {index}",
+                category=ProductCategory.FRUITS,
+                price=1.0,
+                quantity=1.0,
+                created_at=base + timedelta(minutes=index // 2),
+            )
+            for index in range(25)
+        ]
+    )
+    await db_session.commit()
+
+    offset_response = await client.get("/api/v1/products", params={"farmer_id": str(farmer.id), "limit": 100})
+    expected = [item["id"] for item in offset_response.json()["items"]]
+    assert len(expected) == 25
+
+    seen: list[str] = []
+    cursor = None
+    while True:
+        params = {"farmer_id": str(farmer.id), "limit": 10}
+        if cursor:
+            params["cursor"] = cursor
+        response = await client.get("/api/v1/products", params=params)
+        assert response.status_code == 200
+        data = response.json()
+        seen.extend(item["id"] for item in data["items"])
+        cursor = data["next_cursor"]
+        if cursor is None:
+            break
+
+    assert seen == expected
+
+
+@pytest.mark.asyncio
+async def test_list_products_invalid_cursor(client: AsyncClient):
+    """A malformed cursor is rejected instead of silently restarting from the first page."""
+    response = await client.get("/api/v1/products", params={"cursor": "not-a-cursor"})
+    assert response.status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_list_products_count_modes(client: AsyncClient, db_session, user_factory):
+    """Each count mode trades total accuracy for cost as documented."""
+    from app.db.counting import clear_count_cache
+    from app.models.product import Product, ProductCategory
+    from app.models.user import UserRole
+
+    farmer = await user_factory(UserRole.FARMER)
+
+    async def add_products(count: int) -> None:
+        db_session.add_all(
+            [
+                Product(farmer_id=farmer.id, name="Counted", category=ProductCategory.GRAINS, price=1.0, quantity=1.0)
+                for _ in range(count)
+            ]
+        )
+        await db_session.commit()
+
+    async def list_page(count_mode: str) -> dict:
+        response = await client.get(
+            "/api/v1/products", params={"farmer_id": str(farmer.id), "limit": 2, "count": count_mode}
+        )
+        assert response.status_code == 200
+        return response.json()
+
+    await add_products(3)
+    clear_count_cache()
+
+    exact = await list_page("exact")
+    assert exact["total"] == 3
+    assert exact["has_more"] is True
+
+    omitted = await list_page("none")
+    assert omitted["total"] is None
+    assert omitted["has_more"] is True
+
+    assert (await list_page("cached"))["total"] == 3
+    await add_products(2)
+    # Served from the cache until the TTL expires
+    assert (await list_page("cached"))["total"] == 3
+    assert (await list_page("exact"))["total"] == 5
+
+    # SQLite has no planner statistics; estimate falls back to an exact count
+    assert (await list_page("estimate"))["total"] == 5
+
+
+def test_invalid_default_count_mode_is_rejected_at_startup(monkeypatch):
+    """A typo in LIST_COUNT_MODE fails settings validation instead of every list request."""
+    from pydantic import ValidationError
+
+    from app.core.config import Settings
+    from app.db.counting import CountMode
+
+    monkeypatch.setenv("LIST_COUNT_MODE", "exactly")
+    with pytest.raises(ValidationError):
+        Settings()
+    # Every mode the settings accept is one the endpoints know
+    monkeypatch.setenv("LIST_COUNT_MODE", "estimate")
+    assert CountMode(Settings().list_count_mode) == CountMode.ESTIMATE
@@ -0,0 +1,101 @@
+"""Tests for query budgets, N+1 detection and Server-Timing."""
+
+import logging
+
+import pytest
+from fastapi import APIRouter, FastAPI
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy import select, text
+
+from app.api.v1.orders import create_order
+from app.core.instrumentation import MetricsMiddleware, QueryBudgetExceeded, TimedRoute, normalize_statement
+from app.models.product import Product, ProductCategory
+from app.models.user import UserRole
+from app.schemas.order import OrderCreate, OrderItemCreate
+
+
+async def _products(db_session, farmer, count: int) -> list[Product]:
+    products = [
+        Product(farmer_id=farmer.id, name=f"Product {index}", category=ProductCategory.FRUITS, price=5.0, quantity=100.0)
+        for index in range(count)
+    ]
+    db_session.add_all(products)
+    await db_session.commit()
+    return products
+
+
+def test_normalize_statement_groups_parameter_variants():
+    assert normalize_statement("SELECT * FROM t WHERE id = 42 AND name = 'it''s'") == "SELECT * FROM t WHERE id = ? AND name = ?"
+    assert normalize_statement("SELECT * FROM t WHERE id IN (?, ?,\n ?)") == normalize_statement("SELECT * FROM t WHERE id IN ($1)")
+    # Digits inside identifiers are not literals
+    assert "param_1" in normalize_statement("SELECT :param_1")
+
+
+@pytest.mark.asyncio
+async def test_budget_catches_per_row_loop(db_session, user_factory, query_budget):
+    farmer = await user_factory(UserRole.FARMER)
+    products = await _products(db_session, farmer, 6)
+    product_ids = [product.id for product in products]
+    db_session.expunge_all()
+
+    with pytest.raises(QueryBudgetExceeded, match="N\\+1") as exc_info:
+        with query_budget(10, repeat_threshold=5):
+            for product_id in product_ids:
+                await db_session.get(Product, product_id)
+    assert "6x SELECT" in str(exc_info.value)
+
+    with pytest.raises(QueryBudgetExceeded, match="budget of 3 exceeded"):
+        with query_budget(3):
+            db_session.expunge_all()
+            for product_id in product_ids:
+                await db_session.get(Product, product_id)
+
+    db_session.expunge_all()
+    with query_budget(1, repeat_threshold=2) as log:
+        await db_session.execute(select(Product).where(Product.id.in_(product_ids)))
+    assert len(log) == 1
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("item_count", [1, 25])
+async def test_create_order_query_budget(db_session, user_factory, query_budget, item_count):
+    """Placing an order costs the same statements whether it has one line or many."""
+    farmer = await user_factory(UserRole.FARMER)
+    shop = await user_factory(UserRole.SHOP)
+    products = await _products(db_session, farmer, item_count)
+    payload = OrderCreate(
+        farmer_id=farmer.id,
+        items=[OrderItemCreate(product_id=product.id, quantity=1.0) for product in products],
+    )
+
+    # Farmer, lock + reserve stock, order + items + outbox event inserts, reload order + items
+    with query_budget(8, repeat_threshold=2):
+        response = await create_order(payload, db=db_session, current_user=shop)
+    assert len(response.items) == item_count
+
+
+@pytest.mark.asyncio
+async def test_server_timing_and_repeat_warning(test_engine, query_budget, caplog):
+    """In QUERY_DEBUG mode responses carry db/serialize/total timings and loops are logged."""
+    router = APIRouter(route_class=TimedRoute)
+
+    @router.get("/rows/{count}")
+    async def rows(count: int) -> dict[str, int]:
+        async with test_engine.connect() as conn:
+            for value in range(count):
+                await conn.execute(text(f"SELECT {value}"))
+        return {"count": count}
+
+    debug_app = FastAPI()
+    debug_app.include_router(router)
+    transport = ASGITransport(app=MetricsMiddleware(debug_app, server_timing=True, repeat_threshold=3))
+
+    with caplog.at_level(logging.WARNING, logger="app.core.instrumentation"):
+        async with AsyncClient(transport=transport, base_url="http://test") as client:
+            response = await client.get("/rows/4")
+
+    assert response.status_code == 200
+    timing = response.headers["server-timing"]
+    assert 'db;dur=' in timing and 'desc="4 queries"' in timing
+    assert "serialize;dur=" in timing and "total;dur=" in timing
+    assert "Possible N+1 in GET /rows/{count}: 4x SELECT ?" in caplog.text
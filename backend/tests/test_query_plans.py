@@ -0,0 +1,175 @@
+"""Check that the SQL generated by list/lookup endpoints is served by the secondary indexes."""
+
+from collections.abc import Awaitable, Callable
+
+import pytest
+from fastapi import Response
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker
+
+from app.api.v1.auth import send_otp
+from app.api.v1.orders import list_orders
+from app.api.v1.payments import list_transactions
+from app.api.v1.products import list_products
+from app.api.v1.users import list_users
+from app.models.order import Order, OrderItem, OrderStatus
+from app.models.product import Product, ProductCategory
+from app.models.transaction import PaymentProvider, Transaction
+from app.models.user import User, UserRole
+from app.schemas.auth import SendOTPRequest
+
+
+async def _captured_statements(
+    engine: AsyncEngine,
+    call: Callable[[AsyncSession], Awaitable[object]],
+) -> list[tuple[str, object]]:
+    """Run an endpoint handler and return the (SQL, parameters) it sent to the database."""
+    captured: list[tuple[str, object]] = []
+
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        captured.append((statement, parameters))
+
+    session_factory = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    event.listen(engine.sync_engine, "before_cursor_execute", _before_cursor_execute)
+    try:
+        async with session_factory() as session:
+            await call(session)
+    finally:
+        event.remove(engine.sync_engine, "before_cursor_execute", _before_cursor_execute)
+    return captured
+
+
+async def _explain(engine: AsyncEngine, statement: str, parameters: object) -> str:
+    async with engine.connect() as conn:
+        if engine.dialect.name == "postgresql":
+            # Tables are tiny here; make the planner prove that an index serves both the
+            # filter and the ORDER BY instead of picking any index and sorting afterwards
+            for setting in ("enable_seqscan", "enable_bitmapscan", "enable_sort"):
+                await conn.exec_driver_sql(f"SET {setting} = off")
+            result = await conn.exec_driver_sql(f"EXPLAIN {statement}", parameters)
+            return "\n".join(row[0] for row in result)
+        result = await conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters)
+        return "\n".join(row[-1] for row in result)
+
+
+def _find(captured: list[tuple[str, object]], *fragments: str) -> tuple[str, object]:
+    for statement, parameters in captured:
+        if all(fragment in statement for fragment in fragments) and "count(" not in statement:
+            return statement, parameters
+    raise AssertionError(f"No statement containing {fragments} in {[s for s, _ in captured]}")
+
+
+@pytest.fixture
+async def seeded(real_db_engine):
+    session_factory = async_sessionmaker(real_db_engine, class_=AsyncSession, expire_on_commit=False)
+    async with session_factory() as session:
+        admin = User(phone_number="+998900000001", role=UserRole.ADMIN, is_active=True)
+        farmer = User(phone_number="+998900000002", role=UserRole.FARMER, is_active=True)
+        shop = User(phone_number="+998900000003", role=UserRole.SHOP, is_active=True)
+        session.add_all([admin, farmer, shop])
+        await session.flush()
+        product = Product(farmer_id=farmer.id, name="Onion", category=ProductCategory.VEGETABLES, price=1.0, quantity=5.0)
+        session.add(product)
+        await session.flush()
+        order = Order(shop_id=shop.id, farmer_id=farmer.id, status=OrderStatus.PENDING, total_amount=1.0)
+        order.items = [OrderItem(product_id=product.id, quantity=1.0, price=1.0)]
+        session.add(order)
+        await session.flush()
+        session.add(Transaction(order_id=order.id, amount=1.0, provider=PaymentProvider.PAYME))
+        await session.commit()
+    return {"admin": admin, "farmer": farmer, "shop": shop, "order": order}
+
+
+def _list_products_kwargs(**overrides):
+    kwargs = dict(
+        category=None,
+        farmer_id=None,
+        min_price=None,
+        max_price=None,
+        search=None,
+        limit=20,
+        offset=0,
+        cursor=None,
+        count=None,
+    )
+    kwargs.update(overrides)
+    return kwargs
+
+
+def _list_orders_kwargs(**overrides):
+    kwargs = dict(status_filter=None, farmer_id=None, shop_id=None, limit=20, offset=0, cursor=None, count=None)
+    kwargs.update(overrides)
+    return kwargs
+
+
+@pytest.mark.asyncio
+async def test_endpoint_queries_use_indexes(real_db_engine, seeded):
+    admin, farmer, shop, order = seeded["admin"], seeded["farmer"], seeded["shop"], seeded["order"]
+
+    cases = [
+        (
+            lambda db: list_products(**_list_products_kwargs(), db=db),
+            ("FROM products", "LIMIT"),
+            "ix_products_active_created_at",
+        ),
+        (
+            lambda db: list_products(**_list_products_kwargs(category=ProductCategory.VEGETABLES), db=db),
+            ("FROM products", "LIMIT"),
+            "ix_products_active_category_created_at",
+        ),
+        (
+            lambda db: list_products(**_list_products_kwargs(farmer_id=farmer.id), db=db),
+            ("FROM products", "LIMIT"),
+            "ix_products_farmer_id_created_at",
+        ),
+        (
+            lambda db: list_orders(**_list_orders_kwargs(), db=db, current_user=farmer),
+            ("FROM orders", "LIMIT"),
+            "ix_orders_farmer_id_created_at",
+        ),
+        (
+            lambda db: list_orders(**_list_orders_kwargs(), db=db, current_user=shop),
+            ("FROM orders", "LIMIT"),
+            "ix_orders_shop_id_created_at",
+        ),
+        (
+            lambda db: list_orders(**_list_orders_kwargs(status_filter=OrderStatus.PENDING), db=db, current_user=admin),
+            ("FROM orders", "LIMIT"),
+            "ix_orders_status_created_at",
+        ),
+        (
+            lambda db: list_orders(**_list_orders_kwargs(), db=db, current_user=admin),
+            ("FROM orders", "LIMIT"),
+            "ix_orders_created_at",
+        ),
+        (
+            lambda db: list_orders(**_list_orders_kwargs(), db=db, current_user=admin),
+            ("FROM order_items", "IN"),
+            "ix_order_items_order_id",
+        ),
+        (
+            lambda db: list_transactions(
+                response=Response(), order_id=order.id, limit=100, offset=0, cursor=None, db=db, current_user=admin
+            ),
+            ("FROM transactions",),
+            "ix_transactions_order_id_created_at",
+        ),
+        (
+            lambda db: list_users(
+                response=Response(), role=UserRole.SHOP, limit=100, offset=0, cursor=None, db=db, current_user=admin
+            ),
+            ("FROM users", "LIMIT"),
+            "ix_users_role_created_at",
+        ),
+        (
+            lambda db: send_otp(SendOTPRequest(phone_number="+998901112233"), db=db),
+            ("FROM phone_otps",),
+            "ix_phone_otps_phone_number_created_at",
+        ),
+    ]
+
+    for call, fragments, index_name in cases:
+        captured = await _captured_statements(real_db_engine, call)
+        statement, parameters = _find(captured, *fragments)
+        plan = await _explain(real_db_engine, statement, parameters)
+        assert index_name in plan, f"{index_name} not used for:\n{statement}\n{plan}"
@@ -0,0 +1,163 @@
+"""Tests for request rate limiting."""
+
+import time
+
+import pytest
+from fakeredis import FakeAsyncRedis
+from httpx import ASGITransport, AsyncClient
+from redis.exceptions import RedisError
+
+from app.api.v1 import auth
+from app.core import rate_limit
+from app.core.cache import TTLCache
+from app.core.security import get_password_hash
+from app.core.rate_limit import (
+    Algorithm,
+    Rate,
+    RateLimiter,
+    RateLimitRule,
+    rate_limiter,
+)
+from app.main import app
+from app.models.user import UserRole
+
+
+def _limiter(backend: str) -> RateLimiter:
+    redis = FakeAsyncRedis()
+    return RateLimiter(redis=(lambda: redis) if backend == "redis" else None, memory_size=100)
+
+
+def test_rate_parse():
+    assert Rate.parse("5/minute") == Rate(5, 60.0)
+    assert Rate.parse("20/second") == Rate(20, 1.0)
+    assert Rate.parse("10/15minutes") == Rate(10, 900.0)
+    assert Rate.parse("100/30s") == Rate(100, 30.0)
+    for spec in ("5", "5/fortnight", "0/minute", "five/minute"):
+        with pytest.raises(ValueError):
+            Rate.parse(spec)
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("backend", ["redis", "memory"])
+async def test_sliding_window(backend):
+    limiter = _limiter(backend)
+    rule = RateLimitRule.parse("test:window", "3/minute")
+
+    decisions = [await limiter.hit(rule, "ip:1") for _ in range(4)]
+    assert [decision.allowed for decision in decisions] == [True, True, True, False]
+    assert [decision.remaining for decision in decisions[:3]] == [2, 1, 0]
+    assert 59 < decisions[3].retry_after <= 60
+    # Keys are counted separately
+    assert (await limiter.hit(rule, "ip:2")).allowed
+    # A check alone does not count
+    assert [(await limiter.hit(rule, "ip:3", record=False)).remaining for _ in range(2)] == [3, 3]
+    assert not (await limiter.hit(rule, "ip:1", record=False)).allowed
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("backend", ["redis", "memory"])
+async def test_token_bucket(backend):
+    limiter = _limiter(backend)
+    rule = RateLimitRule.parse("test:bucket", "2/second", Algorithm.TOKEN_BUCKET, burst=5)
+
+    decisions = [await limiter.hit(rule, "ip:1") for _ in range(6)]
+    assert [decision.allowed for decision in decisions] == [True] * 5 + [False]
+    assert 0 < decisions[5].retry_after <= 0.5
+
+
+@pytest.mark.asyncio
+async def test_limited_keys_are_answered_locally(monkeypatch):
+    limiter = _limiter("redis")
+    rule = RateLimitRule.parse("test:local", "1/minute")
+    await limiter.hit(rule, "ip:1")
+    assert not (await limiter.hit(rule, "ip:1")).allowed
+
+    monkeypatch.setattr(limiter, "_backend", lambda: pytest.fail("Redis consulted for a limited key"))
+    decision = await limiter.hit(rule, "ip:1")
+    assert not decision.allowed and decision.retry_after > 59
+
+
+@pytest.mark.asyncio
+async def test_falls_back_to_memory_without_redis():
+    class BrokenRedis(FakeAsyncRedis):
+        async def evalsha(self, *args, **kwargs):
+            raise RedisError("connection refused")
+
+    redis = BrokenRedis()
+    limiter = RateLimiter(redis=lambda: redis, memory_size=100)
+    rule = RateLimitRule.parse("test:fallback", "2/minute")
+
+    assert [(await limiter.hit(rule, "ip:1")).allowed for _ in range(3)] == [True, True, False]
+    assert limiter._backend() is None
+
+
+@pytest.mark.asyncio
+async def test_decision_overhead_in_process():
+    limiter = _limiter("memory")
+    rule = RateLimitRule.parse("test:overhead", "1000000/second", Algorithm.TOKEN_BUCKET)
+    started = time.perf_counter()
+    for index in range(1000):
+        await limiter.hit(rule, f"ip:{index % 50}")
+    assert (time.perf_counter() - started) / 1000 < 0.001
+
+
+@pytest.fixture
+def limiter_in_memory(monkeypatch):
+    """The app's limiter switched on with fresh in-process counts."""
+    monkeypatch.setattr(rate_limiter, "enabled", True)
+    monkeypatch.setattr(rate_limiter, "_redis_factory", None)
+    monkeypatch.setattr(rate_limiter, "_memory", rate_limit.MemoryRateLimitBackend(100))
+    monkeypatch.setattr(rate_limiter, "_limited", TTLCache(maxsize=100, ttl=1.0))
+
+
+@pytest.mark.asyncio
+async def test_login_is_limited_per_username(client, monkeypatch, limiter_in_memory):
+    monkeypatch.setattr(auth, "LOGIN_BY_USERNAME", RateLimitRule.parse("login:username", "2/minute"))
+
+    statuses = []
+    for _ in range(3):
+        response = await client.post("/api/v1/auth/login", json={"username": "nobody", "password": "wrong-password"})
+        statuses.append(response.status_code)
+    assert statuses == [401, 401, 429]
+    assert 0 < int(response.headers["retry-after"]) <= 60
+
+    response = await client.post("/api/v1/auth/login", json={"username": "somebody", "password": "wrong-password"})
+    assert response.status_code == 401
+
+
+@pytest.mark.asyncio
+async def test_failed_logins_lock_out_the_guesser_only(client, monkeypatch, limiter_in_memory, user_factory):
+    monkeypatch.setattr(auth, "LOGIN_BY_USERNAME", RateLimitRule.parse("login:username", "2/minute"))
+    username = f"admin{time.monotonic_ns()}"
+    await user_factory(UserRole.ADMIN, username=username, password_hash=get_password_hash("correct horse"))
+    owner = AsyncClient(transport=ASGITransport(app=app, client=("198.51.100.4", 40000)), base_url="http://test")
+
+    async with owner:
+        # Successful logins are not counted
+        for _ in range(3):
+            response = await owner.post("/api/v1/auth/login", json={"username": username, "password": "correct horse"})
+            assert response.status_code == 200
+
+        statuses = []
+        for _ in range(3):
+            response = await client.post("/api/v1/auth/login", json={"username": username, "password": "wrong-password"})
+            statuses.append(response.status_code)
+        assert statuses == [401, 401, 429]
+        # Once over the limit the guesser learns nothing, even with the right password
+        response = await client.post("/api/v1/auth/login", json={"username": username, "password": "correct horse"})
+        assert response.status_code == 429
+
+        response = await owner.post("/api/v1/auth/login", json={"username": username, "password": "correct horse"})
+        assert response.status_code == 200
+
+
+@pytest.mark.asyncio
+async def test_send_otp_is_limited_per_ip(client, limiter_in_memory):
+    allowed = auth.SEND_OTP_BY_IP.rate.count
+    # A different number each time, so only the per-IP rule applies
+    statuses = []
+    for index in range(allowed + 1):
+        response = await client.post("/api/v1/auth/send-otp", json={"phone_number": f"+9989055{index:05d}"})
+        statuses.append(response.status_code)
+    assert statuses == [202] * allowed + [429]
+    assert int(response.headers["retry-after"]) > 0
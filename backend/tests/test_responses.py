@@ -0,0 +1,95 @@
+"""Tests for single-pass JSON responses."""
+
+import json
+from datetime import datetime
+from decimal import Decimal
+from uuid import uuid4
+
+import pytest
+from fastapi import APIRouter, FastAPI, Response
+from httpx import ASGITransport, AsyncClient
+
+from app.core.instrumentation import TimedRoute
+from app.core.responses import FastJSONResponse, dump_json
+from app.models.product import ProductCategory
+from app.schemas.product import ProductListResponse, ProductResponse
+
+
+def _page(size: int) -> ProductListResponse:
+    now = datetime(2030, 1, 2, 3, 4, 5, 678000)
+    items = [
+        ProductResponse(
+            id=uuid4(),
+            farmer_id=uuid4(),
+            name=f"Product {index}",
+            description=None,
+            category=ProductCategory.DAIRY,
+            price=Decimal("12.50"),
+            quantity=3,
+            unit="kg",
+            image_url=None,
+            is_active=True,
+            created_at=now,
+            updated_at=now,
+        )
+        for index in range(size)
+    ]
+    return ProductListResponse(items=items, total=size, next_cursor="abc")
+
+
+@pytest.mark.asyncio
+async def test_fast_routes_match_default_serialization():
+    page = _page(3)
+    router = APIRouter(route_class=TimedRoute)
+
+    @router.get("/default", response_model=ProductListResponse)
+    async def default() -> ProductListResponse:
+        return page
+
+    @router.get("/fast", response_model=ProductListResponse, response_class=FastJSONResponse)
+    async def fast() -> ProductListResponse:
+        return page
+
+    @router.get("/fast-list", response_model=list[ProductResponse], response_class=FastJSONResponse)
+    async def fast_list(response: Response) -> list[ProductResponse]:
+        response.headers["X-Next-Cursor"] = "next"
+        return page.items
+
+    @router.get("/fast-dict", response_model=ProductResponse, response_class=FastJSONResponse, status_code=202)
+    async def fast_dict() -> dict:
+        return {**page.items[0].model_dump(), "secret": "not in the schema"}
+
+    app = FastAPI()
+    app.include_router(router)
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        expected = (await client.get("/default")).json()
+        response = await client.get("/fast")
+        assert response.headers["content-type"] == "application/json"
+        assert response.json() == expected
+
+        response = await client.get("/fast-list")
+        assert response.headers["x-next-cursor"] == "next"
+        assert response.json() == expected["items"]
+
+        # Values that are not the response model are validated into it, dropping extras
+        response = await client.get("/fast-dict")
+        assert response.status_code == 202
+        assert response.json() == expected["items"][0]
+
+        assert "/fast" in (await client.get("/openapi.json")).json()["paths"]
+
+
+def test_dump_json_handles_uuid_datetime_decimal():
+    product = _page(1).items[0]
+    data = json.loads(dump_json(product))
+    assert data["id"] == str(product.id)
+    assert data["created_at"] == "2030-01-02T03:04:05.678000"
+    assert data["price"] == 12.5 and data["category"] == "dairy"
+
+
+@pytest.mark.asyncio
+async def test_public_catalogue_uses_fast_path(client: AsyncClient):
+    response = await client.get("/api/v1/products", params={"limit": 5})
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/json"
+    assert set(response.json()) == {"items", "total", "has_more", "next_cursor"}
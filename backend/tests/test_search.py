@@ -0,0 +1,123 @@
+"""Tests for product catalogue search."""
+
+import pytest
+from sqlalchemy import select
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.api.v1.products import list_products
+from app.core.config import get_settings
+from app.models.product import Product, ProductCategory
+from app.models.user import User, UserRole
+from app.services.search import apply_product_search, build_prefix_tsquery
+
+
+def _search_kwargs(search: str, **overrides):
+    kwargs = dict(
+        category=None,
+        farmer_id=None,
+        min_price=None,
+        max_price=None,
+        search=search,
+        limit=20,
+        offset=0,
+        cursor=None,
+        count=None,
+    )
+    kwargs.update(overrides)
+    return kwargs
+
+
+def test_build_prefix_tsquery():
+    assert build_prefix_tsquery("Помид  черри") == "помид:* & черри:*"
+    assert build_prefix_tsquery("o'rik") == "o:* & rik:*"
+    # tsquery operators in user input are dropped, not interpreted
+    assert build_prefix_tsquery("milk | !cheese & (") == "milk:* & cheese:*"
+    assert build_prefix_tsquery("!!!") is None
+
+
+def test_non_postgresql_search_keeps_ilike():
+    stmt, rank = apply_product_search(select(Product), "tom", dialect_name="sqlite")
+    assert rank is None
+    assert "LIKE" in str(stmt).upper()
+
+
+async def _seed_catalogue(session: AsyncSession) -> None:
+    farmer = User(phone_number="+998900000010", role=UserRole.FARMER, is_active=True)
+    session.add(farmer)
+    await session.flush()
+    session.add_all(
+        [
+            Product(farmer_id=farmer.id, name="Помидоры черри", category=ProductCategory.VEGETABLES, price=1.0),
+            Product(
+                farmer_id=farmer.id,
+                name="Салатный набор",
+                description="Огурцы и помидоры с грядки",
+                category=ProductCategory.VEGETABLES,
+                price=1.0,
+            ),
+            Product(farmer_id=farmer.id, name="Olma qizil", category=ProductCategory.FRUITS, price=1.0),
+            Product(farmer_id=farmer.id, name="Картофель", category=ProductCategory.VEGETABLES, price=1.0),
+        ]
+    )
+    await session.commit()
+
+
+@pytest.mark.asyncio
+async def test_postgresql_full_text_search(real_db_engine, monkeypatch):
+    """Prefix matches use the search document index and name hits outrank description hits."""
+    if real_db_engine.dialect.name != "postgresql":
+        pytest.skip("full-text search is PostgreSQL-only")
+    monkeypatch.setattr(get_settings(), "product_search_trigram", False)
+
+    session_factory = async_sessionmaker(real_db_engine, class_=AsyncSession, expire_on_commit=False)
+    async with session_factory() as session:
+        await _seed_catalogue(session)
+
+        response = await list_products(**_search_kwargs("помид"), db=session)
+        assert [item.name for item in response.items] == ["Помидоры черри", "Салатный набор"]
+        assert response.total == 2
+        assert response.next_cursor is None
+
+        response = await list_products(**_search_kwargs("OLMA"), db=session)
+        assert [item.name for item in response.items] == ["Olma qizil"]
+
+        stmt, _rank = apply_product_search(select(Product.id), "помид", dialect_name="postgresql")
+        compiled = stmt.compile(dialect=real_db_engine.dialect, compile_kwargs={"literal_binds": True})
+
+    async with real_db_engine.connect() as conn:
+        await conn.exec_driver_sql("SET enable_seqscan = off")
+        plan = "\n".join(row[0] for row in await conn.exec_driver_sql(f"EXPLAIN {compiled}"))
+    assert "ix_products_search_document" in plan
+
+
+@pytest.mark.asyncio
+async def test_postgresql_trigram_search_tolerates_typos(real_db_engine):
+    if real_db_engine.dialect.name != "postgresql":
+        pytest.skip("trigram search is PostgreSQL-only")
+    async with real_db_engine.begin() as conn:
+        try:
+            await conn.exec_driver_sql("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        except DBAPIError:
+            pytest.skip("pg_trgm extension is not available")
+
+    session_factory = async_sessionmaker(real_db_engine, class_=AsyncSession, expire_on_commit=False)
+    async with session_factory() as session:
+        await _seed_catalogue(session)
+        response = await list_products(**_search_kwargs("памидоры"), db=session)
+    assert response.items[0].name == "Помидоры черри"
+
+
+@pytest.mark.asyncio
+async def test_search_cursor_rejected_for_ranked_results(real_db_engine, monkeypatch):
+    from fastapi import HTTPException
+
+    if real_db_engine.dialect.name != "postgresql":
+        pytest.skip("ranking is PostgreSQL-only")
+    monkeypatch.setattr(get_settings(), "product_search_trigram", False)
+
+    session_factory = async_sessionmaker(real_db_engine, class_=AsyncSession, expire_on_commit=False)
+    async with session_factory() as session:
+        with pytest.raises(HTTPException) as exc_info:
+            await list_products(**_search_kwargs("помид", cursor="anything"), db=session)
+    assert exc_info.value.status_code == 400
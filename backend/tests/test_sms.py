@@ -0,0 +1,202 @@
+"""Tests for the SMS dispatch queue."""
+
+import asyncio
+
+import pytest
+from fakeredis import FakeAsyncRedis
+
+from app.core.config import get_settings
+from app.core.instrumentation import registry
+from app.services import sms
+from app.services.sms import (
+    DevSMSProvider,
+    MemorySMSQueue,
+    RedisSMSQueue,
+    SMSDispatcher,
+    SMSMessage,
+    SMSProvider,
+    enqueue_sms,
+)
+
+
+class FlakyProvider(SMSProvider):
+    """Bulk provider that fails the first ``failures`` sends to each number."""
+
+    name = "flaky"
+    max_batch = 3
+
+    def __init__(self, failures: int) -> None:
+        self.failures = failures
+        self.attempts: dict[str, int] = {}
+        self.batches: list[int] = []
+
+    async def send(self, message):
+        [error] = await self.send_batch([message])
+        if error:
+            raise error
+
+    async def send_batch(self, messages):
+        self.batches.append(len(messages))
+        errors = []
+        for message in messages:
+            self.attempts[message.phone_number] = self.attempts.get(message.phone_number, 0) + 1
+            failed = self.attempts[message.phone_number] <= self.failures
+            errors.append(RuntimeError("gateway timeout") if failed else None)
+        return errors
+
+
+@pytest.fixture(autouse=True)
+def redis_reachable(monkeypatch):
+    """Earlier tests against the unreachable test Redis switch enqueueing to inline sends."""
+    monkeypatch.setattr(sms._redis_backoff, "down_until", 0.0)
+
+
+def _counter(provider: str, result: str) -> float:
+    key = f'[["provider", "{provider}"], ["result", "{result}"]]'
+    return registry.snapshot()["samples"].get("sms_messages_total", {}).get(key, 0)
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("backend", ["redis", "memory"])
+async def test_dispatcher_batches_and_retries(backend):
+    queue = RedisSMSQueue(FakeAsyncRedis(), consumer="test") if backend == "redis" else MemorySMSQueue()
+    provider = FlakyProvider(failures=1)
+    dispatcher = SMSDispatcher(queue, provider, batch_size=10, max_attempts=3, backoff=0.0, block_ms=10)
+    sent_before = _counter("flaky", "sent")
+
+    for index in range(5):
+        await enqueue_sms(SMSMessage(f"+99890000000{index}", "code"), queue)
+    assert await dispatcher.run_once() == 5
+    # One read, sent in provider-sized chunks; every first attempt failed and was rescheduled
+    assert provider.batches == [3, 2]
+    assert await queue.depth() == 5
+
+    assert await dispatcher.run_once() == 5
+    assert await queue.depth() == 0
+    assert set(provider.attempts.values()) == {2}
+    assert _counter("flaky", "sent") == sent_before + 5
+    assert registry.histogram("sms_send_duration_seconds", (("provider", "flaky"),)).count >= 4
+
+
+@pytest.mark.asyncio
+async def test_dispatcher_gives_up_after_max_attempts():
+    queue = MemorySMSQueue()
+    dispatcher = SMSDispatcher(queue, FlakyProvider(failures=10), max_attempts=2, backoff=0.0, block_ms=10)
+    failed_before = _counter("flaky", "failed")
+
+    await enqueue_sms(SMSMessage("+998900000001", "code"), queue)
+    await dispatcher.run_once()
+    await dispatcher.run_once()
+
+    assert await queue.depth() == 0
+    assert _counter("flaky", "failed") == failed_before + 1
+
+
+@pytest.mark.asyncio
+async def test_dispatcher_survives_unexpected_errors():
+    class FailingOnceQueue(MemorySMSQueue):
+        def __init__(self) -> None:
+            super().__init__()
+            self.failed = False
+
+        async def read(self, count, block_ms):
+            if not self.failed:
+                self.failed = True
+                raise ValueError("corrupt queue state")
+            return await super().read(count, block_ms)
+
+    class ProviderFailingOnce(DevSMSProvider):
+        name = "failing-once"
+
+        def __init__(self) -> None:
+            self.calls = 0
+            self.sent: list[str] = []
+
+        async def send_batch(self, messages):
+            self.calls += 1
+            if self.calls == 1:
+                raise RuntimeError("gateway exploded")
+            self.sent.extend(message.phone_number for message in messages)
+            return [None] * len(messages)
+
+    queue, provider = FailingOnceQueue(), ProviderFailingOnce()
+    dispatcher = SMSDispatcher(queue, provider, backoff=0.0, block_ms=10, error_pause=0.0)
+    await enqueue_sms(SMSMessage("+998900000001", "code"), queue)
+    await enqueue_sms(SMSMessage("+998900000002", "code"), queue)
+
+    worker = asyncio.create_task(dispatcher.run())
+    try:
+        for _ in range(100):
+            if len(provider.sent) == 2:
+                break
+            await asyncio.sleep(0.01)
+        # Still running after both failures
+        assert not worker.done()
+    finally:
+        worker.cancel()
+    assert sorted(provider.sent) == ["+998900000001", "+998900000002"]
+
+
+@pytest.mark.asyncio
+async def test_malformed_stream_entries_are_dropped():
+    redis = FakeAsyncRedis()
+    queue = RedisSMSQueue(redis, consumer="test")
+    await redis.xadd(sms.STREAM_KEY, {"message": "not json"})
+    await queue.enqueue(SMSMessage("+998900000001", "code"))
+
+    [(_, message)] = await queue.read(10, 10)
+    assert message.phone_number == "+998900000001"
+    assert await redis.xlen(sms.STREAM_KEY) == 1
+
+
+@pytest.mark.asyncio
+async def test_unacknowledged_messages_are_claimed_by_another_worker(monkeypatch):
+    redis = FakeAsyncRedis()
+    crashed, survivor = RedisSMSQueue(redis, consumer="a"), RedisSMSQueue(redis, consumer="b")
+    await crashed.enqueue(SMSMessage("+998900000001", "code"))
+    assert len(await crashed.read(10, 10)) == 1  # read, then the worker dies before ack
+
+    assert await survivor.read(10, 10) == []
+    monkeypatch.setattr(sms, "CLAIM_IDLE_MS", 0)
+    [(entry_id, message)] = await survivor.read(10, 10)
+    assert message.phone_number == "+998900000001"
+    await survivor.ack([entry_id])
+    assert await survivor.depth() == 0
+
+
+@pytest.mark.asyncio
+async def test_enqueue_falls_back_to_inline_send_without_redis(monkeypatch, caplog):
+    class BrokenRedis(FakeAsyncRedis):
+        async def xadd(self, *args, **kwargs):
+            raise sms.RedisError("connection refused")
+
+    monkeypatch.setattr(sms, "get_sms_provider", lambda: DevSMSProvider())
+    with caplog.at_level("INFO", logger="app.services.sms"):
+        await enqueue_sms(SMSMessage("+998900000001", "code 1"), RedisSMSQueue(BrokenRedis()))
+    assert "Sending SMS to +998900000001: code 1" in caplog.text
+    assert not sms._redis_backoff.available
+
+
+@pytest.mark.asyncio
+async def test_memory_queue_read_waits_for_messages():
+    queue = MemorySMSQueue()
+    reader = asyncio.create_task(queue.read(10, 1000))
+    await asyncio.sleep(0)
+    await queue.enqueue(SMSMessage("+998900000001", "code"))
+    assert len(await reader) == 1
+
+
+@pytest.mark.asyncio
+async def test_nothing_is_queued_without_a_gateway(client, monkeypatch):
+    monkeypatch.setattr(get_settings(), "sms_provider", "infobip")
+    sms.get_sms_provider.cache_clear()
+    queue = MemorySMSQueue()
+    try:
+        with pytest.raises(NotImplementedError):
+            await enqueue_sms(SMSMessage("+998900000001", "code 1"), queue)
+        assert await queue.depth() == 0
+
+        response = await client.post("/api/v1/auth/send-otp", json={"phone_number": "+998900000077"})
+        assert response.status_code == 503
+    finally:
+        sms.get_sms_provider.cache_clear()